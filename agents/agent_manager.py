@@ -1,5 +1,5 @@
 # agents/agent_manager.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.awards_agent import create_awards_agent
 from agents.child_agents.membership_agent import create_membership_agent
 from agents.child_agents.press_agent import create_press_agent
@@ -9,59 +9,83 @@ from agents.child_agents.articles_agent import create_articles_agent
 from agents.child_agents.employment_agent import create_employment_agent
 from agents.child_agents.remuneration_agent import create_remuneration_agent
 from agents.parent_agent import ParentAgent
+from agents.registry import agent_registry
+from utils.assessment_store import assessment_store
+from utils.checkpointing import invoke_checkpointed
+from utils.rate_limiter import llm_priority
+from utils.deadlines import deadline_scope, expired
+from agents.rating_engine import rate_assessment, rating_input
+from utils.structured_logging import truncate
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Child agents registered by the imports above
+CHILD_CRITERIA = [
+    "awards", "membership", "press", "judging",
+    "contributions", "articles", "employment", "remuneration"
+]
+
 class AgentManager:
     def __init__(self):
         self.agents = {}
-        self.parent_agent = ParentAgent()
+        self.parent_agent = agent_registry.get("parent")
         self._load_agents()
         
     def _load_agents(self):
-        """Load all child agents."""
-        self.agents = {
-            "awards": create_awards_agent(),
-            "membership": create_membership_agent(),
-            "press": create_press_agent(),
-            "judging": create_judging_agent(),
-            "contributions": create_contributions_agent(),
-            "articles": create_articles_agent(),
-            "employment": create_employment_agent(),
-            "remuneration": create_remuneration_agent()
-        }
+        """Load all child agents from the shared registry."""
+        self.agents = {criterion: agent_registry.get(criterion) for criterion in CHILD_CRITERIA}
 
-    def process_criterion(self, criterion: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def process_criterion(self, criterion: str, input_data: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
         """Process a specific criterion using the appropriate child agent."""
         agent = self.agents.get(criterion)
         if not agent:
             return {"error": f"No agent found for criterion: {criterion}"}
         
         try:
-            logger.info(f"Invoking {criterion} agent with input data: {input_data}")
-            result = agent.invoke(input_data)
-            logger.info(f"Result from {criterion} agent: {result}")
+            # Payloads hold the whole resume: only rendered, truncated, at DEBUG
+            logger.debug("Invoking %s agent with input data: %s", criterion, truncate(input_data))
+            with llm_priority(stage="child"):
+                result = invoke_checkpointed(agent, input_data, run_id, f"child:{criterion}")
+            logger.debug("Result from %s agent: %s", criterion, truncate(result))
             return result
         except Exception as e:
-            logger.error(f"{criterion} agent failed: {str(e)}")
+            logger.error("%s agent failed: %s", criterion, e, extra={"criterion": criterion})
             return {"error": f"{criterion} agent failed: {str(e)}"}
 
-    def coordinate_assessment(self, structured_resume: Dict[str, Any], criteria_mapping: Dict[str, Any]) -> Dict[str, Any]:
-        """Coordinate the full assessment process."""
+    def coordinate_assessment(self, structured_resume: Dict[str, Any], criteria_mapping: Dict[str, Any], mode: str = "full", run_id: Optional[str] = None, deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Coordinate the full assessment process. In "fast" mode the parent makes a single LLM call.
+        
+        A retry with the same run_id reuses every completed child assessment and parent stage.
+        If deadline_seconds (or an enclosing request deadline) passes, the result is marked
+        partial: the child assessments completed in time plus a deterministic rating.
+        """
+        with deadline_scope(deadline_seconds):
+            return self._coordinate_assessment(structured_resume, criteria_mapping, mode, run_id)
+    
+    def _coordinate_assessment(self, structured_resume: Dict[str, Any], criteria_mapping: Dict[str, Any], mode: str, run_id: Optional[str]) -> Dict[str, Any]:
         try:
             logger.info("Starting child agent assessments...")
             # Process each criterion with its dedicated agent
             child_assessments = {}
             for criterion in self.agents.keys():
-                logger.info(f"Processing {criterion} criterion...")
+                if expired():
+                    break
+                logger.info("Processing %s criterion...", criterion)
                 input_data = {
                     "resume_data": structured_resume,
                     "criterion_mapping": criteria_mapping.get(criterion, {})
                 }
-                child_assessments[criterion] = self.process_criterion(criterion, input_data)
+                result = self.process_criterion(criterion, input_data, run_id)
+                # An assessment cut short by the deadline is only a fallback, leave it out
+                if expired():
+                    break
+                child_assessments[criterion] = result
+            
+            if len(child_assessments) < len(self.agents):
+                logger.warning("Deadline exceeded after %d of %d child assessments", len(child_assessments), len(self.agents))
+                return self._partial_result(child_assessments)
             
             logger.info("Child agent assessments complete. Starting parent agent...")
             # Now invoke the parent agent with all child assessments
@@ -70,19 +94,36 @@ class AgentManager:
                 "criteria_mapping": criteria_mapping,
                 "child_assessments": child_assessments
             }
-            logger.info(f"Invoking parent agent with input data: {parent_input}")
-            parent_result = self.parent_agent.invoke(parent_input)
-            logger.info(f"Result from parent agent: {parent_result}")
+            logger.debug("Invoking parent agent with input data: %s", truncate(parent_input))
+            parent_result = self.parent_agent.invoke(parent_input, mode=mode, run_id=run_id)
+            logger.debug("Result from parent agent: %s", truncate(parent_result))
+            
+            if expired() and parent_result.get("error"):
+                logger.warning("Deadline exceeded during the parent assessment")
+                return self._partial_result(child_assessments)
             
             logger.info("Parent agent assessment complete.")
+            # Store the assessment; recommendations are generated on demand. Deterministic ones
+            # produced along the way (fast mode, early exit) are returned as basic_recommendations
+            # and are not memoized, so the recommendations endpoint still generates the full ones
+            final_assessment = dict(parent_result.get("final_assessment", {}))
+            basic_recommendations = final_assessment.pop("recommendations", None)
+            if basic_recommendations:
+                final_assessment["basic_recommendations"] = basic_recommendations
+            assessment_id = assessment_store.save(final_assessment, rating_input=rating_input(child_assessments))
+            
             # Return the combined results
             return {
+                "assessment_id": assessment_id,
+                "recommendations_url": f"/assessment/{assessment_id}/recommendations",
                 "child_assessments": child_assessments,
-                "final_assessment": parent_result.get("final_assessment", {}),
+                "final_assessment": final_assessment,
+                "skipped_stages": parent_result.get("skipped_stages", []),
+                "partial": False,
                 "error": parent_result.get("error", "")
             }
         except Exception as e:
-            logger.error(f"Error in coordination: {str(e)}")
+            logger.error("Error in coordination: %s", e)
             return {
                 "error": f"Error coordinating assessment: {str(e)}",
                 "child_assessments": {},
@@ -93,6 +134,54 @@ class AgentManager:
                 }
             }
 
+    def _partial_result(self, child_assessments: Dict[str, Any]) -> Dict[str, Any]:
+        """Result for a request whose deadline expired: completed child assessments and a deterministic rating."""
+        rating_result = rate_assessment(child_assessments)
+        pending = [criterion for criterion in self.agents if criterion not in child_assessments]
+        final_assessment = {
+            "rating": rating_result["rating"],
+            "justification": (
+                f"{rating_result['explanation']}. Partial result: the request deadline expired with "
+                f"{len(child_assessments)} of {len(self.agents)} criteria assessed"
+                + (f" (not assessed: {', '.join(pending)})" if pending else "")
+                + ", so the rating was computed by the rating rules without the final review."
+            ),
+            "criteria_summary": rating_result["criteria_summary"],
+            "rating_breakdown": rating_result,
+            "partial": True
+        }
+        final_assessment["basic_recommendations"] = self.parent_agent.basic_recommendations(final_assessment)
+        assessment_id = assessment_store.save(final_assessment, rating_input=rating_input(child_assessments))
+        return {
+            "assessment_id": assessment_id,
+            "recommendations_url": f"/assessment/{assessment_id}/recommendations",
+            "child_assessments": child_assessments,
+            "final_assessment": final_assessment,
+            "partial": True,
+            "pending_criteria": pending,
+            "skipped_stages": [],
+            "error": "Deadline exceeded"
+        }
+
+    def get_recommendations(self, assessment_id: str) -> Optional[Dict[str, Any]]:
+        """Get the recommendations for a stored assessment, generating and memoizing them on first request."""
+        entry = assessment_store.get(assessment_id)
+        if entry is None:
+            return None
+        
+        try:
+            recommendations = assessment_store.get_recommendations(
+                assessment_id, self.parent_agent.generate_recommendations
+            )
+            return {"recommendations": recommendations, "error": ""}
+        except Exception as e:
+            # Not memoized, so a later request can still get the full recommendations
+            logger.error("Error generating recommendations: %s", e)
+            return {
+                "recommendations": self.parent_agent.basic_recommendations(entry["final_assessment"]),
+                "error": f"Error generating recommendations: {str(e)}"
+            }
+
     def get_all_agents_status(self) -> Dict[str, str]:
         """Get the status of all agents."""
         status = {}
@@ -0,0 +1,175 @@
+# agents/case_digest.py
+import re
+import json
+from typing import Dict, Any, List, Optional
+
+from utils.knowledge_index import CRITERIA_ORDER, CHARS_PER_TOKEN, detect_fields
+
+# Keys tried, in order, to describe a resume item in a few words
+ITEM_LABEL_KEYS = ["name", "title", "role", "degree", "organization", "company", "issuer", "venue", "publication", "institution", "date"]
+# Shortest evidence line worth emitting when a criterion's share of the budget is tight
+MIN_FACT_CHARS = 40
+ASSESSMENT_PREFIX = "  Child assessment: "
+
+
+def _clip(text: str, max_chars: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+
+def _clip_block(text: str, max_chars: int) -> str:
+    """Truncate multi-line text at a line boundary."""
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit("\n", 1)[0] + "\n..."
+
+
+def _normalize(text: str) -> frozenset:
+    """Token set of a fact, ignoring a leading [strength] tag and punctuation."""
+    text = re.sub(r"^\[[^\]]*\]", "", text.lower())
+    return frozenset(re.findall(r"[a-z0-9]+", text))
+
+
+def _describe_item(item: Any, max_chars: int) -> str:
+    """Summarise a resume or mapping item in one short line."""
+    if isinstance(item, dict):
+        parts = [str(item[key]) for key in ITEM_LABEL_KEYS if item.get(key)]
+        if not parts:
+            parts = [str(value) for value in item.values() if isinstance(value, (str, int, float))]
+        return _clip(", ".join(parts), max_chars)
+    return _clip(item, max_chars)
+
+
+def _dedupe(facts: List[str], max_items: int) -> List[str]:
+    """Drop facts whose words duplicate, or are contained in, an earlier fact."""
+    kept: List[str] = []
+    seen: List[frozenset] = []
+    for fact in facts:
+        key = _normalize(fact)
+        if not key or any(key <= other or other <= key for other in seen):
+            continue
+        kept.append(fact)
+        seen.append(key)
+        if len(kept) >= max_items:
+            break
+    return kept
+
+
+def build_case_digest(
+    structured_resume: Dict[str, Any],
+    criteria_mapping: Dict[str, Any],
+    child_assessments: Dict[str, Any],
+    max_items_per_criterion: int = 6,
+    max_fact_chars: int = 160
+) -> Dict[str, Any]:
+    """Build a compact per-criterion summary of the case with deduplicated evidence."""
+    personal_info = structured_resume.get("personalInfo", {}) or {}
+    work_experience = [item for item in structured_resume.get("workExperience", []) or [] if isinstance(item, dict)]
+    education = [item for item in structured_resume.get("education", []) or [] if isinstance(item, dict)]
+
+    field_text = json.dumps({
+        "skills": structured_resume.get("skills", []),
+        "titles": [item.get("title", "") for item in work_experience],
+        "education": [item.get("field", "") for item in education]
+    })
+
+    candidate = {
+        "name": personal_info.get("name", "Unknown") if isinstance(personal_info, dict) else "Unknown",
+        "fields": detect_fields(field_text),
+        "recent_roles": [_describe_item(item, max_fact_chars) for item in work_experience[:3]],
+        "education": [_describe_item(item, max_fact_chars) for item in education[:2]],
+        "skills": [_clip(skill, 40) for skill in (structured_resume.get("skills", []) or [])[:10]]
+    }
+
+    criteria = {}
+    for criterion in CRITERIA_ORDER:
+        child = child_assessments.get(criterion, {})
+        assessment = child.get("assessment", {}) if isinstance(child, dict) else {}
+        mapping = criteria_mapping.get(criterion, {}) or {}
+
+        # Child evidence first since it carries a strength, then anything only the mapping found
+        facts = [
+            f"[{item.get('strength', '?')}] {_describe_item(item.get('description', ''), max_fact_chars)}"
+            for item in assessment.get("evidence_items", []) or [] if isinstance(item, dict)
+        ]
+        facts += [_describe_item(item, max_fact_chars) for item in mapping.get("relevantItems", []) or []]
+
+        criteria[criterion] = {
+            "strength": assessment.get("evidence_strength", "None"),
+            "evidence": _dedupe(facts, max_items_per_criterion),
+            "assessment": _clip(assessment.get("justification", ""), 2 * max_fact_chars)
+        }
+
+    return {"candidate": candidate, "criteria": criteria}
+
+
+def _render_criterion(criterion: str, data: Dict[str, Any], max_chars: Optional[int] = None) -> List[str]:
+    """
+    Render one criterion's section; within max_chars, fewer and shorter facts and a shorter justification.
+
+    The heading with the child strength is always emitted, even if it alone exceeds max_chars.
+    """
+    lines = [f"\n{criterion.upper()} (child strength: {data.get('strength', 'None')})"]
+    facts = list(data.get("evidence", []))
+    assessment = data.get("assessment", "")
+    if max_chars is None:
+        lines.extend(f"- {fact}" for fact in facts)
+        if assessment:
+            lines.append(f"{ASSESSMENT_PREFIX}{assessment}")
+        return lines
+
+    # Each line also costs its newline
+    budget = max_chars - len(lines[0]) - 1
+    if assessment:
+        # The justification gets at most a third of the share, the facts the rest
+        assessment_chars = min(len(assessment), budget // 3 - len(ASSESSMENT_PREFIX) - 1)
+        if assessment_chars >= MIN_FACT_CHARS:
+            assessment = _clip(assessment, assessment_chars)
+            budget -= len(ASSESSMENT_PREFIX) + len(assessment) + 1
+        else:
+            assessment = ""
+
+    # Drop facts from the end until each remaining one can keep at least MIN_FACT_CHARS
+    count = min(len(facts), max(budget, 0) // (MIN_FACT_CHARS + 3))
+    if count:
+        fact_chars = budget // count - 3
+        lines.extend(f"- {_clip(fact, fact_chars)}" for fact in facts[:count])
+    if assessment:
+        lines.append(f"{ASSESSMENT_PREFIX}{assessment}")
+    return lines
+
+
+def format_case_digest(digest: Dict[str, Any], max_tokens: int = 2000) -> str:
+    """
+    Render the digest as compact text for prompts, bounded to max_tokens.
+
+    The budget is split across the criteria rather than cut from the end, so
+    every criterion keeps its heading and strength; a criterion needing less
+    than its equal share leaves the rest to the others.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    candidate = digest.get("candidate", {})
+    header = "\n".join([
+        f"Candidate: {candidate.get('name', 'Unknown')}",
+        f"Fields: {', '.join(candidate.get('fields', [])) or 'unknown'}",
+        f"Recent roles: {'; '.join(candidate.get('recent_roles', [])) or 'none listed'}",
+        f"Education: {'; '.join(candidate.get('education', [])) or 'none listed'}",
+        f"Skills: {', '.join(candidate.get('skills', [])) or 'none listed'}"
+    ])
+    header = _clip_block(header, max_chars // 5)
+
+    criteria = digest.get("criteria", {})
+    natural = {criterion: len("\n".join(_render_criterion(criterion, data))) + 1 for criterion, data in criteria.items()}
+    # Smallest sections first: whatever they leave of their equal share goes to the larger ones
+    remaining = max_chars - len(header)
+    shares = {}
+    for index, criterion in enumerate(sorted(natural, key=natural.get)):
+        shares[criterion] = min(natural[criterion], remaining // (len(natural) - index))
+        remaining -= shares[criterion]
+
+    lines = [header]
+    for criterion, data in criteria.items():
+        lines.extend(_render_criterion(
+            criterion, data, None if shares[criterion] >= natural[criterion] else shares[criterion]
+        ))
+    return "\n".join(lines)
@@ -1,6 +1,8 @@
 # agents/child_agents/articles_agent.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.base_agent import create_child_agent_template
+from utils.checkpointing import invoke_checkpointed
+from agents.registry import agent_registry
 
 def create_articles_agent():
     """Create an agent specialized in assessing scholarly articles criterion"""
@@ -27,10 +29,12 @@ def create_articles_agent():
     
     return create_child_agent_template("articles", system_prompt)
 
-def evaluate_articles(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any]) -> Dict[str, Any]:
+agent_registry.register("articles", create_articles_agent)
+
+def evaluate_articles(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
     """Evaluate the scholarly articles criterion for an O-1A visa application"""
-    # Create the agent
-    articles_agent = create_articles_agent()
+    # Shared agent, built once per process
+    articles_agent = agent_registry.get("articles")
     
     # Initialize the state
     initial_state = {
@@ -41,7 +45,7 @@ def evaluate_articles(resume_data: Dict[str, Any], criterion_mapping: Dict[str,
     }
     
     # Run the agent
-    final_state = articles_agent.invoke(initial_state)
+    final_state = invoke_checkpointed(articles_agent, initial_state, run_id, "child:articles")
     
     # Return the assessment
     return final_state["assessment"]
@@ -1,6 +1,8 @@
 # agents/child_agents/awards_agent.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.base_agent import create_child_agent_template
+from utils.checkpointing import invoke_checkpointed
+from agents.registry import agent_registry
 
 def create_awards_agent():
     """Create an agent specialized in assessing awards criterion"""
@@ -27,10 +29,12 @@ def create_awards_agent():
     
     return create_child_agent_template("awards", system_prompt)
 
-def evaluate_awards(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any]) -> Dict[str, Any]:
+agent_registry.register("awards", create_awards_agent)
+
+def evaluate_awards(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
     """Evaluate the awards criterion for an O-1A visa application"""
-    # Create the agent
-    awards_agent = create_awards_agent()
+    # Shared agent, built once per process
+    awards_agent = agent_registry.get("awards")
     
     # Initialize the state
     initial_state = {
@@ -41,7 +45,7 @@ def evaluate_awards(resume_data: Dict[str, Any], criterion_mapping: Dict[str, An
     }
     
     # Run the agent
-    final_state = awards_agent.invoke(initial_state)
+    final_state = invoke_checkpointed(awards_agent, initial_state, run_id, "child:awards")
     
     # Return the assessment
     return final_state["assessment"]
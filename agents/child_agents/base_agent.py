@@ -1,24 +1,19 @@
 # agents/child_agents/base_agent.py
 from typing import Dict, Any, Annotated, TypedDict
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-import google.generativeai as genai
-import langgraph as lg
-from langgraph.graph import END, StateGraph
 from pydantic import BaseModel, Field
 import re
 import os
 from environs import Env
 import json
 from langchain_core.messages import HumanMessage
+from utils.knowledge_index import get_criterion_guidance
+from utils.checkpointing import get_checkpointer
+from utils.llm_pool import get_llm
 
 # Configure environment
 env = Env()
 env.read_env()  # Read .env file if it exists
-GOOGLE_API_KEY = env("GOOGLE_API_KEY", None)
-
-# Configure the API with your key
-genai.configure(api_key=GOOGLE_API_KEY)
 
 
 # Define the state for child agents
@@ -28,11 +23,11 @@ class ChildAgentState(TypedDict):
     assessment: Dict[str, Any]
     error: str
 
-def create_child_agent_template(criterion, system_prompt):
+def create_child_agent_template(criterion, system_prompt, guidance_max_tokens: int = 600):
     """Create a child agent for a specific criterion"""
     
-    # Initialize the Gemini model
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.7)
+    # Shared Gemini client, pooled across the eight criteria
+    llm = get_llm("gemini-2.0-flash", temperature=0.7)
     
     # Define the nodes in the graph
     def analyze_criterion(state: ChildAgentState) -> ChildAgentState:
@@ -41,10 +36,16 @@ def create_child_agent_template(criterion, system_prompt):
             resume_data = state["resume_data"]
             criterion_mapping = state["criterion_mapping"]
             
+            # Exact USCIS guidance for this criterion from the knowledge base
+            guidance = get_criterion_guidance(criterion, guidance_max_tokens)
+            
             # Create prompt combining system prompt and user instructions
             prompt = f"""
             {system_prompt}
             
+            USCIS STANDARDS FOR THIS CRITERION:
+            {guidance or "Not available"}
+            
             Please analyze this resume data for evidence of {criterion}.
             
             RESUME DATA:
@@ -181,6 +182,7 @@ def create_child_agent_template(criterion, system_prompt):
         return "validate_assessment"
     
     # Create the graph
+    from langgraph.graph import END, StateGraph
     workflow = StateGraph(ChildAgentState)
     
     # Add nodes
@@ -204,6 +206,6 @@ def create_child_agent_template(criterion, system_prompt):
     workflow.set_entry_point("analyze_criterion")
     
     # Compile the graph
-    child_agent = workflow.compile()
+    child_agent = workflow.compile(checkpointer=get_checkpointer())
     
     return child_agent
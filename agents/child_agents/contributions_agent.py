@@ -1,6 +1,8 @@
 # agents/child_agents/contributions_agent.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.base_agent import create_child_agent_template
+from utils.checkpointing import invoke_checkpointed
+from agents.registry import agent_registry
 
 def create_contributions_agent():
     """Create an agent specialized in assessing original contributions criterion"""
@@ -27,10 +29,12 @@ def create_contributions_agent():
     
     return create_child_agent_template("contributions", system_prompt)
 
-def evaluate_contributions(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any]) -> Dict[str, Any]:
+agent_registry.register("contributions", create_contributions_agent)
+
+def evaluate_contributions(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
     """Evaluate the original contributions criterion for an O-1A visa application"""
-    # Create the agent
-    contributions_agent = create_contributions_agent()
+    # Shared agent, built once per process
+    contributions_agent = agent_registry.get("contributions")
     
     # Initialize the state
     initial_state = {
@@ -41,7 +45,7 @@ def evaluate_contributions(resume_data: Dict[str, Any], criterion_mapping: Dict[
     }
     
     # Run the agent
-    final_state = contributions_agent.invoke(initial_state)
+    final_state = invoke_checkpointed(contributions_agent, initial_state, run_id, "child:contributions")
     
     # Return the assessment
     return final_state["assessment"]
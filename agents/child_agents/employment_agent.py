@@ -1,6 +1,8 @@
 # agents/child_agents/employment_agent.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.base_agent import create_child_agent_template
+from utils.checkpointing import invoke_checkpointed
+from agents.registry import agent_registry
 
 def create_employment_agent():
     """Create an agent specialized in assessing employment criterion"""
@@ -27,10 +29,12 @@ def create_employment_agent():
     
     return create_child_agent_template("employment", system_prompt)
 
-def evaluate_employment(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any]) -> Dict[str, Any]:
+agent_registry.register("employment", create_employment_agent)
+
+def evaluate_employment(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
     """Evaluate the critical employment criterion for an O-1A visa application"""
-    # Create the agent
-    employment_agent = create_employment_agent()
+    # Shared agent, built once per process
+    employment_agent = agent_registry.get("employment")
     
     # Initialize the state
     initial_state = {
@@ -41,7 +45,7 @@ def evaluate_employment(resume_data: Dict[str, Any], criterion_mapping: Dict[str
     }
     
     # Run the agent
-    final_state = employment_agent.invoke(initial_state)
+    final_state = invoke_checkpointed(employment_agent, initial_state, run_id, "child:employment")
     
     # Return the assessment
     return final_state["assessment"]
@@ -1,6 +1,8 @@
 # agents/child_agents/judging_agent.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.base_agent import create_child_agent_template
+from utils.checkpointing import invoke_checkpointed
+from agents.registry import agent_registry
 
 def create_judging_agent():
     """Create an agent specialized in assessing judging criterion"""
@@ -27,10 +29,12 @@ def create_judging_agent():
     
     return create_child_agent_template("judging", system_prompt)
 
-def evaluate_judging(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any]) -> Dict[str, Any]:
+agent_registry.register("judging", create_judging_agent)
+
+def evaluate_judging(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
     """Evaluate the judging criterion for an O-1A visa application"""
-    # Create the agent
-    judging_agent = create_judging_agent()
+    # Shared agent, built once per process
+    judging_agent = agent_registry.get("judging")
     
     # Initialize the state
     initial_state = {
@@ -41,7 +45,7 @@ def evaluate_judging(resume_data: Dict[str, Any], criterion_mapping: Dict[str, A
     }
     
     # Run the agent
-    final_state = judging_agent.invoke(initial_state)
+    final_state = invoke_checkpointed(judging_agent, initial_state, run_id, "child:judging")
     
     # Return the assessment
     return final_state["assessment"]
@@ -1,6 +1,8 @@
 # agents/child_agents/membership_agent.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.base_agent import create_child_agent_template
+from utils.checkpointing import invoke_checkpointed
+from agents.registry import agent_registry
 
 def create_membership_agent():
     """Create an agent specialized in assessing membership criterion"""
@@ -27,10 +29,12 @@ def create_membership_agent():
     
     return create_child_agent_template("membership", system_prompt)
 
-def evaluate_membership(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any]) -> Dict[str, Any]:
+agent_registry.register("membership", create_membership_agent)
+
+def evaluate_membership(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
     """Evaluate the membership criterion for an O-1A visa application"""
-    # Create the agent
-    membership_agent = create_membership_agent()
+    # Shared agent, built once per process
+    membership_agent = agent_registry.get("membership")
     
     # Initialize the state
     initial_state = {
@@ -41,7 +45,7 @@ def evaluate_membership(resume_data: Dict[str, Any], criterion_mapping: Dict[str
     }
     
     # Run the agent
-    final_state = membership_agent.invoke(initial_state)
+    final_state = invoke_checkpointed(membership_agent, initial_state, run_id, "child:membership")
     
     # Return the assessment
     return final_state["assessment"]
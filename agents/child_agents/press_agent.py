@@ -1,6 +1,8 @@
 # agents/child_agents/press_agent.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.base_agent import create_child_agent_template
+from utils.checkpointing import invoke_checkpointed
+from agents.registry import agent_registry
 
 def create_press_agent():
     """Create an agent specialized in assessing press coverage criterion"""
@@ -27,10 +29,12 @@ def create_press_agent():
     
     return create_child_agent_template("press", system_prompt)
 
-def evaluate_press(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any]) -> Dict[str, Any]:
+agent_registry.register("press", create_press_agent)
+
+def evaluate_press(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
     """Evaluate the press coverage criterion for an O-1A visa application"""
-    # Create the agent
-    press_agent = create_press_agent()
+    # Shared agent, built once per process
+    press_agent = agent_registry.get("press")
     
     # Initialize the state
     initial_state = {
@@ -41,7 +45,7 @@ def evaluate_press(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any
     }
     
     # Run the agent
-    final_state = press_agent.invoke(initial_state)
+    final_state = invoke_checkpointed(press_agent, initial_state, run_id, "child:press")
     
     # Return the assessment
     return final_state["assessment"]
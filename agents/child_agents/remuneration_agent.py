@@ -1,6 +1,8 @@
 # agents/child_agents/remuneration_agent.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.child_agents.base_agent import create_child_agent_template
+from utils.checkpointing import invoke_checkpointed
+from agents.registry import agent_registry
 
 def create_remuneration_agent():
     """Create an agent specialized in assessing remuneration criterion"""
@@ -27,10 +29,12 @@ def create_remuneration_agent():
     
     return create_child_agent_template("remuneration", system_prompt)
 
-def evaluate_remuneration(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any]) -> Dict[str, Any]:
+agent_registry.register("remuneration", create_remuneration_agent)
+
+def evaluate_remuneration(resume_data: Dict[str, Any], criterion_mapping: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
     """Evaluate the high remuneration criterion for an O-1A visa application"""
-    # Create the agent
-    remuneration_agent = create_remuneration_agent()
+    # Shared agent, built once per process
+    remuneration_agent = agent_registry.get("remuneration")
     
     # Initialize the state
     initial_state = {
@@ -41,7 +45,7 @@ def evaluate_remuneration(resume_data: Dict[str, Any], criterion_mapping: Dict[s
     }
     
     # Run the agent
-    final_state = remuneration_agent.invoke(initial_state)
+    final_state = invoke_checkpointed(remuneration_agent, initial_state, run_id, "child:remuneration")
     
     # Return the assessment
     return final_state["assessment"]
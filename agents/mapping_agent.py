@@ -1,21 +1,20 @@
 # agents/mapping_agent.py
 from typing import Dict, Any, List, Annotated, TypedDict, Optional
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-import langgraph as lg
-from langgraph.graph import END, StateGraph
 from pydantic import BaseModel, Field
-import google.generativeai as genai
 import os
 from environs import Env
 
+from utils.checkpointing import get_checkpointer, invoke_checkpointed
+from utils.llm_pool import get_llm
+from utils.metrics import fallbacks
+from utils.rate_limiter import llm_priority
+from utils.deadlines import deadline_scope
+from agents.registry import agent_registry
+
 # Configure environment
 env = Env()
 env.read_env()  # Read .env file if it exists
-GOOGLE_API_KEY = env("GOOGLE_API_KEY", None)
-
-# Configure the API with your key
-genai.configure(api_key=GOOGLE_API_KEY)
 
 # Define state for the Experience Mapping Agent
 class MappingAgentState(TypedDict):
@@ -34,11 +33,11 @@ class CriterionEvidence(BaseModel):
 def create_experience_mapping_agent(model_name: str = "gemini-2.0-flash"):
     # Initialize the LLM with proper error handling
     try:
-        llm = ChatGoogleGenerativeAI(model=model_name, temperature=0.7)
+        llm = get_llm(model_name, temperature=0.7)
         print(f"Initialized {model_name}")
     except Exception as e:
         print(f"Error initializing {model_name}: {str(e)}")
-        llm = ChatGoogleGenerativeAI(model="gemini-pro", temperature=0.7)
+        llm = get_llm("gemini-pro", temperature=0.7)
         print("Falling back to gemini-pro")
 
     # Define the system prompt
@@ -216,7 +215,6 @@ def create_experience_mapping_agent(model_name: str = "gemini-2.0-flash"):
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=user_prompt)
             ]
-            llm = genai.GenerativeModel(model_name="gemini-2.0-flash")
             response = llm.invoke(messages)
             
             # Extract JSON from response
@@ -266,6 +264,7 @@ def create_experience_mapping_agent(model_name: str = "gemini-2.0-flash"):
         """Handle errors in the mapping process."""
         structured_resume = state["structured_resume"]
         error = state["error"]
+        fallbacks.inc(path="mapping_handle_error")
         
         # Create a simplified mapping as fallback
         try:
@@ -328,6 +327,7 @@ def create_experience_mapping_agent(model_name: str = "gemini-2.0-flash"):
             }
 
     # Create the graph
+    from langgraph.graph import END, StateGraph
     workflow = StateGraph(MappingAgentState)
     
     # Add nodes
@@ -362,15 +362,22 @@ def create_experience_mapping_agent(model_name: str = "gemini-2.0-flash"):
     workflow.set_entry_point("map_experiences")
     
     # Compile the graph
-    mapping_agent = workflow.compile()
+    mapping_agent = workflow.compile(checkpointer=get_checkpointer())
     
     return mapping_agent
 
+agent_registry.register("mapping", create_experience_mapping_agent)
+
 # Function to map resume experiences to O-1A criteria
-def map_resume_to_criteria(structured_resume: Dict[str, Any]) -> Dict[str, Any]:
-    """Map a structured resume to O-1A criteria."""
-    # Create the agent
-    mapping_agent = create_experience_mapping_agent()
+def map_resume_to_criteria(structured_resume: Dict[str, Any], run_id: Optional[str] = None, deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Map a structured resume to O-1A criteria.
+    
+    A retry with the same run_id resumes the run; once deadline_seconds (or an enclosing
+    request deadline) has passed, LLM calls fail fast to the deterministic fallback mapping.
+    """
+    # Shared agent, built once per process
+    mapping_agent = agent_registry.get("mapping")
     
     # Initialize the state
     initial_state = {
@@ -380,7 +387,8 @@ def map_resume_to_criteria(structured_resume: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     # Run the agent
-    final_state = mapping_agent.invoke(initial_state)
+    with llm_priority(stage="mapping"), deadline_scope(deadline_seconds):
+        final_state = invoke_checkpointed(mapping_agent, initial_state, run_id, "mapping")
     
     # Return the criteria mapping
     return final_state["criteria_mapping"]
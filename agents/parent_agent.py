@@ -1,19 +1,107 @@
 # agents/parent_agent.py
-from typing import Dict, Any, List, TypedDict, Optional, Tuple
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
-import langgraph as lg
-from langgraph.graph import END, StateGraph
-from pydantic import BaseModel, Field
+from typing import Dict, Any, List, TypedDict, Optional, Tuple, Annotated
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field, BeforeValidator
 import os
 import json
+import logging
 
-from sentence_transformers import SentenceTransformer
+from environs import Env
 
+from agents.case_digest import build_case_digest, format_case_digest
+from agents.rating_engine import rate_assessment
+from utils.knowledge_index import estimate_tokens
+from utils.knowledge_base import KnowledgeBase
+from utils.checkpointing import get_checkpointer, invoke_checkpointed
+from utils.llm_pool import get_llm
+from utils.metrics import fallbacks
+from utils.rate_limiter import llm_priority
+from utils.deadlines import deadline_scope
+from agents.registry import agent_registry
+from utils.knowledge_index import CRITERIA_ORDER, get_criterion_guidance, get_field_guidance, get_knowledge_index, detect_fields
+
+logger = logging.getLogger(__name__)
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+
+
+# Reducers for state keys written by parallel branches
+def merge_analyses(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge interim analyses produced by concurrent stages."""
+    return {**(left or {}), **(right or {})}
+
+def merge_errors(left: str, right: str) -> str:
+    """Combine errors from concurrent stages; an empty update clears the error."""
+    if not right:
+        return ""
+    if left and right not in left:
+        return f"{left}; {right}"
+    return right
+
+def latest_stage(left: str, right: str) -> str:
+    """Keep the most recently completed stage."""
+    return right or left
+
+# Structured output for the single-call fast determination
+class FastDetermination(BaseModel):
+    justification: str = Field(
+        description="Concise justification of the rating with references to USCIS standards"
+    )
+    criteria_summary: Dict[str, str] = Field(
+        description="One-sentence summary of the evidence for each criterion, keyed by criterion"
+    )
+
+# Bounded intermediate outputs: strings and lists are clipped so that a verbose
+# response cannot inflate the final determination prompt
+def _clip_chars(max_chars: int) -> BeforeValidator:
+    return BeforeValidator(lambda value: value[:max_chars] if isinstance(value, str) else value)
+
+def _clip_items(max_items: int) -> BeforeValidator:
+    return BeforeValidator(lambda value: value[:max_items] if isinstance(value, list) else value)
+
+ShortText = Annotated[str, _clip_chars(160)]
+
+class InitialAnalysis(BaseModel):
+    primary_field: Annotated[str, _clip_chars(80)] = Field(
+        description="The applicant's primary field of expertise in a few words"
+    )
+    promising_criteria: Annotated[List[Annotated[str, _clip_chars(20)]], _clip_items(5)] = Field(
+        description="Up to 5 criterion keys with the most promising evidence"
+    )
+    challenges: Annotated[List[ShortText], _clip_items(3)] = Field(
+        description="Up to 3 short notes on weaknesses of the application"
+    )
+
+class CriterionReview(BaseModel):
+    criterion: Annotated[str, _clip_chars(20)] = Field(description="Criterion key")
+    meets_standard: bool = Field(description="Whether the evidence meets the USCIS standard")
+    concern: ShortText = Field(description="One sentence on the main concern, or empty")
+
+class ChildAssessmentAnalysis(BaseModel):
+    reviews: Annotated[List[CriterionReview], _clip_items(8)] = Field(
+        description="One review per assessed criterion"
+    )
+
+class CrossReferenceAnalysis(BaseModel):
+    multi_criteria_evidence: Annotated[List[ShortText], _clip_items(4)] = Field(
+        description="Up to 4 pieces of evidence that support several criteria, naming the criteria"
+    )
+    inconsistencies: Annotated[List[ShortText], _clip_items(3)] = Field(
+        description="Up to 3 inconsistencies between criteria"
+    )
+    overlooked_evidence: Annotated[List[ShortText], _clip_items(3)] = Field(
+        description="Up to 3 pieces of resume evidence the child agents missed"
+    )
+
+# Output token cap per LLM stage
+STAGE_MAX_OUTPUT_TOKENS = {
+    "initial_analysis": 256,
+    "analyze_child_assessments": 768,
+    "cross_reference_criteria": 512,
+    "final_determination": 1024
+}
 
 # Define state for the parent agent
 class ParentAgentState(TypedDict):
@@ -21,16 +109,39 @@ class ParentAgentState(TypedDict):
     criteria_mapping: Dict[str, Any]
     child_assessments: Dict[str, Dict[str, Any]]
     rag_context: List[str]
-    interim_analyses: Dict[str, Any]
+    interim_analyses: Annotated[Dict[str, Any], merge_analyses]
     final_assessment: Dict[str, Any]
-    error: str
-    stage: str
+    error: Annotated[str, merge_errors]
+    stage: Annotated[str, latest_stage]
+    skipped_stages: List[str]
+    case_digest: str
+    stage_metrics: Annotated[Dict[str, Any], merge_analyses]
+
+# LLM stages that early termination can skip
+LLM_STAGES = [
+    "initial_analysis", "analyze_child_assessments", "cross_reference_criteria",
+    "final_determination"
+]
 
 class ParentAgent:
-    def __init__(self, model_name: str = "gemini-2.0-flash"):
-        self.llm = ChatGoogleGenerativeAI(model=model_name, temperature=0)
+    def __init__(self, model_name: str = "gemini-2.0-flash", guidance_max_tokens: int = 1200, early_exit_threshold: Optional[int] = None, digest_max_tokens: int = 2000, stage_max_output_tokens: Optional[Dict[str, int]] = None):
+        self.llm = get_llm(model_name, temperature=0)
+        # Each LLM stage gets its own pooled client so its output length is capped
+        self.stage_max_output_tokens = {**STAGE_MAX_OUTPUT_TOKENS, **(stage_max_output_tokens or {})}
+        self.stage_llms = {
+            stage: get_llm(model_name, temperature=0, max_output_tokens=max_tokens)
+            for stage, max_tokens in self.stage_max_output_tokens.items()
+        }
+        self.guidance_max_tokens = guidance_max_tokens
+        self.digest_max_tokens = digest_max_tokens
+        # Skip the LLM stages when fewer than this many criteria are moderate or strong (0 disables)
+        if early_exit_threshold is None:
+            early_exit_threshold = env.int("PARENT_EARLY_EXIT_THRESHOLD", 1)
+        self.early_exit_threshold = early_exit_threshold
         self.system_prompt = self._get_system_prompt()
         self.vectorstore = self._setup_knowledge_base()
+        # Parse the criterion and field guidance now rather than on the first request (and before workers fork)
+        get_knowledge_index()
         self.workflow = self._create_workflow()
     
     def _get_system_prompt(self) -> str:
@@ -56,49 +167,21 @@ class ParentAgent:
     
     def _setup_knowledge_base(self):
         """Set up the RAG knowledge base for O-1A requirements."""
-        # Check if we have a persisted vector store
-        persist_directory = "./knowledge_base/chroma_db"
-        
-        try:
-            if os.path.exists(persist_directory):
-                model = SentenceTransformer('all-MiniLM-L6-v2')
-                embeddings = model.encode(["Hello world!", "O-1A visa requirements"], show_progress_bar=True)
-
-                # Load existing vector store
-                # embeddings = OpenAIEmbeddings()
-                return Chroma(persist_directory=persist_directory, embedding_function=embeddings)
-        except:
-            pass
-            
-        # Create new vector store if it doesn't exist
         try:
             # Load the knowledge base document
             knowledge_base_path = "./knowledge_base/o1a_requirements.md"
             if not os.path.exists(knowledge_base_path):
                 # Create a minimal knowledge base document if it doesn't exist
                 self._create_minimal_knowledge_base(knowledge_base_path)
-                
-            with open(knowledge_base_path, "r") as f:
-                knowledge_base_text = f.read()
-            
-            # Split the text into chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                separators=["\n# ", "\n## ", "\n### ", "\n#### ", "\n", " ", ""]
-            )
-            docs = text_splitter.create_documents([knowledge_base_text])
-            
-            # Create embeddings and store in vector database
-            embeddings = OpenAIEmbeddings()
-            os.makedirs(os.path.dirname(persist_directory), exist_ok=True)
-            vectorstore = Chroma.from_documents(
-                documents=docs,
-                embedding=embeddings,
-                persist_directory=persist_directory
-            )
             
-            return vectorstore
+            # Only added or modified chunks are embedded, removed chunks are evicted
+            knowledge_base = KnowledgeBase(knowledge_base_path)
+            
+            # Optionally pick up edits to the knowledge base without restarting
+            if env.bool("KB_HOT_RELOAD", False):
+                knowledge_base.start_watching(env.float("KB_RELOAD_INTERVAL", 5.0))
+            
+            return knowledge_base
         except Exception as e:
             print(f"Error setting up knowledge base: {str(e)}")
             # Return None if setup fails, agent will work without RAG
@@ -135,14 +218,22 @@ class ParentAgent:
             return ["Knowledge base unavailable"]
         
         try:
-            docs = self.vectorstore.similarity_search(query, k=k)
-            return [doc.page_content for doc in docs]
+            return self.vectorstore.similarity_search(query, k=k)
         except Exception as e:
             print(f"Error querying knowledge base: {str(e)}")
             return ["Error retrieving information from knowledge base"]
     
+    def get_criteria_guidance(self, criteria: List[str]) -> str:
+        """Get the exact USCIS guidance for the given criteria, sharing the guidance token budget."""
+        if not criteria:
+            return ""
+        per_criterion = self.guidance_max_tokens // len(criteria)
+        sections = [get_criterion_guidance(criterion, per_criterion) for criterion in criteria]
+        return "\n\n".join(section for section in sections if section)
+    
     def _create_workflow(self):
         """Create the workflow for the parent agent."""
+        from langgraph.graph import END, START, StateGraph
         workflow = StateGraph(ParentAgentState)
         
         # Add nodes
@@ -150,59 +241,138 @@ class ParentAgent:
         workflow.add_node("retrieve_context", self.retrieve_context)
         workflow.add_node("analyze_child_assessments", self.analyze_child_assessments)
         workflow.add_node("cross_reference_criteria", self.cross_reference_criteria)
+        workflow.add_node("join_analyses", self.join_analyses)
         workflow.add_node("final_determination", self.final_determination)
-        workflow.add_node("generate_recommendations", self.generate_recommendations)
         workflow.add_node("handle_error", self.handle_error)
+        workflow.add_node("early_determination", self.early_determination)
+        workflow.add_node("build_case_digest", self.build_case_digest)
         
-        # Add edges
-        workflow.add_edge("initial_analysis", "retrieve_context")
-        workflow.add_edge("retrieve_context", "analyze_child_assessments")
-        workflow.add_edge("analyze_child_assessments", "cross_reference_criteria")
-        workflow.add_edge("cross_reference_criteria", "final_determination")
-        workflow.add_edge("final_determination", "generate_recommendations")
-        workflow.add_edge("generate_recommendations", END)
-        
-        # Error handling edges
-        workflow.add_edge("handle_error", "final_determination")
-        
-        # Conditional edges for error handling
-        def should_handle_error(state: ParentAgentState) -> bool:
-            return bool(state.get("error", ""))
-        
+        # Clear-cut LOW cases skip every LLM stage; otherwise the case digest and
+        # static retrieval run first since they need no LLM output and are cheap
         workflow.add_conditional_edges(
-            "initial_analysis",
-            lambda state: "handle_error" if should_handle_error(state) else "retrieve_context",
+            START,
+            self.route_start,
             {
-                "handle_error": "handle_error",
-                "retrieve_context": "retrieve_context"
+                "early_determination": "early_determination",
+                "build_case_digest": "build_case_digest"
             }
         )
-
+        workflow.add_edge("early_determination", END)
+        workflow.add_edge("build_case_digest", "retrieve_context")
         
-        workflow.add_conditional_edges(
-            "retrieve_context",
-            lambda state: "handle_error" if should_handle_error(state) else "analyze_child_assessments",
-            {
-                "handle_error": "handle_error",
-                "analyze_child_assessments": "analyze_child_assessments"
-            }
+        # Fan out: the three analysis branches do not depend on each other
+        workflow.add_edge("retrieve_context", "initial_analysis")
+        workflow.add_edge("retrieve_context", "analyze_child_assessments")
+        workflow.add_edge("retrieve_context", "cross_reference_criteria")
+        
+        # Fan in: wait for every branch before the final determination
+        workflow.add_edge(
+            ["initial_analysis", "analyze_child_assessments", "cross_reference_criteria"],
+            "join_analyses"
         )
-
+        
+        # Conditional edge for error handling
         workflow.add_conditional_edges(
-            "analyze_child_assessments",
-            lambda state: "handle_error" if should_handle_error(state) else "cross_reference_criteria",
+            "join_analyses",
+            lambda state: "handle_error" if state.get("error", "") else "final_determination",
             {
                 "handle_error": "handle_error",
-                "cross_reference_criteria": "cross_reference_criteria"
+                "final_determination": "final_determination"
             }
         )
-
         
-        # Set entry point
-        workflow.set_entry_point("initial_analysis")
+        # Error handling edge
+        workflow.add_edge("handle_error", "final_determination")
+        
+        # Recommendations are generated on demand, off the critical path
+        workflow.add_edge("final_determination", END)
+        
+        # Compile the graph; checkpoints let a retried run resume from the last completed node
+        return workflow.compile(checkpointer=get_checkpointer())
+    
+    def route_start(self, state: ParentAgentState) -> str:
+        """Route to the early determination when no LLM stage can change the outcome."""
+        if self.early_exit_threshold <= 0 or not state.get("structured_resume") or not state.get("criteria_mapping"):
+            return "build_case_digest"
         
-        # Compile the graph
-        return workflow.compile()
+        rating_result = rate_assessment(state.get("child_assessments", {}))
+        met_count = rating_result["strong_count"] + rating_result["moderate_count"]
+        if rating_result["rating"] == "LOW" and met_count < self.early_exit_threshold:
+            return "early_determination"
+        return "build_case_digest"
+    
+    def early_determination(self, state: ParentAgentState) -> Dict[str, Any]:
+        """Deterministic final assessment used when the LLM stages are skipped."""
+        rating_result = rate_assessment(state.get("child_assessments", {}))
+        criteria_strengths = rating_result["criteria_summary"]
+        
+        return {
+            "final_assessment": {
+                "rating": rating_result["rating"],
+                "justification": f"{rating_result['explanation']}. Fewer than {self.early_exit_threshold} criteria have moderate or strong evidence, so the detailed analysis stages were skipped.",
+                "criteria_summary": criteria_strengths,
+                "rating_breakdown": rating_result,
+                "recommendations": self.basic_recommendations({"criteria_summary": criteria_strengths})
+            },
+            "skipped_stages": LLM_STAGES,
+            "stage": "early_determination",
+            "error": ""
+        }
+    
+    def build_case_digest(self, state: ParentAgentState) -> Dict[str, Any]:
+        """Build the compact case digest shared by every LLM stage."""
+        digest = build_case_digest(
+            state.get("structured_resume", {}),
+            state.get("criteria_mapping", {}),
+            state.get("child_assessments", {})
+        )
+        return {
+            "case_digest": format_case_digest(digest, self.digest_max_tokens),
+            "stage": "build_case_digest"
+        }
+    
+    def _stage_metrics(self, stage: str, messages: List[Any], response: Any = None) -> Dict[str, Any]:
+        """Record the input and output tokens of a stage, estimated when the model reports no usage."""
+        usage = getattr(response, "usage_metadata", None) or {}
+        input_tokens = usage.get("input_tokens") or sum(estimate_tokens(str(message.content)) for message in messages)
+        output_tokens = usage.get("output_tokens") or (estimate_tokens(str(response.content)) if response is not None else 0)
+        return {stage: {"input_tokens": input_tokens, "output_tokens": output_tokens}}
+    
+    def _invoke_structured(self, stage: str, schema: type, messages: List[Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Run a stage with schema-constrained, length-capped output; returns the parsed fields and stage metrics."""
+        result = self.stage_llms[stage].with_structured_output(schema, include_raw=True).invoke(messages)
+        if result.get("parsed") is None:
+            raise ValueError(f"Could not parse {stage} output: {result.get('parsing_error')}")
+        return result["parsed"].model_dump(), self._stage_metrics(stage, messages, result.get("raw"))
+    
+    def format_interim_analyses(self, interim_analyses: Dict[str, Any]) -> str:
+        """Render the structured stage outputs as compact text for the final determination."""
+        lines = []
+        
+        initial = interim_analyses.get("initial_analysis")
+        if initial:
+            lines.append(f"Primary field: {initial.get('primary_field', '')}")
+            lines.append(f"Most promising criteria: {', '.join(initial.get('promising_criteria', [])) or 'none'}")
+            lines.extend(f"Challenge: {challenge}" for challenge in initial.get("challenges", []))
+        
+        child_analysis = interim_analyses.get("child_assessment_analysis")
+        if child_analysis:
+            for review in child_analysis.get("reviews", []):
+                verdict = "meets standard" if review.get("meets_standard") else "does not meet standard"
+                concern = f" ({review['concern']})" if review.get("concern") else ""
+                lines.append(f"{review.get('criterion', '')}: {verdict}{concern}")
+        
+        cross_reference = interim_analyses.get("cross_reference_analysis")
+        if cross_reference:
+            lines.extend(f"Supports several criteria: {item}" for item in cross_reference.get("multi_criteria_evidence", []))
+            lines.extend(f"Inconsistency: {item}" for item in cross_reference.get("inconsistencies", []))
+            lines.extend(f"Overlooked: {item}" for item in cross_reference.get("overlooked_evidence", []))
+        
+        return "\n".join(lines) or "Not available"
+    
+    def join_analyses(self, state: ParentAgentState) -> Dict[str, Any]:
+        """Synchronisation point for the concurrent analysis branches."""
+        return {}
     
     def initial_analysis(self, state: ParentAgentState) -> ParentAgentState:
         """Initial analysis of the structured resume and criteria mapping."""
@@ -212,17 +382,17 @@ class ParentAgent:
             
             # Validate input
             if not structured_resume:
-                return {**state, "error": "Structured resume is missing or empty"}
+                return {"error": "Structured resume is missing or empty", "stage": "initial_analysis"}
             
             if not criteria_mapping:
-                return {**state, "error": "Criteria mapping is missing or empty"}
+                return {"error": "Criteria mapping is missing or empty", "stage": "initial_analysis"}
             
             # Create prompt for the LLM
             user_prompt = f"""
-            Please perform an initial analysis of this structured resume for O-1A visa assessment:
+            Please perform an initial analysis of this case for O-1A visa assessment:
             
             ```
-            {json.dumps(structured_resume, indent=2)}
+            {state.get("case_digest", "")}
             ```
             
             Focus on:
@@ -230,7 +400,7 @@ class ParentAgent:
             2. Determining the most promising criteria based on the resume
             3. Noting any potential challenges or weaknesses in the application
             
-            Provide a concise analysis that will guide our detailed criteria assessment.
+            Keep every field short; this guides our detailed criteria assessment.
             """
             
             # Get response from LLM
@@ -238,59 +408,58 @@ class ParentAgent:
                 SystemMessage(content=self.system_prompt),
                 HumanMessage(content=user_prompt)
             ]
-            response = self.llm.invoke(messages)
+            analysis, metrics = self._invoke_structured("initial_analysis", InitialAnalysis, messages)
             
             return {
-                **state,
-                "interim_analyses": {"initial_analysis": response.content},
-                "stage": "initial_analysis",
-                "error": ""
+                "interim_analyses": {"initial_analysis": analysis},
+                "stage_metrics": metrics,
+                "stage": "initial_analysis"
             }
             
         except Exception as e:
-            return {**state, "error": f"Error in initial analysis: {str(e)}"}
+            return {"error": f"Error in initial analysis: {str(e)}", "stage": "initial_analysis"}
     
     def retrieve_context(self, state: ParentAgentState) -> ParentAgentState:
         """Retrieve relevant context from the knowledge base."""
         try:
-            # Extract the field of expertise from the initial analysis
-            initial_analysis = state.get("interim_analyses", {}).get("initial_analysis", "")
+            # Derive the field of expertise from the resume itself so retrieval
+            # can run concurrently with the initial analysis
+            structured_resume = state.get("structured_resume", {})
+            field_text = json.dumps({
+                "skills": structured_resume.get("skills", []),
+                "workExperience": [item.get("title", "") for item in structured_resume.get("workExperience", []) if isinstance(item, dict)],
+                "education": [item.get("field", "") for item in structured_resume.get("education", []) if isinstance(item, dict)]
+            })
             
-            # Generate queries based on the initial analysis
+            # Generate static queries
             queries = [
                 "O-1A visa requirements and standards",
                 "Evidence evaluation for O-1A visa applications",
                 "USCIS policy on extraordinary ability"
             ]
             
-            # Add more specific queries based on the initial analysis
-            if "science" in initial_analysis.lower() or "research" in initial_analysis.lower():
-                queries.append("O-1A requirements for scientists and researchers")
-            
-            if "business" in initial_analysis.lower() or "entrepreneur" in initial_analysis.lower():
-                queries.append("O-1A requirements for business professionals and entrepreneurs")
-            
-            if "tech" in initial_analysis.lower() or "software" in initial_analysis.lower():
-                queries.append("O-1A requirements for technology professionals")
+            # Field-specific considerations come straight from the section index
+            rag_context = []
+            for field in detect_fields(field_text):
+                field_guidance = get_field_guidance(field)
+                if field_guidance:
+                    rag_context.append(field_guidance)
             
             # Retrieve context for each query
-            rag_context = []
             for query in queries:
                 contexts = self.query_knowledge_base(query)
                 rag_context.extend(contexts)
             
-            # Deduplicate context
-            rag_context = list(set(rag_context))
+            # Deduplicate context, keeping the field guidance first
+            rag_context = list(dict.fromkeys(rag_context))
             
             return {
-                **state,
                 "rag_context": rag_context,
-                "stage": "retrieve_context",
-                "error": ""
+                "stage": "retrieve_context"
             }
             
         except Exception as e:
-            return {**state, "error": f"Error retrieving context: {str(e)}"}
+            return {"error": f"Error retrieving context: {str(e)}", "stage": "retrieve_context"}
     
     def analyze_child_assessments(self, state: ParentAgentState) -> ParentAgentState:
         """Analyze the assessments from child agents."""
@@ -298,27 +467,25 @@ class ParentAgent:
             child_assessments = state.get("child_assessments", {})
             rag_context = state.get("rag_context", [])
             
-            # Combine relevant RAG context
-            combined_context = "\n\n".join(rag_context[:3])  # Limit to most relevant chunks
+            # Combine relevant RAG context with the exact standards for each assessed criterion
+            criteria = [c for c in CRITERIA_ORDER if c in child_assessments]
+            combined_context = "\n\n".join([self.get_criteria_guidance(criteria)] + rag_context[:3])
             
             # Create prompt for the LLM
             user_prompt = f"""
             Analyze the following assessments from specialized child agents for each O-1A criterion:
             
             ```
-            {json.dumps(child_assessments, indent=2)}
+            {state.get("case_digest", "")}
             ```
             
             Based on the following O-1A visa requirements:
             
             {combined_context}
             
-            For each criterion, provide:
-            1. A critical evaluation of the child agent's assessment
-            2. An assessment of whether the evidence meets USCIS standards
-            3. Any concerns about the quality or sufficiency of evidence
-            
-            Provide a detailed analysis for each criterion.
+            For each criterion, critically evaluate the child agent's assessment and provide:
+            1. Whether the evidence meets USCIS standards
+            2. The main concern about the quality or sufficiency of evidence, in one sentence
             """
             
             # Get response from LLM
@@ -326,28 +493,20 @@ class ParentAgent:
                 SystemMessage(content=self.system_prompt),
                 HumanMessage(content=user_prompt)
             ]
-            response = self.llm.invoke(messages)
+            analysis, metrics = self._invoke_structured("analyze_child_assessments", ChildAssessmentAnalysis, messages)
             
             return {
-                **state,
-                "interim_analyses": {
-                    **(state.get("interim_analyses", {})),
-                    "child_assessment_analysis": response.content
-                },
-                "stage": "analyze_child_assessments",
-                "error": ""
+                "interim_analyses": {"child_assessment_analysis": analysis},
+                "stage_metrics": metrics,
+                "stage": "analyze_child_assessments"
             }
             
         except Exception as e:
-            return {**state, "error": f"Error analyzing child assessments: {str(e)}"}
+            return {"error": f"Error analyzing child assessments: {str(e)}", "stage": "analyze_child_assessments"}
     
     def cross_reference_criteria(self, state: ParentAgentState) -> ParentAgentState:
         """Cross-reference evidence across different criteria."""
         try:
-            child_assessments = state.get("child_assessments", {})
-            interim_analyses = state.get("interim_analyses", {})
-            structured_resume = state.get("structured_resume", {})
-            
             # Create prompt for the LLM
             user_prompt = f"""
             Perform a cross-referencing analysis across the 8 O-1A criteria to identify:
@@ -356,17 +515,12 @@ class ParentAgent:
             2. Internal consistency of evidence across criteria
             3. Potentially overlooked evidence from the resume
             
-            Resume:
-            ```
-            {json.dumps(structured_resume, indent=2)}
-            ```
-            
-            Child Assessments:
+            Case Digest (resume evidence and child assessments per criterion):
             ```
-            {json.dumps(child_assessments, indent=2)}
+            {state.get("case_digest", "")}
             ```
             
-            Provide a comprehensive cross-reference analysis focusing on strengthening the O-1A case.
+            Keep each item to one sentence, focusing on what strengthens the O-1A case.
             """
             
             # Get response from LLM
@@ -374,70 +528,55 @@ class ParentAgent:
                 SystemMessage(content=self.system_prompt),
                 HumanMessage(content=user_prompt)
             ]
-            response = self.llm.invoke(messages)
+            analysis, metrics = self._invoke_structured("cross_reference_criteria", CrossReferenceAnalysis, messages)
             
             return {
-                **state,
-                "interim_analyses": {
-                    **interim_analyses,
-                    "cross_reference_analysis": response.content
-                },
-                "stage": "cross_reference_criteria",
-                "error": ""
+                "interim_analyses": {"cross_reference_analysis": analysis},
+                "stage_metrics": metrics,
+                "stage": "cross_reference_criteria"
             }
             
         except Exception as e:
-            return {**state, "error": f"Error cross-referencing criteria: {str(e)}"}
+            return {"error": f"Error cross-referencing criteria: {str(e)}", "stage": "cross_reference_criteria"}
     
     def final_determination(self, state: ParentAgentState) -> ParentAgentState:
         """Make the final determination about O-1A qualification."""
+        # The rating engine is authoritative; the LLM only writes the narrative
+        rating_result = rate_assessment(state.get("child_assessments", {}))
+        rating = rating_result["rating"]
+        criteria_strengths = rating_result["criteria_summary"]
+        
         try:
-            child_assessments = state.get("child_assessments", {})
             interim_analyses = state.get("interim_analyses", {})
             rag_context = state.get("rag_context", [])
             
-            # Extract strengths from child assessments
-            criteria_strengths = {}
-            for criterion, assessment in child_assessments.items():
-                if isinstance(assessment, dict) and "assessment" in assessment:
-                    strength = assessment["assessment"].get("strength", "None")
-                    criteria_strengths[criterion] = strength
-                else:
-                    criteria_strengths[criterion] = "None"
-            
             # Combine relevant RAG context for final determination
             combined_context = "\n\n".join(rag_context[:5])  # Include more context for final determination
             
             # Create prompt for the LLM
             user_prompt = f"""
-            Make a final determination about this applicant's qualification for an O-1A visa.
+            Write the final determination about this applicant's qualification for an O-1A visa.
+            
+            Overall Rating: {rating}
+            Rating Basis: {rating_result["explanation"]}
             
-            Criteria Strengths:
+            Case Digest:
             ```
-            {json.dumps(criteria_strengths, indent=2)}
+            {state.get("case_digest", "")}
             ```
             
-            Previous Analyses:
-            
-            Initial Analysis:
-            {interim_analyses.get("initial_analysis", "Not available")}
-            
-            Child Assessment Analysis:
-            {interim_analyses.get("child_assessment_analysis", "Not available")}
-            
-            Cross-Reference Analysis:
-            {interim_analyses.get("cross_reference_analysis", "Not available")}
+            Findings of the Previous Analyses:
+            {self.format_interim_analyses(interim_analyses)}
             
             O-1A Requirements and Standards:
             {combined_context}
             
-            Based on all available information, determine:
-            1. Overall Rating (HIGH, MEDIUM, or LOW)
-            2. Detailed justification with specific references to USCIS standards
-            3. Summary of evidence for each criterion
-            4. Overall strength of the application
+            The overall rating has already been determined by the rating rules. Provide:
+            1. Justification of the {rating} rating with specific references to USCIS standards
+            2. Summary of evidence for each criterion
+            3. Overall strength of the application
             
-            Your determination must be well-reasoned and supported by specific evidence and USCIS standards.
+            Your determination must be well-reasoned and supported by specific evidence and USCIS standards, in at most {self.stage_max_output_tokens["final_determination"] * 3 // 4} words.
             """
             
             # Get response from LLM
@@ -445,167 +584,101 @@ class ParentAgent:
                 SystemMessage(content=self.system_prompt),
                 HumanMessage(content=user_prompt)
             ]
-            response = self.llm.invoke(messages)
-            
-            # Extract rating from response
-            rating = self._extract_rating(response.content)
+            # The last call of a request goes ahead of new work
+            with llm_priority(stage="final"):
+                response = self.stage_llms["final_determination"].invoke(messages)
             
             # Prepare final assessment
             final_assessment = {
                 "rating": rating,
                 "justification": response.content,
-                "criteria_summary": criteria_strengths
+                "criteria_summary": criteria_strengths,
+                "rating_breakdown": rating_result
             }
             
             return {
-                **state,
                 "final_assessment": final_assessment,
+                "stage_metrics": self._stage_metrics("final_determination", messages, response),
                 "stage": "final_determination",
                 "error": ""
             }
             
         except Exception as e:
-            # Create a fallback rating based on child assessments if final determination fails
-            try:
-                child_assessments = state.get("child_assessments", {})
-                criteria_strengths = {}
-                
-                for criterion, assessment in child_assessments.items():
-                    if isinstance(assessment, dict) and "assessment" in assessment:
-                        strength = assessment["assessment"].get("strength", "None")
-                        criteria_strengths[criterion] = strength
-                    else:
-                        criteria_strengths[criterion] = "None"
-                
-                # Simple calculation
-                strong_count = sum(1 for s in criteria_strengths.values() if s == "Strong")
-                moderate_count = sum(1 for s in criteria_strengths.values() if s == "Moderate")
-                
-                if strong_count >= 3 or (strong_count + moderate_count) >= 5:
-                    rating = "HIGH"
-                elif (strong_count + moderate_count) >= 3:
-                    rating = "MEDIUM"
-                else:
-                    rating = "LOW"
-                
-                return {
-                    **state,
-                    "final_assessment": {
-                        "rating": rating,
-                        "justification": f"Rating based on {strong_count} strong and {moderate_count} moderate criteria. Error occurred: {str(e)}",
-                        "criteria_summary": criteria_strengths
-                    },
-                    "stage": "final_determination",
-                    "error": f"Error in final determination: {str(e)}"
-                }
-            except:
-                return {**state, "error": f"Error in final determination: {str(e)}"}
-    
-    def generate_recommendations(self, state: ParentAgentState) -> ParentAgentState:
-        """Generate recommendations for improving the application."""
-        try:
-            final_assessment = state.get("final_assessment", {})
-            child_assessments = state.get("child_assessments", {})
-            criteria_strengths = final_assessment.get("criteria_summary", {})
-            rating = final_assessment.get("rating", "LOW")
-            
-            # Create prompt for the LLM
-            user_prompt = f"""
-            Based on the final assessment (Rating: {rating}), generate specific recommendations for strengthening this O-1A visa application.
-            
-            Criteria Strengths:
-            ```
-            {json.dumps(criteria_strengths, indent=2)}
-            ```
-            
-            Focus on:
-            1. Specific improvements for weak criteria
-            2. Additional evidence needed for borderline criteria
-            3. Strategic advice for presenting the strongest case
-            4. Alternative visa categories if O-1A is not recommended
-            
-            Provide actionable, specific recommendations.
-            """
-            
-            # Get response from LLM
-            messages = [
-                SystemMessage(content=self.system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
-            response = self.llm.invoke(messages)
-            
-            # Update final assessment with recommendations
-            final_assessment["recommendations"] = response.content
-            
-            return {
-                **state,
-                "final_assessment": final_assessment,
-                "stage": "generate_recommendations",
-                "error": ""
-            }
-            
-        except Exception as e:
-            # Add basic recommendations if generation fails
-            final_assessment = state.get("final_assessment", {})
-            criteria_strengths = final_assessment.get("criteria_summary", {})
-            
-            weak_criteria = [c for c, s in criteria_strengths.items() if s in ["Weak", "None"]]
-            basic_recommendations = f"Consider strengthening evidence for: {', '.join(weak_criteria)}"
-            
-            final_assessment["recommendations"] = basic_recommendations
-            
+            # Fall back to the rating explanation if the narrative cannot be generated
             return {
-                **state,
-                "final_assessment": final_assessment,
-                "stage": "generate_recommendations",
-                "error": f"Error generating recommendations: {str(e)}"
+                "final_assessment": {
+                    "rating": rating,
+                    "justification": f"{rating_result['explanation']}. Error occurred: {str(e)}",
+                    "criteria_summary": criteria_strengths,
+                    "rating_breakdown": rating_result
+                },
+                "stage": "final_determination",
+                "error": f"Error in final determination: {str(e)}"
             }
     
+    def basic_recommendations(self, final_assessment: Dict[str, Any]) -> str:
+        """Deterministic recommendations listing the criteria that need stronger evidence."""
+        criteria_strengths = final_assessment.get("criteria_summary", {})
+        weak_criteria = [c for c, s in criteria_strengths.items() if s in ["Weak", "None"]]
+        return f"Consider strengthening evidence for: {', '.join(weak_criteria)}"
+    
+    def generate_recommendations(self, final_assessment: Dict[str, Any]) -> str:
+        """Generate recommendations for improving the application from a final assessment."""
+        criteria_strengths = final_assessment.get("criteria_summary", {})
+        rating = final_assessment.get("rating", "LOW")
+        
+        # Create prompt for the LLM
+        user_prompt = f"""
+        Based on the final assessment (Rating: {rating}), generate specific recommendations for strengthening this O-1A visa application.
+        
+        Criteria Strengths:
+        ```
+        {json.dumps(criteria_strengths, indent=2)}
+        ```
+        
+        Focus on:
+        1. Specific improvements for weak criteria
+        2. Additional evidence needed for borderline criteria
+        3. Strategic advice for presenting the strongest case
+        4. Alternative visa categories if O-1A is not recommended
+        
+        Provide actionable, specific recommendations.
+        """
+        
+        # Get response from LLM
+        messages = [
+            SystemMessage(content=self.system_prompt),
+            HumanMessage(content=user_prompt)
+        ]
+        response = self.llm.invoke(messages)
+        
+        return response.content
+    
     def handle_error(self, state: ParentAgentState) -> ParentAgentState:
         """Handle errors in the parent agent process."""
         error = state.get("error", "Unknown error")
         stage = state.get("stage", "unknown")
         
-        print(f"Error in parent agent at stage {stage}: {error}")
+        logger.warning("Error in parent agent at stage %s: %s", stage, error)
+        fallbacks.inc(path="parent_handle_error")
         
         # Create a fallback assessment
-        child_assessments = state.get("child_assessments", {})
-        criteria_strengths = {}
-        
         try:
-            for criterion, assessment in child_assessments.items():
-                if isinstance(assessment, dict) and "assessment" in assessment:
-                    strength = assessment["assessment"].get("strength", "None")
-                    criteria_strengths[criterion] = strength
-                else:
-                    criteria_strengths[criterion] = "None"
-            
-            # Simple calculation
-            strong_count = sum(1 for s in criteria_strengths.values() if s == "Strong")
-            moderate_count = sum(1 for s in criteria_strengths.values() if s == "Moderate")
-            
-            if strong_count >= 3 or (strong_count + moderate_count) >= 5:
-                rating = "HIGH"
-            elif (strong_count + moderate_count) >= 3:
-                rating = "MEDIUM"
-            else:
-                rating = "LOW"
+            rating_result = rate_assessment(state.get("child_assessments", {}))
             
             return {
-                **state,
                 "final_assessment": {
-                    "rating": rating,
-                    "justification": f"Rating based on {strong_count} strong and {moderate_count} moderate criteria. Error occurred during {stage}: {error}",
-                    "criteria_summary": criteria_strengths,
-                    "error_occurred": True,
-                    "recommendations": "Unable to generate recommendations due to error."
+                    "rating": rating_result["rating"],
+                    "justification": f"{rating_result['explanation']}. Error occurred during {stage}: {error}",
+                    "criteria_summary": rating_result["criteria_summary"],
+                    "rating_breakdown": rating_result,
+                    "error_occurred": True
                 },
                 "error": error  # Preserve the error for debugging
             }
         except Exception as e:
             # If everything fails, return a minimal assessment
             return {
-                **state,
                 "final_assessment": {
                     "rating": "LOW",
                     "justification": f"Unable to properly assess due to errors: {error}, {str(e)}",
@@ -616,18 +689,75 @@ class ParentAgent:
                 "error": f"{error}; Additional error in error handling: {str(e)}"
             }
     
-    import re
-
-    def _extract_rating(self, text: str) -> str:
-        # Check for lines like "Overall Rating: HIGH" using regex
-        match = re.search(r"OVERALL RATING:\s*(HIGH|MEDIUM|LOW)", text.upper())
-        if match:
-            return match.group(1)
-        return "LOW"  # fallback if nothing matches
-
+    def fast_determination(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Produce the final assessment with a single structured LLM call."""
+        child_assessments = input_data.get("child_assessments", {})
+        rating_result = rate_assessment(child_assessments)
+        rating = rating_result["rating"]
+        criteria_strengths = rating_result["criteria_summary"]
+        
+        final_assessment = {
+            "rating": rating,
+            "justification": rating_result["explanation"],
+            "criteria_summary": criteria_strengths,
+            "rating_breakdown": rating_result,
+            "recommendations": self.basic_recommendations({"criteria_summary": criteria_strengths}),
+            "mode": "fast"
+        }
+        
+        try:
+            case_digest = format_case_digest(
+                build_case_digest(
+                    input_data.get("structured_resume", {}),
+                    input_data.get("criteria_mapping", {}),
+                    child_assessments
+                ),
+                self.digest_max_tokens
+            )
+            
+            user_prompt = f"""
+            The applicant has been rated {rating} for an O-1A visa ({rating_result["explanation"]}).
+            
+            Case Digest:
+            ```
+            {case_digest}
+            ```
+            
+            Provide:
+            1. A concise justification of the {rating} rating with specific references to USCIS standards
+            2. A one-sentence summary of the evidence for each criterion
+            """
+            
+            messages = [
+                SystemMessage(content=self.system_prompt),
+                HumanMessage(content=user_prompt)
+            ]
+            # include_raw keeps the provider's usage metadata for token accounting
+            result = self.llm.with_structured_output(FastDetermination, include_raw=True).invoke(messages)
+            if result.get("parsed") is None:
+                raise ValueError(f"Could not parse fast determination: {result.get('parsing_error')}")
+            response = result["parsed"]
+            
+            final_assessment["justification"] = response.justification
+            final_assessment["criteria_notes"] = response.criteria_summary
+            
+            return {"final_assessment": final_assessment, "error": ""}
+        except Exception as e:
+            final_assessment["error_occurred"] = True
+            return {"final_assessment": final_assessment, "error": f"Error in fast determination: {str(e)}"}
+    
+    def invoke(self, input_data: Dict[str, Any], mode: str = "full", run_id: Optional[str] = None, deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Invoke the parent agent workflow, or the single-call fast path when mode is "fast".
+        
+        A retry with the same run_id resumes the workflow from its last completed node.
+        Once deadline_seconds (or an enclosing request deadline) has passed, LLM stages
+        fail fast and the deterministic fallback rating is used.
+        """
+        with deadline_scope(deadline_seconds):
+            return self._invoke(input_data, mode, run_id)
     
-    def invoke(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Invoke the parent agent workflow."""
+    def _invoke(self, input_data: Dict[str, Any], mode: str, run_id: Optional[str]) -> Dict[str, Any]:
         # Validate input
         if "structured_resume" not in input_data:
             return {"error": "Structured resume is required"}
@@ -638,6 +768,10 @@ class ParentAgent:
         if "child_assessments" not in input_data:
             return {"error": "Child assessments are required"}
         
+        if mode == "fast":
+            with llm_priority(stage="final"):
+                return self.fast_determination(input_data)
+        
         # Initialize state
         state = {
             "structured_resume": input_data["structured_resume"],
@@ -647,23 +781,31 @@ class ParentAgent:
             "interim_analyses": {},
             "final_assessment": {},
             "error": "",
-            "stage": ""
+            "stage": "",
+            "skipped_stages": [],
+            "case_digest": "",
+            "stage_metrics": {}
         }
         
         # Run the workflow
-        final_state = self.workflow.invoke(state)
+        with llm_priority(stage="parent"):
+            final_state = invoke_checkpointed(self.workflow, state, run_id, "parent")
         
         # Return the final assessment
         return {
             "final_assessment": final_state["final_assessment"],
+            "skipped_stages": final_state.get("skipped_stages", []),
+            "stage_metrics": final_state.get("stage_metrics", {}),
             "error": final_state.get("error", "")
         }
 
+agent_registry.register("parent", ParentAgent)
+
 # Function to assess O-1A qualification
 def assess_o1a_qualification(structured_resume: Dict[str, Any], criteria_mapping: Dict[str, Any], child_assessments: Dict[str, Any]) -> Dict[str, Any]:
     """Assess a candidate's qualification for an O-1A visa."""
-    # Create the parent agent
-    parent_agent = ParentAgent()
+    # Shared parent agent, built once per process
+    parent_agent = agent_registry.get("parent")
     
     # Run the parent agent
     return parent_agent.invoke({
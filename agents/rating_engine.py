@@ -0,0 +1,169 @@
+# agents/rating_engine.py
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Field
+import numpy as np
+
+from utils.knowledge_index import CRITERIA_ORDER
+
+# Ordinal levels for child agent evidence strengths
+STRENGTHS = ["None", "Weak", "Moderate", "Strong"]
+STRENGTH_LEVELS = {strength: level for level, strength in enumerate(STRENGTHS)}
+RATINGS = np.array(["LOW", "MEDIUM", "HIGH"])
+
+
+class RatingRules(BaseModel):
+    """Thresholds for the deterministic O-1A rating."""
+    high_min_strong: int = Field(default=3, description="Strong criteria needed for HIGH")
+    high_min_met: int = Field(default=5, description="Strong or moderate criteria needed for HIGH")
+    medium_min_met: int = Field(default=3, description="Strong or moderate criteria needed for MEDIUM")
+    met_level: int = Field(default=STRENGTH_LEVELS["Moderate"], description="Minimum level for a criterion to count as met")
+    item_weight: float = Field(default=1.0, description="Maximum bonus added to a criterion score by its evidence items")
+
+
+DEFAULT_RULES = RatingRules()
+
+
+def _child_assessment(assessment: Any) -> Dict[str, Any]:
+    """Unwrap the assessment dict from a child agent result."""
+    if isinstance(assessment, dict):
+        return assessment.get("assessment", assessment) or {}
+    return {}
+
+
+def _level(strength: Any) -> int:
+    return STRENGTH_LEVELS.get(str(strength).strip().capitalize(), 0)
+
+
+def rating_input(child_assessments: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of child assessments the rating rules read (strengths only), to store for later re-rating."""
+    compact = {}
+    for criterion in CRITERIA_ORDER:
+        assessment = _child_assessment(child_assessments.get(criterion))
+        compact[criterion] = {
+            "evidence_strength": assessment.get("evidence_strength", assessment.get("strength", "None")),
+            "evidence_items": [
+                {"strength": item.get("strength", "None")}
+                for item in assessment.get("evidence_items", []) or [] if isinstance(item, dict)
+            ]
+        }
+    return compact
+
+
+def encode_assessments(batch: List[Dict[str, Any]]):
+    """
+    Encode child assessments as arrays.
+
+    Returns a (n, 8) array of criterion strength levels and a (n, 8, 4) array
+    counting evidence items at each strength level.
+    """
+    levels = np.zeros((len(batch), len(CRITERIA_ORDER)), dtype=np.int8)
+    items = np.zeros((len(batch), len(CRITERIA_ORDER), len(STRENGTHS)), dtype=np.int32)
+
+    for row, child_assessments in enumerate(batch):
+        for col, criterion in enumerate(CRITERIA_ORDER):
+            assessment = _child_assessment(child_assessments.get(criterion))
+            levels[row, col] = _level(assessment.get("evidence_strength", assessment.get("strength", "None")))
+            for item in assessment.get("evidence_items", []) or []:
+                if isinstance(item, dict):
+                    items[row, col, _level(item.get("strength", "None"))] += 1
+
+    return levels, items
+
+
+def score_arrays(levels: np.ndarray, items: np.ndarray, rules: RatingRules = DEFAULT_RULES) -> Dict[str, np.ndarray]:
+    """Apply the rating rules to encoded assessments."""
+    strong_count = (levels == STRENGTH_LEVELS["Strong"]).sum(axis=1)
+    met_count = (levels >= rules.met_level).sum(axis=1)
+    moderate_count = met_count - strong_count
+
+    is_high = (strong_count >= rules.high_min_strong) | (met_count >= rules.high_min_met)
+    is_medium = met_count >= rules.medium_min_met
+    rating_index = np.where(is_high, 2, np.where(is_medium, 1, 0))
+
+    # Item-level bonus: average item strength scaled to [0, item_weight]
+    weights = np.arange(len(STRENGTHS))
+    item_totals = items.sum(axis=2)
+    item_means = np.divide(
+        (items * weights).sum(axis=2), item_totals * weights[-1],
+        out=np.zeros(item_totals.shape, dtype=float), where=item_totals > 0
+    )
+    criterion_scores = levels + rules.item_weight * item_means
+    max_score = len(CRITERIA_ORDER) * (weights[-1] + rules.item_weight)
+    overall_score = np.round(100 * criterion_scores.sum(axis=1) / max_score, 1)
+
+    return {
+        "rating": RATINGS[rating_index],
+        "strong_count": strong_count,
+        "moderate_count": moderate_count,
+        "met_count": met_count,
+        "criterion_scores": criterion_scores,
+        "score": overall_score
+    }
+
+
+def _explain(rating: str, strong_count: int, moderate_count: int, rules: RatingRules) -> str:
+    met_count = strong_count + moderate_count
+    if rating == "HIGH":
+        if strong_count >= rules.high_min_strong:
+            return f"HIGH: {strong_count} strong criteria (at least {rules.high_min_strong} required)"
+        return f"HIGH: {met_count} criteria met with moderate or strong evidence (at least {rules.high_min_met} required)"
+    if rating == "MEDIUM":
+        return f"MEDIUM: {met_count} criteria met with moderate or strong evidence (at least {rules.medium_min_met} required)"
+    return f"LOW: {met_count} criteria met with moderate or strong evidence (fewer than {rules.medium_min_met})"
+
+
+def rate_assessment(child_assessments: Dict[str, Any], rules: Optional[RatingRules] = None) -> Dict[str, Any]:
+    """Rate a single application and explain how each criterion contributed."""
+    rules = rules or DEFAULT_RULES
+    levels, items = encode_assessments([child_assessments])
+    scores = score_arrays(levels, items, rules)
+
+    rating = str(scores["rating"][0])
+    strong_count = int(scores["strong_count"][0])
+    moderate_count = int(scores["moderate_count"][0])
+
+    breakdown = {}
+    for col, criterion in enumerate(CRITERIA_ORDER):
+        level = int(levels[0, col])
+        breakdown[criterion] = {
+            "strength": STRENGTHS[level],
+            "meets": level >= rules.met_level,
+            "evidence_items": {strength: int(items[0, col, i]) for i, strength in enumerate(STRENGTHS) if items[0, col, i]},
+            "score": round(float(scores["criterion_scores"][0, col]), 2)
+        }
+
+    return {
+        "rating": rating,
+        "strong_count": strong_count,
+        "moderate_count": moderate_count,
+        "score": float(scores["score"][0]),
+        "criteria_summary": {criterion: data["strength"] for criterion, data in breakdown.items()},
+        "breakdown": breakdown,
+        "explanation": _explain(rating, strong_count, moderate_count, rules)
+    }
+
+
+def rate_batch(batch: List[Dict[str, Any]], rules: Optional[RatingRules] = None) -> List[Dict[str, Any]]:
+    """
+    Re-rate many stored assessments at once.
+
+    Each entry may be a child_assessments dict (or its rating_input) or a
+    stored assessment result containing a "child_assessments" key. See
+    AssessmentStore.rerate and python -m agents.rerate.
+    """
+    rules = rules or DEFAULT_RULES
+    batch = [entry.get("child_assessments", entry) if isinstance(entry, dict) else {} for entry in batch]
+    levels, items = encode_assessments(batch)
+    scores = score_arrays(levels, items, rules)
+
+    return [
+        {
+            "rating": str(rating),
+            "strong_count": int(strong_count),
+            "moderate_count": int(moderate_count),
+            "score": float(score)
+        }
+        for rating, strong_count, moderate_count, score in zip(
+            scores["rating"], scores["strong_count"], scores["moderate_count"], scores["score"]
+        )
+    ]
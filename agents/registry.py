@@ -0,0 +1,78 @@
+# agents/registry.py
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AgentRegistry:
+    """
+    Process-wide registry of agents, built lazily on first use and shared by every caller.
+
+    Each agent module registers a factory at import time; get() builds the agent
+    once, under a per-agent lock so concurrent first requests share one build.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._agents: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register the factory for an agent; the agent is not built until it is first needed."""
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            self._status.setdefault(name, {"state": "cold", "init_seconds": None, "error": ""})
+
+    def get(self, name: str) -> Any:
+        """Get an agent, building it on first use."""
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+
+        if name not in self._factories:
+            raise KeyError(f"No agent registered under '{name}'")
+
+        with self._locks[name]:
+            agent = self._agents.get(name)
+            if agent is None:
+                self._status[name] = {"state": "initializing", "init_seconds": None, "error": ""}
+                start = time.perf_counter()
+                try:
+                    agent = self._factories[name]()
+                except Exception as e:
+                    self._status[name] = {"state": "failed", "init_seconds": None, "error": str(e)}
+                    raise
+                self._agents[name] = agent
+                self._status[name] = {
+                    "state": "warm",
+                    "init_seconds": round(time.perf_counter() - start, 4),
+                    "error": ""
+                }
+        return agent
+
+    def warm(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Build the given agents (all registered agents by default) ahead of the first request."""
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.exception("Error warming agent %s: %s", name, e)
+        return self.status()
+
+    def is_warm(self, name: str) -> bool:
+        return name in self._agents
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Warm/cold state and init timing of every registered agent."""
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
+
+
+# Process-wide registry used by every agent helper and the API
+agent_registry = AgentRegistry()
@@ -0,0 +1,37 @@
+# agents/rerate.py
+"""
+Re-rate every stored assessment with the rating rules, e.g. after a threshold changes.
+
+    python -m agents.rerate
+    python -m agents.rerate --high-min-strong 4 --medium-min-met 4
+
+Each assessment's child strengths are scored in batches with rate_batch, and
+the result is stored next to the original rating (the "rerated" entry of the
+assessment store). Assessments saved before strengths were stored are skipped.
+"""
+import os
+import sys
+import json
+import argparse
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.rating_engine import RatingRules, rate_batch
+from utils.assessment_store import assessment_store
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for name, field in RatingRules.model_fields.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(field.default), default=field.default, help=field.description)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    rules = RatingRules(**{name: getattr(args, name) for name in RatingRules.model_fields})
+    summary = assessment_store.rerate(lambda batch: rate_batch(batch, rules), args.batch_size)
+    print(json.dumps({"rules": rules.model_dump(), **summary}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
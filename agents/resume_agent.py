@@ -1,23 +1,25 @@
 # agents/resume_agent.py
-from typing import Dict, Any, Annotated, TypedDict
+from typing import Dict, Any, Annotated, TypedDict, Optional
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-import langgraph as lg
-from langgraph.graph import END, StateGraph
 from pydantic import BaseModel, Field
-import google.generativeai as genai
 import os
 from environs import Env
 import json
 import re
+import logging
+
+from utils.checkpointing import get_checkpointer, invoke_checkpointed
+from utils.llm_pool import get_llm
+from utils.rate_limiter import llm_priority
+from utils.deadlines import deadline_scope
+from agents.registry import agent_registry
+from utils.structured_logging import truncate
+
+logger = logging.getLogger(__name__)
 
 # Configure environment
 env = Env()
 env.read_env()  # Read .env file if it exists
-GOOGLE_API_KEY = env("GOOGLE_API_KEY", None)
-
-# Configure the API with your key
-genai.configure(api_key=GOOGLE_API_KEY)
 
 # Define state for the Resume Structuring Agent
 class ResumeAgentState(TypedDict):
@@ -66,11 +68,11 @@ class StructuredResume(BaseModel):
 def create_resume_structuring_agent(model_name: str = "gemini-2.0-flash"):
     # Initialize the LLM with proper error handling
     try:
-        llm = ChatGoogleGenerativeAI(model=model_name, temperature=0.7)
+        llm = get_llm(model_name, temperature=0.7)
         print(f"Initialized {model_name}")
     except Exception as e:
         print(f"Error initializing {model_name}: {str(e)}")
-        llm = ChatGoogleGenerativeAI(model="gemini-pro", temperature=0.7)
+        llm = get_llm("gemini-pro", temperature=0.7)
         print("Falling back to gemini-pro")
     
     # Define the system prompt
@@ -160,7 +162,7 @@ def create_resume_structuring_agent(model_name: str = "gemini-2.0-flash"):
 
             # Extract JSON from response
             response_text = response.content
-            print("Raw response content:", response.content)
+            logger.debug("Raw response content: %s", truncate(response_text))
 
             # Use the cleaned JSON extractor
             structured_resume = extract_json_from_response(response_text)
@@ -304,6 +306,7 @@ def create_resume_structuring_agent(model_name: str = "gemini-2.0-flash"):
             }
 
     # Create the graph
+    from langgraph.graph import END, StateGraph
     workflow = StateGraph(ResumeAgentState)
     
     # Add nodes
@@ -337,21 +340,29 @@ def create_resume_structuring_agent(model_name: str = "gemini-2.0-flash"):
     workflow.set_entry_point("preprocess_resume")
     
     # Compile the graph
-    resume_agent = workflow.compile()
+    resume_agent = workflow.compile(checkpointer=get_checkpointer())
     
     return resume_agent
 
+agent_registry.register("resume", create_resume_structuring_agent)
+
 # Function to process a resume
-def process_resume(raw_text: str) -> Dict[str, Any]:
-    """Process a resume from raw text to structured format."""
-    # Create the agent
-    resume_agent = create_resume_structuring_agent()
+def process_resume(raw_text: str, run_id: Optional[str] = None, deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Process a resume from raw text to structured format.
+    
+    A retry with the same run_id resumes the run; LLM calls fail fast once deadline_seconds
+    (or an enclosing request deadline) has passed.
+    """
+    # Shared agent, built once per process
+    resume_agent = agent_registry.get("resume")
     
     # Initialize the state
     initial_state = {"raw_text": raw_text, "structured_resume": {}, "error": "", "retry_count": 0}
     
     # Run the agent
-    final_state = resume_agent.invoke(initial_state)
+    with llm_priority(stage="resume"), deadline_scope(deadline_seconds):
+        final_state = invoke_checkpointed(resume_agent, initial_state, run_id, "resume")
     
     # Return the structured resume
     return final_state["structured_resume"]
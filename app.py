@@ -1,182 +1,448 @@
 # app.py
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.routing import Match
 import uvicorn
+import json
+import time
+import threading
 from io import BytesIO
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional
 from agents.agent_manager import AgentManager
 from agents.resume_agent import process_resume
 from agents.mapping_agent import map_resume_to_criteria
+from agents.registry import agent_registry
+from utils.llm_pool import llm_pool
+from utils.circuit_breaker import breaker_status
+from utils.tracing import trace_scope
+from utils import metrics
+from utils.usage import current_usage, usage_ledger, usage_scope, key_fingerprint
+from utils.profiling import PROFILE_MODES, choose_mode, is_admin, memory_tracker, profile_scope
+from utils.structured_logging import configure_logging
+from utils.prefork import memory_usage
+from utils.rate_limiter import REQUEST_CLASSES, llm_priority
+from utils.deadlines import REQUEST_DEADLINE_SECONDS, deadline_scope
 from utils.document_processor import extract_text_from_pdf, extract_text_from_url
+from utils.checkpointing import RunInputMismatch, claim_run, input_hash
 from pydantic import BaseModel
+from environs import Env
 import logging
-from agents.agent_manager import AgentManager
-
 
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+# Warm agents in a background thread so /healthz answers at once and /readyz turns ready when done
+WARMUP_IN_BACKGROUND = env.bool("WARMUP_IN_BACKGROUND", True)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: queued, sampled and optionally JSON (see utils/structured_logging.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="O-1A Visa Assessment API")
+warmup = {"started_at": None, "seconds": None, "ready": False, "error": ""}
+
+_agent_manager: Optional[AgentManager] = None
+_agent_manager_lock = threading.Lock()
+
+def get_agent_manager() -> AgentManager:
+    """The shared AgentManager, built on first use rather than at import."""
+    global _agent_manager
+    if _agent_manager is None:
+        with _agent_manager_lock:
+            if _agent_manager is None:
+                _agent_manager = AgentManager()
+    return _agent_manager
+
+def warm_up():
+    """Build every registered agent and the AgentManager and open the knowledge base, then mark the worker ready."""
+    warmup["started_at"] = time.time()
+    start = time.perf_counter()
+    try:
+        agent_registry.warm()
+        get_agent_manager()
+        # Deferred while a prefork master preloads; each worker opens Chroma before it reports ready
+        from utils.knowledge_base import open_knowledge_bases
+        open_knowledge_bases()
+    except Exception as e:
+        warmup["error"] = str(e)
+        logger.error("Warm-up failed: %s", e)
+        return
+    warmup["seconds"] = round(time.perf_counter() - start, 4)
+    warmup["ready"] = True
+    logger.info("Agents warmed in %ss", warmup["seconds"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build every registered agent before (or, in the background, while) serving the first requests.
+    # A forked worker inherits the master's warm-up state but is only ready after its own warm-up
+    warmup.update(ready=False, error="")
+    if WARMUP_IN_BACKGROUND:
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    else:
+        warm_up()
+    yield
+
+app = FastAPI(title="O-1A Visa Assessment API", lifespan=lifespan)
+
+@app.middleware("http")
+async def request_priority(request: Request, call_next):
+    """Queue this request's LLM calls as interactive (default) or batch, from X-Priority or ?priority=."""
+    request_class = request.query_params.get("priority") or request.headers.get("X-Priority") or "interactive"
+    if request_class not in REQUEST_CLASSES:
+        return JSONResponse(status_code=400, content={"detail": f"priority must be one of {list(REQUEST_CLASSES)}"})
+    with llm_priority(request_class=request_class):
+        return await call_next(request)
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """Bound the request by X-Deadline-Seconds or ?deadline= (seconds), defaulting to REQUEST_DEADLINE_SECONDS."""
+    value = request.query_params.get("deadline") or request.headers.get("X-Deadline-Seconds")
+    try:
+        seconds = float(value) if value else REQUEST_DEADLINE_SECONDS
+    except ValueError:
+        return JSONResponse(status_code=400, content={"detail": "deadline must be a number of seconds"})
+    with deadline_scope(seconds):
+        return await call_next(request)
+
+@app.middleware("http")
+async def request_tracing(request: Request, call_next):
+    """Trace the request and report where its time went in a Server-Timing header."""
+    start = time.perf_counter()
+    with trace_scope("request", method=request.method, path=request.url.path) as trace:
+        response = await call_next(request)
+        if trace is not None:
+            timings = trace.server_timing()
+            response.headers["Server-Timing"] = f"total;dur={(time.perf_counter() - start) * 1000:.1f}" + (f", {timings}" if timings else "")
+            response.headers["X-Trace-Id"] = trace.trace_id
+        return response
+
+def route_name(request: Request) -> str:
+    """The path template of the route serving a request, so metrics labels stay bounded."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    """Track in-flight requests and request durations per route."""
+    route = route_name(request)
+    start = time.perf_counter()
+    status = "500"
+    metrics.http_in_flight.inc(route=route)
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        metrics.http_in_flight.dec(route=route)
+        metrics.http_request_duration.observe(time.perf_counter() - start, route=route, status=status)
+
+@app.middleware("http")
+async def request_usage(request: Request, call_next):
+    """Account LLM token usage to the caller's X-API-Key; ?usage=true or X-Include-Usage adds a usage block."""
+    requested = (request.query_params.get("usage") or request.headers.get("X-Include-Usage") or "").lower() in ("1", "true", "yes")
+    with usage_scope(request.headers.get("X-API-Key"), requested):
+        return await call_next(request)
+
+@app.middleware("http")
+async def request_profiling(request: Request, call_next):
+    """Profile the request when an admin sends X-Profile: sample|deterministic, or when sampled at PROFILE_SAMPLE_RATE."""
+    requested = request.headers.get("X-Profile")
+    if requested and requested not in PROFILE_MODES:
+        return JSONResponse(status_code=400, content={"detail": f"X-Profile must be one of {list(PROFILE_MODES)}"})
+    mode = choose_mode(requested, request.headers.get("X-Admin-Token"))
+    name = f"{request.method}{request.url.path}".strip("/").replace("/", "-")
+    with profile_scope(mode, name) as profile:
+        response = await call_next(request)
+    if profile is not None:
+        path = profile.write()
+        logger.info("Wrote %s profile of %s %s to %s", profile.mode, request.method, request.url.path, path)
+        if requested:
+            response.headers["X-Profile-Path"] = path
+    return response
 
-# Instantiate once, maybe at the module level:
-agent_manager = AgentManager()
+def with_usage(content: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the request's token usage and estimated cost to a response body, if the caller asked for it."""
+    usage = current_usage()
+    if usage is not None and usage.requested:
+        return {**content, "usage": usage.as_dict()}
+    return content
 
 class URLInput(BaseModel):
     url: str
 
+def resolve_run_id(run_id: Optional[str], header_run_id: Optional[str]) -> Optional[str]:
+    """Run id from the query parameter or X-Run-Id header; without one the run is not checkpointed."""
+    return run_id or header_run_id
+
+def run_headers(run_id: Optional[str]) -> Optional[Dict[str, str]]:
+    return {"X-Run-Id": run_id} if run_id else None
+
+def claim(run_id: Optional[str], scope: str, *parts: Any):
+    """Bind the run id to this input; a retry with a different input gets 409 instead of the old run's result."""
+    try:
+        claim_run(run_id, scope, input_hash(*parts))
+    except RunInputMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers=run_headers(run_id))
+
+# Endpoints that run the pipeline are plain def: FastAPI runs them in its threadpool, so the
+# event loop (and /healthz, /readyz, /metrics) keeps answering while OCR and LLM calls block
 @app.post("/process-resume/")
-async def process_resume_endpoint(file: UploadFile = File(...)):
+def process_resume_endpoint(file: UploadFile = File(...), run_id: Optional[str] = None, x_run_id: Optional[str] = Header(None)):
     """
     Process a resume PDF and extract structured information.
     """
+    run_id = resolve_run_id(run_id, x_run_id)
     try:
         # Check if file is a PDF
         if not file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
         # Read the file
-        contents = await file.read()
+        contents = file.file.read()
+        claim(run_id, "document", "file", contents)
         
         # Extract text from PDF
         raw_text = extract_text_from_pdf(BytesIO(contents))
         
         # Process the resume
-        structured_resume = process_resume(raw_text)
+        structured_resume = process_resume(raw_text, run_id=run_id)
         
-        return JSONResponse(content={"structured_resume": structured_resume})
+        return JSONResponse(content=with_usage({"structured_resume": structured_resume}), headers=run_headers(run_id))
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing resume: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing resume: {str(e)}", headers=run_headers(run_id))
 
 @app.post("/process-resume-from-url/")
-async def process_resume_from_url(input_data: URLInput):
+def process_resume_from_url(input_data: URLInput, run_id: Optional[str] = None, x_run_id: Optional[str] = Header(None)):
     """
     Process a resume PDF from a URL and extract structured information.
     """
+    run_id = resolve_run_id(run_id, x_run_id)
     try:
         url = input_data.url
-        logger.info(f"Processing URL: {url}")
+        claim(run_id, "document", "url", url)
+        logger.info("Processing URL: %s", url)
         # Extract text from PDF URL
         raw_text = extract_text_from_url(url)
         logger.info("Extracted text from URL")
         # Process the resume
-        structured_resume = process_resume(raw_text)
+        structured_resume = process_resume(raw_text, run_id=run_id)
         logger.info("Processed resume text into structured data")
-        return JSONResponse(content={"structured_resume": structured_resume})
+        return JSONResponse(content=with_usage({"structured_resume": structured_resume}), headers=run_headers(run_id))
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing resume from URL: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error processing resume from URL: {str(e)}")
+        logger.error("Error processing resume from URL: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error processing resume from URL: {str(e)}", headers=run_headers(run_id))
 
 @app.post("/map-criteria/")
-async def map_criteria_endpoint(structured_resume: Dict[str, Any]):
+def map_criteria_endpoint(structured_resume: Dict[str, Any], run_id: Optional[str] = None, x_run_id: Optional[str] = Header(None)):
     """
     Map structured resume data to O-1A criteria.
     """
+    run_id = resolve_run_id(run_id, x_run_id)
     try:
+        claim(run_id, "structured_resume", json.dumps(structured_resume, sort_keys=True, default=str))
+        
         # Map resume to criteria
-        criteria_mapping = map_resume_to_criteria(structured_resume)
+        criteria_mapping = map_resume_to_criteria(structured_resume, run_id=run_id)
         
-        return JSONResponse(content={"criteria_mapping": criteria_mapping})
+        return JSONResponse(content=with_usage({"criteria_mapping": criteria_mapping}), headers=run_headers(run_id))
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error mapping criteria: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error mapping criteria: {str(e)}", headers=run_headers(run_id))
 
 @app.post("/process-and-map/")
-async def process_and_map_endpoint(file: UploadFile = File(...)):
+def process_and_map_endpoint(file: UploadFile = File(...), run_id: Optional[str] = None, x_run_id: Optional[str] = Header(None)):
     """
     Process a resume PDF and map to O-1A criteria in one step.
     """
+    run_id = resolve_run_id(run_id, x_run_id)
     try:
         # Check if file is a PDF
         if not file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
         # Read the file
-        contents = await file.read()
+        contents = file.file.read()
+        claim(run_id, "document", "file", contents)
         
         # Extract text from PDF
         raw_text = extract_text_from_pdf(BytesIO(contents))
         
         # Process the resume
-        structured_resume = process_resume(raw_text)
+        structured_resume = process_resume(raw_text, run_id=run_id)
         
         # Map resume to criteria
-        criteria_mapping = map_resume_to_criteria(structured_resume)
+        criteria_mapping = map_resume_to_criteria(structured_resume, run_id=run_id)
         
-        return JSONResponse(content={
+        return JSONResponse(content=with_usage({
             "structured_resume": structured_resume,
             "criteria_mapping": criteria_mapping
-        })
+        }), headers=run_headers(run_id))
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing and mapping: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing and mapping: {str(e)}", headers=run_headers(run_id))
 
 @app.post("/process-and-map-from-url/")
-async def process_and_map_from_url_endpoint(input_data: URLInput):
+def process_and_map_from_url_endpoint(input_data: URLInput, run_id: Optional[str] = None, x_run_id: Optional[str] = Header(None)):
     """
     Process a resume PDF from a URL and map to O-1A criteria in one step.
     """
+    run_id = resolve_run_id(run_id, x_run_id)
     try:
         url = input_data.url
+        claim(run_id, "document", "url", url)
         
         # Extract text from PDF URL
         raw_text = extract_text_from_url(url)
         
         # Process the resume
-        structured_resume = process_resume(raw_text)
+        structured_resume = process_resume(raw_text, run_id=run_id)
         
         # Map resume to criteria
-        criteria_mapping = map_resume_to_criteria(structured_resume)
+        criteria_mapping = map_resume_to_criteria(structured_resume, run_id=run_id)
         
-        return JSONResponse(content={
+        return JSONResponse(content=with_usage({
             "structured_resume": structured_resume,
             "criteria_mapping": criteria_mapping
-        })
+        }), headers=run_headers(run_id))
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing and mapping from URL: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing and mapping from URL: {str(e)}", headers=run_headers(run_id))
 
 
 @app.post("/full-assessment/")
-async def full_assessment(file: UploadFile = File(...)):
+def full_assessment(file: UploadFile = File(...), mode: str = "full", run_id: Optional[str] = None, x_run_id: Optional[str] = Header(None)):
+    """
+    Run the complete assessment. Use mode=fast for a single-call parent determination.
+    
+    Retrying with the same run id (run_id parameter or X-Run-Id header) resumes
+    the run from its last completed step instead of recomputing every LLM call.
+    """
+    if mode not in ("full", "fast"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'fast'")
+    
+    run_id = resolve_run_id(run_id, x_run_id)
     try:
         # Process document
-        contents = await file.read()
+        contents = file.file.read()
+        claim(run_id, "document", "file", contents)
+        claim(run_id, "assessment", mode)
         raw_text = extract_text_from_pdf(BytesIO(contents))
         
         # Structure resume
-        structured_resume = process_resume(raw_text)
+        structured_resume = process_resume(raw_text, run_id=run_id)
         
         # Map criteria
-        criteria_mapping = map_resume_to_criteria(structured_resume)
+        criteria_mapping = map_resume_to_criteria(structured_resume, run_id=run_id)
         
         # Coordinate assessment with agent manager (which handles all agents)
-        result = agent_manager.coordinate_assessment(
+        result = get_agent_manager().coordinate_assessment(
             structured_resume,
-            criteria_mapping
+            criteria_mapping,
+            mode=mode,
+            run_id=run_id
         )
         
-        return JSONResponse(content={
+        return JSONResponse(content=with_usage({
+            "run_id": run_id,
+            "partial": result.get("partial", False),
             "structured_resume": structured_resume,
             "criteria_mapping": criteria_mapping,
             "assessment_result": result
-        })
+        }), headers=run_headers(run_id))
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(500, detail=str(e))
+        raise HTTPException(500, detail=str(e), headers=run_headers(run_id))
+
+@app.get("/assessment/{assessment_id}/recommendations")
+def get_assessment_recommendations(assessment_id: str):
+    """
+    Get recommendations for a completed assessment, generated by the LLM on first request and memoized.
+
+    This holds for fast-mode, early-exit and partial assessments too; the deterministic
+    list they come with is in the assessment's final_assessment.basic_recommendations.
+    """
+    result = get_agent_manager().get_recommendations(assessment_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    return JSONResponse(content=with_usage({"assessment_id": assessment_id, **result}))
 
 @app.get("/agent-status/")
-async def get_agent_status():
+def get_agent_status():
     """Check the status of all agents in the system."""
     try:
-        status = agent_manager.get_all_agents_status()
-        return JSONResponse(content={"status": status})
+        status = get_agent_manager().get_all_agents_status()
+        return JSONResponse(content={
+            "status": status,
+            "agents": agent_registry.status(),
+            "warmup_seconds": warmup["seconds"],
+            "llm_pool": llm_pool.metrics(),
+            "breakers": breaker_status()
+        })
     except Exception as e:
         raise HTTPException(500, detail=str(e))
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving, whether or not its agents are warm."""
+    return JSONResponse(content={"status": "ok"})
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: every agent is built, so requests will not pay for cold starts."""
+    agents = agent_registry.status()
+    ready = warmup["ready"] and all(status["state"] == "warm" for status in agents.values())
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "status": "ready" if ready else "warming",
+        "warmup_seconds": warmup["seconds"],
+        "error": warmup["error"],
+        "agents": {name: status["state"] for name, status in agents.items()}
+    })
+
+@app.get("/metrics")
+async def get_metrics():
+    """Pipeline, LLM and HTTP metrics of this worker in the Prometheus text format."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/debug/memory")
+def get_memory_snapshot(limit: int = 25, group_by: str = "lineno", dump: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """
+    Take a tracemalloc snapshot of this worker: the top allocations, and growth since the previous snapshot.
+    "process" has the worker's RSS, PSS and USS from /proc.
+
+    The first call starts tracemalloc unless TRACEMALLOC_FRAMES started it at import. dump=true also
+    writes the snapshot to PROFILE_DIR for offline analysis.
+    """
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="X-Admin-Token required")
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    return JSONResponse(content={"process": memory_usage(), **memory_tracker.snapshot(limit, group_by, dump)})
+
+@app.get("/usage/")
+async def get_usage(x_api_key: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    """Running token and cost totals for the caller's API key; the totals of every key and stage need X-Admin-Token."""
+    if x_api_key:
+        return JSONResponse(content=usage_ledger.summary(key_fingerprint(x_api_key)))
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="X-API-Key or X-Admin-Token required")
+    return JSONResponse(content=usage_ledger.summary())
 
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,191 @@
+# benchmarks/corpus.py
+"""
+Synthetic resume corpus for benchmarks.
+
+Resumes are generated deterministically from a seed, with a controllable
+number of publications and awards and a minimum page count (pages are
+padded with extra experience bullets). They are written as plain-text PDFs
+that PyPDF and the OCR stub can read back line by line.
+
+Usage:
+    python -m benchmarks.corpus --output ./benchmarks/corpus --pages 1,3 --publications 5,40 --awards 2,10
+"""
+import os
+import sys
+import random
+import argparse
+import itertools
+from typing import Dict, Any, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LINES_PER_PAGE = 50
+LINE_CHARS = 95
+
+FIRST_NAMES = ["Jane", "Ravi", "Mei", "Carlos", "Amara", "Lukas", "Sofia", "Kenji"]
+LAST_NAMES = ["Doe", "Patel", "Chen", "Garcia", "Okafor", "Schmidt", "Rossi", "Tanaka"]
+TOPICS = ["Scalable Learning", "Graph Neural Networks", "Robust Optimization", "Protein Folding",
+          "Causal Inference", "Federated Systems", "Speech Recognition", "Quantum Control"]
+VENUES = ["NeurIPS", "ICML", "ICLR", "Nature", "Science", "ACL", "CVPR", "KDD"]
+AWARDS = ["Best Paper Award", "Young Investigator Award", "Outstanding Reviewer Award", "Innovation Prize",
+          "Distinguished Lecture", "Research Excellence Award"]
+COMPANIES = ["Acme AI", "Globex Research", "Initech Labs", "Umbrella Bio", "Stark Analytics"]
+
+# Section headers, in order, and the structured resume field each one fills
+SECTIONS = [
+    ("EDUCATION", "education"),
+    ("EXPERIENCE", "workExperience"),
+    ("PUBLICATIONS", "publications"),
+    ("AWARDS", "awards"),
+    ("MEMBERSHIPS", "memberships"),
+    ("PRESS", "pressAndMedia"),
+    ("JUDGING", "judgingExperience"),
+    ("CONTRIBUTIONS", "contributions"),
+    ("SKILLS", "skills"),
+]
+
+
+def resume_lines(pages: int = 1, publications: int = 10, awards: int = 3, seed: int = 0) -> List[str]:
+    """Lines of a synthetic resume; at least `pages` pages long."""
+    rng = random.Random(seed)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    sections: Dict[str, List[str]] = {
+        "EDUCATION": [
+            f"PhD in Computer Science, Stanford University, {2008 + rng.randint(0, 8)}",
+            f"BSc in Mathematics, University of Toronto, {2002 + rng.randint(0, 6)}",
+        ],
+        "EXPERIENCE": [
+            f"Senior Research Scientist at {company}, {2012 + i * 3}-{2015 + i * 3}: led a team of {rng.randint(3, 15)} "
+            f"on {rng.choice(TOPICS).lower()}, salary ${rng.randint(180, 420)},000"
+            for i, company in enumerate(rng.sample(COMPANIES, 3))
+        ],
+        "PUBLICATIONS": [
+            f"{rng.choice(TOPICS)}: Part {i + 1}, {rng.choice(VENUES)} {2010 + i % 14}, cited {rng.randint(0, 900)} times"
+            for i in range(publications)
+        ],
+        "AWARDS": [
+            f"{rng.choice(AWARDS)}, {rng.choice(VENUES)}, {2010 + i % 14}"
+            for i in range(awards)
+        ],
+        "MEMBERSHIPS": [f"Senior Member, IEEE, since {2012 + rng.randint(0, 8)}"],
+        "PRESS": [f"Profiled in MIT Technology Review for work on {rng.choice(TOPICS).lower()}, 2021"],
+        "JUDGING": [f"Area Chair, {rng.choice(VENUES)} {2018 + i}" for i in range(rng.randint(1, 3))],
+        "CONTRIBUTIONS": [f"Created an open-source {rng.choice(TOPICS).lower()} toolkit used by {rng.randint(50, 900)} companies"],
+        "SKILLS": ["Python, C++, PyTorch, distributed systems, technical leadership"],
+    }
+
+    def render() -> List[str]:
+        lines = [name, f"Research Scientist | {name.lower().replace(' ', '.')}@example.com"]
+        for header, _ in SECTIONS:
+            lines.append(header)
+            lines.extend(f"- {item}" for item in sections[header])
+        return lines
+
+    # Pad with experience detail until the resume fills the requested pages
+    lines = render()
+    padding = itertools.count(1)
+    while len(lines) < pages * LINES_PER_PAGE:
+        sections["EXPERIENCE"].append(
+            f"Achievement {next(padding)}: shipped {rng.choice(TOPICS).lower()} models serving {rng.randint(1, 90)}M users"
+        )
+        lines = render()
+    return [line[:LINE_CHARS] for line in lines]
+
+
+def resume_text(pages: int = 1, publications: int = 10, awards: int = 3, seed: int = 0) -> str:
+    return "\n".join(resume_lines(pages, publications, awards, seed))
+
+
+def parse_resume_text(text: str) -> Dict[str, Any]:
+    """Structured resume for text produced by resume_lines, as the resume agent would return it."""
+    fields = dict(SECTIONS)
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    structured: Dict[str, Any] = {"personalInfo": {"name": lines[0] if lines else ""}, "additionalInfo": {}}
+    structured.update({field: [] for field in fields.values()})
+    field = None
+    for line in lines[1:]:
+        if line in fields:
+            field = fields[line]
+        elif field and line.startswith("- "):
+            item = line[2:]
+            structured[field].append(item if field == "skills" else {"description": item})
+    return structured
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_pdf(lines: List[str], lines_per_page: int = LINES_PER_PAGE) -> bytes:
+    """Minimal PDF with one Helvetica text line per resume line."""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    font_id = 3 + 2 * len(pages)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(len(pages)))}] /Count {len(pages)} >>",
+    ]
+    for i, page in enumerate(pages):
+        stream = "BT /F1 10 Tf 40 760 Td 14 TL " + " ".join(f"({_escape(line)}) '" for line in page) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def resume_pdf(pages: int = 1, publications: int = 10, awards: int = 3, seed: int = 0) -> bytes:
+    return text_pdf(resume_lines(pages, publications, awards, seed))
+
+
+def corpus_specs(pages: List[int], publications: List[int], awards: List[int]) -> List[Tuple[int, int, int]]:
+    """Every combination of the requested sizes."""
+    return list(itertools.product(pages, publications, awards))
+
+
+def spec_name(pages: int, publications: int, awards: int, seed: int = 0) -> str:
+    return f"resume_p{pages}_pub{publications}_aw{awards}_s{seed}.pdf"
+
+
+def write_corpus(directory: str, specs: List[Tuple[int, int, int]], seed: int = 0) -> List[str]:
+    """Write one PDF per spec; returns the file paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for pages, publications, awards in specs:
+        path = os.path.join(directory, spec_name(pages, publications, awards, seed))
+        with open(path, "wb") as f:
+            f.write(resume_pdf(pages, publications, awards, seed))
+        paths.append(path)
+    return paths
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="./benchmarks/corpus")
+    parser.add_argument("--pages", type=_int_list, default=[1, 3])
+    parser.add_argument("--publications", type=_int_list, default=[5, 40])
+    parser.add_argument("--awards", type=_int_list, default=[2, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for path in write_corpus(args.output, corpus_specs(args.pages, args.publications, args.awards), args.seed):
+        print(f"{path}: {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# benchmarks/load_test.py
+"""
+Load-test the API against stubbed Gemini and Mistral and report scaling curves.
+
+For every uvicorn worker count the harness starts the service
+(benchmarks.stub_app, with the pipeline stub in place of Gemini) and an OCR
+stub server (in place of Mistral, also serving the corpus PDFs for the URL
+endpoints). It then runs a closed-loop load at each concurrency level for
+each endpoint and payload size, recording requests/sec, error rate and
+p50/p95/p99 latency. The saturation point of each curve is the concurrency
+after which throughput stops growing by at least --saturation-gain.
+
+Usage:
+    python -m benchmarks.load_test --workers 1,2 --concurrency 1,2,4,8,16 --duration 10
+    python -m benchmarks.load_test --endpoints full-assessment --payloads 1x5x2,4x80x12 \\
+        --llm-latency lognormal:0.4,0.3 --llm-error-rate 0.02 --ocr-latency fixed:0.8
+"""
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import spec_name, write_corpus
+from benchmarks.ocr_stub_server import serve
+from benchmarks.pipeline import git_commit, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Endpoint name -> (path, whether it takes an uploaded file or a URL)
+ENDPOINTS = {
+    "full-assessment": ("/full-assessment/", "file"),
+    "process-and-map": ("/process-and-map/", "file"),
+    "process-resume-from-url": ("/process-resume-from-url/", "url"),
+    "process-and-map-from-url": ("/process-and-map-from-url/", "url"),
+}
+
+
+def parse_payload(spec: str) -> Tuple[int, int, int]:
+    """'<pages>x<publications>x<awards>', e.g. 2x40x10."""
+    pages, publications, awards = (int(part) for part in spec.split("x"))
+    return pages, publications, awards
+
+
+def start_service(port: int, workers: int, env: Dict[str, str], timeout: float = 180.0) -> subprocess.Popen:
+    """Start uvicorn with the stubbed app and wait until its agents are warm."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.stub_app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        if process.poll() is not None:
+            raise RuntimeError(f"Service exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/readyz", timeout=2).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    stop_service(process)
+    raise RuntimeError(f"Service did not become ready within {timeout}s")
+
+
+def stop_service(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def run_level(base_url: str, endpoint: str, payload: Dict[str, Any], concurrency: int,
+                    duration: float, request_timeout: float) -> Dict[str, Any]:
+    """Closed loop: `concurrency` clients each send their next request as soon as the last one returns."""
+    path, kind = ENDPOINTS[endpoint]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    partial = 0
+    stop_at = time.monotonic() + duration
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal partial
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                if kind == "file":
+                    response = await http.post(path, files={"file": (payload["name"], payload["pdf"], "application/pdf")})
+                else:
+                    response = await http.post(path, json={"url": payload["url"]})
+                status = str(response.status_code)
+                if response.status_code == 200 and response.json().get("partial"):
+                    partial += 1
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=request_timeout, limits=limits) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(statuses.values())
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "requests_per_second": round(len(latencies) / elapsed, 3),
+        "error_rate": round(1 - len(latencies) / total, 4) if total else 0.0,
+        "partial_results": partial,
+        "statuses": statuses,
+        "latency_seconds": summarize(latencies, 3)
+    }
+
+
+def saturation(levels: List[Dict[str, Any]], gain: float) -> Dict[str, Any]:
+    """Where a throughput-vs-concurrency curve flattens, and where tail latency starts climbing."""
+    best = max(levels, key=lambda level: level["requests_per_second"])
+    point = levels[-1]
+    for previous, current in zip(levels, levels[1:]):
+        if current["requests_per_second"] < previous["requests_per_second"] * (1 + gain):
+            point = previous
+            break
+    base_p95 = levels[0]["latency_seconds"]["p95"]
+    knee = next(
+        (level["concurrency"] for level in levels if base_p95 and level["latency_seconds"]["p95"] > 2 * base_p95),
+        None
+    )
+    return {
+        "saturation_concurrency": point["concurrency"],
+        "saturation_requests_per_second": point["requests_per_second"],
+        "max_requests_per_second": best["requests_per_second"],
+        "max_at_concurrency": best["concurrency"],
+        "p95_doubles_at_concurrency": knee,
+        "reached": point is not levels[-1]
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    corpus_dir = tempfile.mkdtemp(prefix="load-corpus-")
+    payload_specs = [parse_payload(spec) for spec in args.payloads]
+    write_corpus(corpus_dir, payload_specs, args.seed)
+    ocr = serve(args.ocr_port, args.ocr_latency, args.ocr_error_rate, corpus_dir)
+    ocr_url = f"http://127.0.0.1:{ocr.server_port}"
+    service_env = {
+        "STUB_LLM_LATENCY": args.llm_latency,
+        "STUB_LLM_ERROR_RATE": str(args.llm_error_rate),
+        "MISTRAL_API_KEY": "stub",
+        "MISTRAL_OCR_URL": f"{ocr_url}/v1/ocr",
+        "CHECKPOINTS_ENABLED": "false",
+        "LLM_BACKEND": "live",
+    }
+    if args.deadline:
+        service_env["REQUEST_DEADLINE_SECONDS"] = str(args.deadline)
+
+    payloads = {}
+    for spec in payload_specs:
+        name = spec_name(*spec, args.seed)
+        with open(os.path.join(corpus_dir, name), "rb") as f:
+            payloads["x".join(map(str, spec))] = {"name": name, "pdf": f.read(), "url": f"{ocr_url}/documents/{name}"}
+
+    curves = []
+    for workers in args.workers:
+        print(f"Starting service with {workers} worker(s)...")
+        process = start_service(args.port, workers, service_env)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            for endpoint in args.endpoints:
+                for payload_name, payload in payloads.items():
+                    levels = []
+                    for concurrency in args.concurrency:
+                        level = asyncio.run(run_level(base_url, endpoint, payload, concurrency, args.duration, args.request_timeout))
+                        levels.append(level)
+                        print(f"  workers={workers} {endpoint} payload={payload_name} c={concurrency}: "
+                              f"{level['requests_per_second']:.2f} req/s, p95 {level['latency_seconds']['p95']:.3f}s, "
+                              f"errors {level['error_rate']:.1%}")
+                    curves.append({
+                        "workers": workers,
+                        "endpoint": endpoint,
+                        "payload": payload_name,
+                        "payload_bytes": len(payload["pdf"]),
+                        "levels": levels,
+                        "saturation": saturation(levels, args.saturation_gain)
+                    })
+        finally:
+            stop_service(process)
+    ocr.shutdown()
+
+    return {
+        "benchmark": "load_test",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "workers": args.workers, "concurrency": args.concurrency, "endpoints": args.endpoints,
+            "payloads": args.payloads, "duration": args.duration, "llm_latency": args.llm_latency,
+            "llm_error_rate": args.llm_error_rate, "ocr_latency": args.ocr_latency,
+            "ocr_error_rate": args.ocr_error_rate, "deadline": args.deadline,
+            "saturation_gain": args.saturation_gain
+        },
+        "ocr_stub": {"requests": ocr.requests, "errors": ocr.errors},
+        "curves": curves
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def _str_list(value: str) -> List[str]:
+    return [item for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", type=_str_list, default=list(ENDPOINTS), help=f"Any of {', '.join(ENDPOINTS)}")
+    parser.add_argument("--workers", type=_int_list, default=[1, 2])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--payloads", type=_str_list, default=["1x5x2", "3x40x10"], help="<pages>x<publications>x<awards>")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--request-timeout", type=float, default=300.0)
+    parser.add_argument("--llm-latency", default="lognormal:0.3,0.3", help="Stub Gemini latency per call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--ocr-latency", default="fixed:0.5", help="Stub Mistral OCR latency per request")
+    parser.add_argument("--ocr-error-rate", type=float, default=0.0)
+    parser.add_argument("--deadline", type=float, default=0.0, help="REQUEST_DEADLINE_SECONDS for the service")
+    parser.add_argument("--saturation-gain", type=float, default=0.1, help="Minimum relative throughput gain per level")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ocr-port", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Report path (default benchmarks/results/load-<time>.json)")
+    args = parser.parse_args(argv)
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    report = run(args)
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"load-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\nSaturation points:")
+    for curve in report["curves"]:
+        point = curve["saturation"]
+        reached = "" if point["reached"] else " (not reached; raise --concurrency)"
+        print(f"  workers={curve['workers']} {curve['endpoint']:26s} payload={curve['payload']:9s} "
+              f"saturates at c={point['saturation_concurrency']} ({point['saturation_requests_per_second']:.2f} req/s), "
+              f"max {point['max_requests_per_second']:.2f} req/s, p95 doubles at c={point['p95_doubles_at_concurrency']}{reached}")
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
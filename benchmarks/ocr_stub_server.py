@@ -0,0 +1,143 @@
+# benchmarks/ocr_stub_server.py
+"""
+Local stand-in for the Mistral OCR API, for offline benchmarks and load tests.
+
+POST /v1/ocr accepts the same multipart upload and document_url payloads as
+Mistral and returns {"pages": [{"markdown": ...}]}, with the text extracted
+by PyPDF after a synthetic latency. PDFs in --documents are served at
+/documents/<name>, so the URL endpoints can run offline too.
+
+Usage:
+    python -m benchmarks.ocr_stub_server --port 8765 --latency lognormal:0.8,0.4 --documents ./benchmarks/corpus
+    MISTRAL_API_KEY=stub MISTRAL_OCR_URL=http://127.0.0.1:8765/v1/ocr uvicorn app:app
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pypdf
+
+from utils.llm_backends import LatencyModel
+
+
+def pdf_pages(content: bytes):
+    """Markdown pages for a PDF, as the OCR API would return them."""
+    reader = pypdf.PdfReader(io.BytesIO(content))
+    return [{"index": i, "markdown": page.extract_text() or ""} for i, page in enumerate(reader.pages)]
+
+
+def multipart_file(content_type: str, body: bytes) -> bytes:
+    """The 'file' part of a multipart/form-data body."""
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True)
+    raise ValueError("No file part in upload")
+
+
+class OCRStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: LatencyModel, error_rate: float = 0.0, documents: str = ""):
+        super().__init__(address, OCRStubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.documents = documents
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.error_rate
+            self.errors += fail
+            return fail
+
+    def read_document(self, url: str) -> bytes:
+        name = os.path.basename(urlparse(url).path)
+        with open(os.path.join(self.documents, name), "rb") as f:
+            return f.read()
+
+
+class OCRStubHandler(BaseHTTPRequestHandler):
+    server: OCRStubServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/documents/"):
+            try:
+                self._send(200, self.server.read_document(self.path), "application/pdf")
+            except OSError:
+                self._send(404, b'{"detail": "Not found"}')
+        elif self.path == "/stats":
+            self._send(200, json.dumps({"requests": self.server.requests, "errors": self.server.errors}).encode())
+        else:
+            self._send(404, b'{"detail": "Not found"}')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency.sample())
+        if self.server.should_fail():
+            self._send(503, b'{"detail": "Injected OCR failure"}')
+            return
+        try:
+            content_type = self.headers.get("Content-Type", "")
+            if content_type.startswith("multipart/form-data"):
+                content = multipart_file(content_type, body)
+            else:
+                content = self.server.read_document(json.loads(body)["document"]["document_url"])
+            pages = pdf_pages(content)
+        except Exception as e:
+            self._send(422, json.dumps({"detail": str(e)}).encode())
+            return
+        self._send(200, json.dumps({"model": "mistral-ocr-stub", "pages": pages}).encode())
+
+
+def serve(port: int = 8765, latency: str = "none", error_rate: float = 0.0, documents: str = "", host: str = "127.0.0.1") -> OCRStubServer:
+    """Start the stub in a background thread and return the server."""
+    server = OCRStubServer((host, port), LatencyModel(latency, seed=0), error_rate, documents)
+    threading.Thread(target=server.serve_forever, name="ocr-stub", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="none", help="fixed:<s>, uniform:<min>,<max>, lognormal:<median>,<sigma> or none")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of OCR requests answered with 503")
+    parser.add_argument("--documents", default="", help="Directory of PDFs served at /documents/<name>")
+    args = parser.parse_args()
+
+    server = OCRStubServer((args.host, args.port), LatencyModel(args.latency, seed=0), args.error_rate, args.documents)
+    print(f"OCR stub listening on http://{args.host}:{args.port}/v1/ocr")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/otlp_collector_stub.py
+"""
+Minimal stand-in for an OpenTelemetry collector's OTLP/HTTP JSON receiver.
+
+Spans posted to /v1/traces are flattened and appended to a JSON lines file,
+so traces exported with TRACE_EXPORT=otlp can be inspected without a real
+collector.
+
+Usage:
+    python -m benchmarks.otlp_collector_stub --port 4318 --output ./traces/otlp.jsonl
+    TRACE_EXPORT=otlp TRACE_OTLP_ENDPOINT=http://127.0.0.1:4318/v1/traces uvicorn app:app
+"""
+import os
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class OTLPCollectorStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, output: str):
+        super().__init__(address, OTLPHandler)
+        self.output = output
+        self.spans = 0
+        self._lock = threading.Lock()
+
+    def write(self, payload):
+        records = []
+        for resource_spans in payload.get("resourceSpans", []):
+            resource = {a["key"]: a["value"].get("stringValue") for a in resource_spans.get("resource", {}).get("attributes", [])}
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                for span in scope_spans.get("spans", []):
+                    records.append({
+                        "service": resource.get("service.name"),
+                        "trace_id": span["traceId"],
+                        "span_id": span["spanId"],
+                        "parent_id": span.get("parentSpanId") or None,
+                        "name": span["name"],
+                        "duration_ms": (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6,
+                        "attributes": {a["key"]: a["value"].get("stringValue") for a in span.get("attributes", [])},
+                        "status": span.get("status", {})
+                    })
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.output)), exist_ok=True)
+            with open(self.output, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            self.spans += len(records)
+
+
+class OTLPHandler(BaseHTTPRequestHandler):
+    server: OTLPCollectorStub
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != "/v1/traces":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            self.server.write(json.loads(body))
+        except (ValueError, KeyError) as e:
+            self.send_response(400)
+            self.end_headers()
+            self.wfile.write(str(e).encode())
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+
+def serve(port: int = 4318, output: str = "./traces/otlp.jsonl", host: str = "127.0.0.1") -> OTLPCollectorStub:
+    """Start the collector in a background thread and return the server."""
+    server = OTLPCollectorStub((host, port), output)
+    threading.Thread(target=server.serve_forever, name="otlp-collector", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="./traces/otlp.jsonl")
+    args = parser.parse_args()
+
+    server = OTLPCollectorStub((args.host, args.port), args.output)
+    print(f"OTLP collector stub listening on http://{args.host}:{args.port}/v1/traces, writing {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# benchmarks/parent_latency.py
+"""
+Measure ParentAgent latency and prompt sizes with a stub LLM.
+
+Usage:
+    python -m benchmarks.parent_latency --latency 0.5 --runs 5 [--mode fast]
+    python -m benchmarks.parent_latency --latency 0.3 --per-token-latency 0.002 --output-tokens 600 --size 4
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Dict, List, Optional, Annotated
+
+from langchain_core.messages import AIMessage, HumanMessage
+from pydantic import BaseModel
+
+from agents.parent_agent import ParentAgent
+from utils.knowledge_index import estimate_tokens
+
+CRITERIA = ["awards", "membership", "press", "judging", "contributions", "articles", "employment", "remuneration"]
+
+
+class StubStats:
+    """Call and token counters shared by every stub client of a run."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens: List[int] = []
+        self.output_tokens: List[int] = []
+
+
+class StubLLM:
+    """
+    Stand-in for ChatGoogleGenerativeAI.
+
+    Each call sleeps for a fixed latency plus a per-output-token generation
+    cost. Free-text responses are output_tokens long unless capped by
+    max_output_tokens, mimicking an unbounded essay.
+    """
+
+    def __init__(self, latency: float, per_token_latency: float = 0.0, output_tokens: int = 20,
+                 max_output_tokens: Optional[int] = None, stats: Optional[StubStats] = None):
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.output_tokens = output_tokens
+        self.max_output_tokens = max_output_tokens
+        self.stats = stats or StubStats()
+
+    @property
+    def calls(self) -> int:
+        return self.stats.calls
+
+    def _respond(self, messages, content: str, stats: Optional[StubStats] = None) -> AIMessage:
+        if isinstance(messages, str):
+            messages = [HumanMessage(content=messages)]
+        input_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        output_tokens = estimate_tokens(content)
+        stats = stats or self.stats
+        stats.calls += 1
+        stats.prompt_tokens.append(input_tokens)
+        stats.output_tokens.append(output_tokens)
+        time.sleep(self.latency + self.per_token_latency * output_tokens)
+        return AIMessage(
+            content=content,
+            usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        )
+
+    def _text(self, tokens: int) -> str:
+        if self.max_output_tokens:
+            tokens = min(tokens, self.max_output_tokens)
+        prefix = "Overall Rating: MEDIUM\nThe candidate works in software research. "
+        filler = "The evidence is reviewed against USCIS standards. "
+        return (prefix + filler * (tokens * 4 // len(filler) + 1))[:max(tokens * 4, len(prefix))]
+
+    def invoke(self, messages, *args, **kwargs):
+        return self._respond(messages, self._text(self.output_tokens))
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return StructuredStubLLM(self, schema, include_raw)
+
+
+class StructuredStubLLM:
+    """Structured-output view of StubLLM that fills every field of the schema with long stub values."""
+
+    def __init__(self, llm: StubLLM, schema, include_raw: bool = False):
+        self.llm = llm
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def _fill(self, annotation):
+        origin = getattr(annotation, "__origin__", None)
+        args = getattr(annotation, "__args__", ())
+        if origin is Annotated:
+            return self._fill(args[0])
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return {name: self._fill(field.annotation) for name, field in annotation.model_fields.items()}
+        if origin in (list, List):
+            return [self._fill(args[0]) for _ in range(10)]
+        if origin in (dict, Dict):
+            return {criterion: self._fill(args[1]) for criterion in CRITERIA}
+        if annotation is bool:
+            return True
+        if annotation in (int, float):
+            return 0
+        return self.llm._text(self.llm.output_tokens // 4)
+
+    def invoke(self, messages, *args, **kwargs):
+        # Validation applies any length caps declared on the schema
+        parsed = self.schema.model_validate(self._fill(self.schema))
+        raw = self.llm._respond(messages, parsed.model_dump_json())
+        if self.include_raw:
+            return {"raw": raw, "parsed": parsed, "parsing_error": None}
+        return parsed
+
+
+def sample_input(size: int = 1):
+    structured_resume = {
+        "personalInfo": {"name": "Jane Doe"},
+        "workExperience": [
+            {"company": f"Acme {i}", "title": "Research Scientist", "description": "Led research on large-scale machine learning systems."}
+            for i in range(size)
+        ],
+        "awards": [{"name": f"Best Paper Award {i}", "issuer": "NeurIPS"} for i in range(size)],
+        "publications": [
+            {"title": f"A Study of Scalable Learning, Part {i}", "venue": "ICML", "citations": 10 * i}
+            for i in range(5 * size)
+        ]
+    }
+    strengths = ["Strong", "Moderate", "Weak", "None", "Strong", "Moderate", "Weak", "None"]
+    child_assessments = {
+        criterion: {
+            "resume_data": structured_resume,
+            "assessment": {
+                "criterion": criterion,
+                "evidence_items": [
+                    {"description": f"Best Paper Award {i} from NeurIPS", "source": "awards", "strength": strength}
+                    for i in range(size)
+                ],
+                "evidence_strength": strength,
+                "justification": f"Stub assessment for {criterion}"
+            },
+            "error": ""
+        }
+        for criterion, strength in zip(CRITERIA, strengths)
+    }
+    return {
+        "structured_resume": structured_resume,
+        "criteria_mapping": {criterion: {"relevantItems": []} for criterion in CRITERIA},
+        "child_assessments": child_assessments
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per stub LLM call")
+    parser.add_argument("--per-token-latency", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--output-tokens", type=int, default=20, help="Length of uncapped free-text responses")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", choices=["full", "fast"], default="full")
+    parser.add_argument("--size", type=int, default=1, help="Scale factor for the sample resume")
+    args = parser.parse_args()
+
+    agent = ParentAgent()
+    stats = StubStats()
+    agent.llm = StubLLM(args.latency, args.per_token_latency, args.output_tokens, stats=stats)
+    agent.stage_llms = {
+        stage: StubLLM(args.latency, args.per_token_latency, args.output_tokens, max_output_tokens=max_tokens, stats=stats)
+        for stage, max_tokens in agent.stage_max_output_tokens.items()
+    }
+    agent.vectorstore = None
+
+    durations = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        result = agent.invoke(sample_input(args.size), mode=args.mode)
+        durations.append(time.perf_counter() - start)
+
+    calls_per_run = stats.calls // args.runs
+    print(f"mode: {args.mode}  llm latency: {args.latency:.3f}s  calls/run: {calls_per_run}")
+    print(f"parent latency: mean {statistics.mean(durations):.3f}s  "
+          f"min {min(durations):.3f}s  max {max(durations):.3f}s")
+    prompt_tokens = stats.prompt_tokens[:calls_per_run]
+    output_tokens = stats.output_tokens[:calls_per_run]
+    print(f"input tokens per call (est.): {prompt_tokens}  total: {sum(prompt_tokens)}")
+    print(f"output tokens per call (est.): {output_tokens}  total: {sum(output_tokens)}")
+    for stage, metrics in result.get("stage_metrics", {}).items():
+        print(f"  {stage}: input {metrics.get('input_tokens', 0)}  output {metrics.get('output_tokens', 0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# benchmarks/pipeline.py
+"""
+End-to-end pipeline benchmark over a synthetic resume corpus, with a stub LLM.
+
+Each generated resume PDF is driven through extract_text_from_pdf,
+process_resume, map_resume_to_criteria, AgentManager.coordinate_assessment
+and ParentAgent.invoke. The JSON report has per-stage p50/p95/p99 latency and
+throughput, prompt sizes per agent, and peak RSS, so runs can be compared.
+
+Usage:
+    python -m benchmarks.pipeline --pages 1,3 --publications 5,40 --awards 2,10 --repeat 3
+    python -m benchmarks.pipeline --latency 0.2 --per-token-latency 0.001 --ocr-stub --compare old.json
+"""
+import os
+import sys
+import io
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Benchmark runs are independent; checkpointing would turn repeats into cache hits
+os.environ.setdefault("CHECKPOINTS_ENABLED", "false")
+
+from benchmarks.corpus import corpus_specs, resume_pdf, spec_name
+
+STAGES = ["extract_text_from_pdf", "process_resume", "map_resume_to_criteria", "coordinate_assessment", "parent_invoke"]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values: List[float], digits: int = 4) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "mean": round(sum(values) / len(values), digits) if values else 0.0,
+        "p50": round(percentile(values, 50), digits),
+        "p95": round(percentile(values, 95), digits),
+        "p99": round(percentile(values, 99), digits),
+        "max": round(max(values), digits) if values else 0.0
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Per-stage p50/p95 changes against an earlier report."""
+    lines = []
+    for stage, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        for key in ("p50", "p95"):
+            before, after = previous["latency_seconds"][key], current["latency_seconds"][key]
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            lines.append(f"{stage:24s} {key}: {before:.4f}s -> {after:.4f}s ({change})")
+    return lines
+
+
+def run(args) -> Dict[str, Any]:
+    if args.ocr_stub:
+        from benchmarks.ocr_stub_server import serve
+        server = serve(args.ocr_port, args.ocr_latency)
+        os.environ["MISTRAL_API_KEY"] = "stub"
+        os.environ["MISTRAL_OCR_URL"] = f"http://127.0.0.1:{server.server_port}/v1/ocr"
+
+    from benchmarks.pipeline_stub import stub_client_factory
+    from utils.llm_pool import llm_pool
+    factory = stub_client_factory(args.latency, args.per_token_latency, args.output_tokens)
+    llm_pool.set_client_factory(factory)
+
+    from utils.document_processor import extract_text_from_pdf
+    from agents.resume_agent import process_resume
+    from agents.mapping_agent import map_resume_to_criteria
+    from agents.agent_manager import AgentManager
+    from agents.registry import agent_registry
+
+    rss_at_start = peak_rss_mb()
+    warmup_start = time.perf_counter()
+    agent_registry.warm()
+    agent_registry.get("parent").vectorstore = None
+    manager = AgentManager()
+    warmup_seconds = time.perf_counter() - warmup_start
+
+    stage_functions = {
+        "extract_text_from_pdf": lambda doc: extract_text_from_pdf(io.BytesIO(doc["pdf"])),
+        "process_resume": lambda doc: process_resume(doc["extract_text_from_pdf"]),
+        "map_resume_to_criteria": lambda doc: map_resume_to_criteria(doc["process_resume"]),
+        "coordinate_assessment": lambda doc: manager.coordinate_assessment(doc["process_resume"], doc["map_resume_to_criteria"], mode=args.mode),
+        "parent_invoke": lambda doc: agent_registry.get("parent").invoke({
+            "structured_resume": doc["process_resume"],
+            "criteria_mapping": doc["map_resume_to_criteria"],
+            "child_assessments": doc["coordinate_assessment"].get("child_assessments", {})
+        }, mode=args.mode)
+    }
+
+    latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    rss_after: Dict[str, float] = {}
+    documents = []
+    wall_start = time.perf_counter()
+    specs = corpus_specs(args.pages, args.publications, args.awards)
+    for repeat in range(args.repeat):
+        for pages, publications, awards in specs:
+            doc: Dict[str, Any] = {"pdf": resume_pdf(pages, publications, awards, args.seed)}
+            timings = {}
+            for stage in STAGES:
+                start = time.perf_counter()
+                doc[stage] = stage_functions[stage](doc)
+                timings[stage] = round(time.perf_counter() - start, 4)
+                latencies[stage].append(timings[stage])
+                rss_after[stage] = peak_rss_mb()
+            documents.append({
+                "name": spec_name(pages, publications, awards, args.seed),
+                "repeat": repeat,
+                "pages": pages,
+                "publications": publications,
+                "awards": awards,
+                "pdf_bytes": len(doc["pdf"]),
+                "text_chars": len(doc["extract_text_from_pdf"]),
+                "rating": doc["coordinate_assessment"].get("final_assessment", {}).get("rating"),
+                "latency_seconds": timings
+            })
+    wall_seconds = time.perf_counter() - wall_start
+
+    prompt_sizes = {}
+    for agent, stats in factory.agent_stats.items():
+        prompt_sizes[agent] = {
+            "calls": stats.calls,
+            "input_tokens": summarize(stats.prompt_tokens, 1),
+            "output_tokens": summarize(stats.output_tokens, 1)
+        }
+
+    return {
+        "benchmark": "pipeline",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "pages": args.pages, "publications": args.publications, "awards": args.awards,
+            "repeat": args.repeat, "seed": args.seed, "mode": args.mode,
+            "latency": args.latency, "per_token_latency": args.per_token_latency,
+            "output_tokens": args.output_tokens, "ocr_stub": args.ocr_stub
+        },
+        "warmup_seconds": round(warmup_seconds, 4),
+        "wall_seconds": round(wall_seconds, 4),
+        "documents_per_second": round(len(documents) / wall_seconds, 4) if wall_seconds else 0.0,
+        "stages": {
+            stage: {
+                "latency_seconds": summarize(values),
+                "throughput_per_second": round(len(values) / sum(values), 4) if sum(values) else 0.0,
+                "peak_rss_mb_after": rss_after.get(stage)
+            }
+            for stage, values in latencies.items()
+        },
+        "prompt_sizes": prompt_sizes,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_mb_at_start": rss_at_start,
+        "llm_pool": llm_pool.metrics(),
+        "documents": documents
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=_int_list, default=[1, 3], help="Comma-separated page counts")
+    parser.add_argument("--publications", type=_int_list, default=[5, 40], help="Comma-separated publication counts")
+    parser.add_argument("--awards", type=_int_list, default=[2, 10], help="Comma-separated award counts")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=["full", "fast"], default="full")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub LLM seconds per call")
+    parser.add_argument("--per-token-latency", type=float, default=0.0, help="Stub LLM seconds per output token")
+    parser.add_argument("--output-tokens", type=int, default=200, help="Length of free-text stub responses")
+    parser.add_argument("--ocr-stub", action="store_true", help="Extract through the local OCR stub instead of PyPDF")
+    parser.add_argument("--ocr-port", type=int, default=0)
+    parser.add_argument("--ocr-latency", default="none")
+    parser.add_argument("--output", default=None, help="Report path (default benchmarks/results/pipeline-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results",
+        f"pipeline-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{len(report['documents'])} documents in {report['wall_seconds']:.2f}s "
+          f"({report['documents_per_second']:.2f}/s), peak RSS {report['peak_rss_mb']} MB")
+    for stage, result in report["stages"].items():
+        latency = result["latency_seconds"]
+        print(f"{stage:24s} p50 {latency['p50']:.4f}s  p95 {latency['p95']:.4f}s  p99 {latency['p99']:.4f}s  "
+              f"{result['throughput_per_second']:.2f}/s")
+    for agent, sizes in report["prompt_sizes"].items():
+        print(f"{agent:8s} calls {sizes['calls']:4d}  input tokens p50 {sizes['input_tokens']['p50']:.0f}  "
+              f"max {sizes['input_tokens']['max']:.0f}")
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n" + "\n".join(compare(report, json.load(f))))
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/pipeline_stub.py
+"""
+Stub LLM that answers every agent of the pipeline with plausible output.
+
+The resume agent gets the structured form of a benchmarks.corpus resume, the
+mapping agent a mapping built from its sections, and each child agent an
+assessment of the items mapped to its criterion, so every stage runs its
+normal (non-fallback) path. Parent stages use the generic StubLLM output.
+Prompt and output sizes are recorded per agent. For load tests, latency can
+follow a distribution and a fraction of calls can fail like a 503.
+"""
+import re
+import json
+import time
+import random
+from typing import Dict, Any, List, Optional
+
+from langchain_core.messages import AIMessage
+
+from benchmarks.corpus import parse_resume_text
+from benchmarks.parent_latency import StubLLM, StubStats
+from utils.llm_backends import LatencyModel
+
+AGENTS = ["resume", "mapping", "child", "parent"]
+
+# Structured resume field holding the evidence for each criterion
+CRITERION_FIELDS = {
+    "awards": "awards",
+    "membership": "memberships",
+    "press": "pressAndMedia",
+    "judging": "judgingExperience",
+    "contributions": "contributions",
+    "articles": "publications",
+    "employment": "workExperience",
+    "remuneration": "workExperience",
+}
+
+FENCED = re.compile(r"```(?:json)?\s*\n(.*?)\n\s*```", re.DOTALL)
+
+
+def fenced_json(text: str) -> List[Any]:
+    """Every fenced block in a prompt that parses as JSON."""
+    blocks = []
+    for block in FENCED.findall(text):
+        try:
+            blocks.append(json.loads(block))
+        except ValueError:
+            pass
+    return blocks
+
+
+def strength(count: int) -> str:
+    if count == 0:
+        return "None"
+    if count <= 2:
+        return "Weak"
+    if count <= 5:
+        return "Moderate"
+    return "Strong"
+
+
+def criteria_mapping(structured_resume: Dict[str, Any]) -> Dict[str, Any]:
+    mapping = {}
+    for criterion, field in CRITERION_FIELDS.items():
+        items = [item for item in structured_resume.get(field, []) if isinstance(item, dict)]
+        if criterion == "remuneration":
+            items = [item for item in items if "salary" in item.get("description", "")]
+        mapping[criterion] = {
+            "criterion": criterion.capitalize(),
+            "relevantItems": items,
+            "context": f"{len(items)} resume items relate to {criterion}.",
+            "potentialStrength": strength(len(items))
+        }
+    return mapping
+
+
+def child_assessment(criterion: str, mapping: Dict[str, Any]) -> Dict[str, Any]:
+    items = mapping.get("relevantItems", [])
+    return {
+        "criterion": criterion,
+        "evidence_items": [
+            {"description": item.get("description", str(item))[:160], "source": criterion, "strength": strength(len(items))}
+            for item in items
+        ],
+        "evidence_strength": strength(len(items)),
+        "justification": f"{len(items)} items support {criterion}; strength follows the number and standing of the items."
+    }
+
+
+class PipelineStubLLM(StubLLM):
+    """StubLLM that recognises which agent is calling and answers in that agent's format."""
+
+    def __init__(self, latency: float, per_token_latency: float = 0.0, output_tokens: int = 200,
+                 max_output_tokens: Optional[int] = None, temperature: float = 0.0,
+                 agent_stats: Optional[Dict[str, StubStats]] = None,
+                 latency_model: Optional[LatencyModel] = None, error_rate: float = 0.0):
+        super().__init__(0.0 if latency_model else latency, per_token_latency, output_tokens, max_output_tokens)
+        self.temperature = temperature
+        self.agent_stats = agent_stats if agent_stats is not None else {agent: StubStats() for agent in AGENTS}
+        self.stats = self.agent_stats["parent"]
+        self.latency_model = latency_model
+        self.error_rate = error_rate
+        self._random = random.Random()
+
+    def _respond(self, messages, content: str, stats: Optional[StubStats] = None) -> AIMessage:
+        if self.latency_model is not None:
+            time.sleep(self.latency_model.sample())
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise RuntimeError("503 Service Unavailable (injected by stub)")
+        return super()._respond(messages, content, stats)
+
+    def invoke(self, messages, *args, **kwargs) -> AIMessage:
+        prompt = "\n".join(str(getattr(message, "content", message)) for message in (messages if isinstance(messages, list) else [messages]))
+        if "Resume Structuring Agent" in prompt:
+            text = prompt.split("RESUME TEXT:", 1)[1].split("OUTPUT SCHEMA:", 1)[0]
+            return self._respond(messages, json.dumps(parse_resume_text(text)), self.agent_stats["resume"])
+        if "Experience Mapping Agent" in prompt:
+            blocks = fenced_json(prompt)
+            # The enhancement pass sends the initial mapping back after the resume
+            mapping = blocks[1] if "INITIAL MAPPING" in prompt and len(blocks) > 1 else criteria_mapping(blocks[0] if blocks else {})
+            return self._respond(messages, json.dumps(mapping), self.agent_stats["mapping"])
+        if "INITIAL CRITERION MAPPING" in prompt:
+            blocks = fenced_json(prompt)
+            mapping = blocks[-1] if blocks else {}
+            criterion = re.search(r'"criterion": "(\w+)",\s*"evidence_items"', prompt)
+            assessment = child_assessment(criterion.group(1) if criterion else "unknown", mapping)
+            return self._respond(messages, json.dumps(assessment), self.agent_stats["child"])
+        return super().invoke(messages, *args, **kwargs)
+
+
+def stub_client_factory(latency: float, per_token_latency: float = 0.0, output_tokens: int = 200,
+                        agent_stats: Optional[Dict[str, StubStats]] = None,
+                        latency_model: Optional[LatencyModel] = None, error_rate: float = 0.0):
+    """Client factory for llm_pool.set_client_factory; every client shares the same per-agent stats."""
+    agent_stats = agent_stats if agent_stats is not None else {agent: StubStats() for agent in AGENTS}
+
+    def factory(model: str, temperature: float, max_output_tokens: Optional[int]) -> PipelineStubLLM:
+        return PipelineStubLLM(
+            latency, per_token_latency, output_tokens, max_output_tokens, temperature, agent_stats, latency_model, error_rate
+        )
+
+    factory.agent_stats = agent_stats
+    return factory
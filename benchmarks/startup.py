@@ -0,0 +1,184 @@
+# benchmarks/startup.py
+"""
+Measure worker cold start: import cost of the API and time until it is live and ready.
+
+Each repeat imports the module in a fresh interpreter under `python -X importtime`
+and reports the wall time, the slowest modules by self and cumulative time,
+and which known-heavy dependencies were loaded at import. It then starts
+uvicorn and times /healthz (live) and /readyz (agents warm).
+
+Usage:
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --module app --app benchmarks.stub_app:app --compare benchmarks/results/startup-<time>.json
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.pipeline import git_commit, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that should only be imported once an agent or the knowledge base needs them
+HEAVY_MODULES = [
+    "langchain_google_genai", "google.generativeai", "google.genai", "langchain_openai", "openai",
+    "langchain_community.vectorstores", "chromadb", "sentence_transformers", "torch", "langgraph", "pypdf"
+]
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of `-X importtime` output: module, depth, self and cumulative seconds."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_seconds": int(self_us) / 1e6,
+            "cumulative_seconds": int(cumulative_us) / 1e6
+        })
+    return rows
+
+
+def import_profile(module: str, env: Dict[str, str]) -> Dict[str, Any]:
+    """Import a module in a fresh interpreter and profile it."""
+    code = f"import sys, time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start); print(','.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    seconds, modules = result.stdout.strip().splitlines()[-2:]
+    loaded = set(modules.split(","))
+    return {
+        "seconds": float(seconds),
+        "rows": parse_importtime(result.stderr),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in loaded]
+    }
+
+
+def time_to_ready(target: str, port: int, env: Dict[str, str], timeout: float = 300.0) -> Dict[str, Optional[float]]:
+    """Start uvicorn and time how long /healthz and /readyz take to answer 200."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    timings: Dict[str, Optional[float]] = {"healthz_seconds": None, "readyz_seconds": None}
+    try:
+        while time.perf_counter() - start < timeout and timings["readyz_seconds"] is None:
+            if process.poll() is not None:
+                raise RuntimeError(f"Service exited with code {process.returncode} during startup")
+            for endpoint in ("healthz", "readyz"):
+                if timings[f"{endpoint}_seconds"] is not None:
+                    continue
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/{endpoint}", timeout=2).status_code == 200:
+                        timings[f"{endpoint}_seconds"] = round(time.perf_counter() - start, 3)
+                except httpx.HTTPError:
+                    pass
+            time.sleep(0.05)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    return timings
+
+
+def run(args) -> Dict[str, Any]:
+    env = {"CHECKPOINTS_ENABLED": "false"}
+    profiles = [import_profile(args.module, env) for _ in range(args.repeat)]
+
+    # Average every module's timings over the repeats
+    modules: Dict[str, Dict[str, Any]] = {}
+    for profile in profiles:
+        for row in profile["rows"]:
+            entry = modules.setdefault(row["module"], {"depth": row["depth"], "self": [], "cumulative": []})
+            entry["self"].append(row["self_seconds"])
+            entry["cumulative"].append(row["cumulative_seconds"])
+    averaged = [
+        {"module": name, "depth": entry["depth"],
+         "self_seconds": round(sum(entry["self"]) / len(entry["self"]), 4),
+         "cumulative_seconds": round(sum(entry["cumulative"]) / len(entry["cumulative"]), 4)}
+        for name, entry in modules.items()
+    ]
+    top_level = [row for row in averaged if row["depth"] <= 1]
+
+    readiness = []
+    for _ in range(args.ready_repeat):
+        readiness.append(time_to_ready(args.app, args.port, env))
+
+    return {
+        "benchmark": "startup",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "config": {"module": args.module, "app": args.app, "repeat": args.repeat, "ready_repeat": args.ready_repeat},
+        "import_seconds": summarize([profile["seconds"] for profile in profiles], 3),
+        "heavy_modules_loaded": profiles[0]["heavy_loaded"],
+        "slowest_by_self": sorted(averaged, key=lambda row: row["self_seconds"], reverse=True)[:args.top],
+        "slowest_by_cumulative": sorted(top_level, key=lambda row: row["cumulative_seconds"], reverse=True)[:args.top],
+        "healthz_seconds": summarize([r["healthz_seconds"] for r in readiness if r["healthz_seconds"] is not None], 3),
+        "readyz_seconds": summarize([r["readyz_seconds"] for r in readiness if r["readyz_seconds"] is not None], 3)
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Import and readiness changes against an earlier report."""
+    lines = []
+    for key in ("import_seconds", "healthz_seconds", "readyz_seconds"):
+        before, after = baseline.get(key, {}).get("p50"), report[key]["p50"]
+        if before:
+            lines.append(f"{key:16s} p50: {before:.3f}s -> {after:.3f}s ({(after - before) / before * 100:+.1f}%)")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="Module whose import is profiled")
+    parser.add_argument("--app", default="benchmarks.stub_app:app", help="uvicorn target timed to /healthz and /readyz")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh-interpreter imports")
+    parser.add_argument("--ready-repeat", type=int, default=2, help="Service starts")
+    parser.add_argument("--top", type=int, default=15, help="Modules listed per ranking")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--output", default=None, help="Report path (default benchmarks/results/startup-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"startup-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"import {args.module}: p50 {report['import_seconds']['p50']:.3f}s, max {report['import_seconds']['max']:.3f}s")
+    print(f"heavy modules loaded at import: {', '.join(report['heavy_modules_loaded']) or 'none'}")
+    print(f"live (/healthz) after p50 {report['healthz_seconds']['p50']:.3f}s, ready (/readyz) after p50 {report['readyz_seconds']['p50']:.3f}s")
+    print("\nSlowest imports (cumulative):")
+    for row in report["slowest_by_cumulative"]:
+        print(f"  {row['cumulative_seconds']:7.3f}s  {row['module']}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print("\nAgainst baseline:")
+        for line in compare(report, baseline):
+            print(f"  {line}")
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
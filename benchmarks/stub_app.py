@@ -0,0 +1,35 @@
+# benchmarks/stub_app.py
+"""
+The API with every Gemini client replaced by the pipeline stub, for load tests.
+
+    STUB_LLM_LATENCY=lognormal:0.4,0.3 STUB_LLM_ERROR_RATE=0.02 \\
+    uvicorn benchmarks.stub_app:app --workers 2
+
+Each worker installs the stub before the agents are built. Point
+MISTRAL_OCR_URL at benchmarks/ocr_stub_server.py to stub OCR as well.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from environs import Env
+
+from benchmarks.pipeline_stub import stub_client_factory
+from utils.llm_backends import LatencyModel
+from utils.llm_pool import llm_pool
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+STUB_LLM_LATENCY = env("STUB_LLM_LATENCY", "fixed:0.3")
+STUB_LLM_PER_TOKEN_LATENCY = env.float("STUB_LLM_PER_TOKEN_LATENCY", 0.0)
+STUB_LLM_ERROR_RATE = env.float("STUB_LLM_ERROR_RATE", 0.0)
+
+llm_pool.set_client_factory(stub_client_factory(
+    0.0, STUB_LLM_PER_TOKEN_LATENCY,
+    latency_model=LatencyModel(STUB_LLM_LATENCY),
+    error_rate=STUB_LLM_ERROR_RATE
+))
+
+from app import app  # noqa: E402
@@ -0,0 +1,169 @@
+# benchmarks/worker_memory.py
+"""
+Compare the memory of N uvicorn workers (each loads the app itself) with N workers forked from a preloaded master.
+
+For each launch mode the harness starts the stubbed app, waits for /readyz,
+runs full assessments to dirty whatever pages requests touch, and reads
+/proc/<pid>/smaps_rollup of every process in the tree. USS per worker is what
+each extra worker costs; summed PSS is the real footprint of the whole tree.
+
+Usage:
+    python -m benchmarks.worker_memory --workers 4 --requests 40
+    python -m benchmarks.worker_memory --modes prefork --workers 8
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import resume_pdf
+from benchmarks.pipeline import git_commit, summarize
+from utils.prefork import memory_usage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "uvicorn": lambda port, workers: [sys.executable, "-m", "uvicorn", "benchmarks.stub_app:app", "--host", "127.0.0.1",
+                                      "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+    "prefork": lambda port, workers: [sys.executable, "serve.py", "--app", "benchmarks.stub_app:app", "--host", "127.0.0.1",
+                                      "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+}
+
+
+def children(pid: int) -> List[int]:
+    """Direct children of a process."""
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the parent pid follows its closing parenthesis
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    found.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return found
+
+
+def cmdline(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode(errors="replace")
+    except OSError:
+        return ""
+
+
+def wait_ready(port: int, process: subprocess.Popen, timeout: float = 300.0):
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        if process.poll() is not None:
+            raise RuntimeError(f"Service exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/readyz", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Service did not become ready within {timeout}s")
+
+
+def measure(mode: str, args) -> Dict[str, Any]:
+    env = {**os.environ, "CHECKPOINTS_ENABLED": "false", "STUB_LLM_LATENCY": args.llm_latency}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        MODES[mode](args.port, args.workers), cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    try:
+        wait_ready(args.port, process)
+        # Every worker answers /readyz only once its own warm-up is done
+        time.sleep(args.settle)
+        ready_seconds = time.perf_counter() - start
+
+        pdf = resume_pdf(1, 10, 3)
+
+        def assess(_):
+            return httpx.post(f"http://127.0.0.1:{args.port}/full-assessment/", files={"file": ("resume.pdf", pdf, "application/pdf")}, timeout=120).status_code
+
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            statuses = list(pool.map(assess, range(args.requests)))
+
+        # uvicorn --workers also starts a multiprocessing resource tracker; it counts in the totals only
+        tree = children(process.pid)
+        workers = [pid for pid in tree if "resource_tracker" not in cmdline(pid)]
+        master = {"pid": process.pid, **memory_usage(process.pid)}
+        worker_memory = [{"pid": pid, **memory_usage(pid)} for pid in workers]
+        helper_memory = [{"pid": pid, **memory_usage(pid)} for pid in tree if pid not in workers]
+        every = [master] + worker_memory + helper_memory
+        return {
+            "mode": mode,
+            "ready_seconds": round(ready_seconds, 2),
+            "requests_ok": sum(1 for status in statuses if status == 200),
+            "workers": worker_memory,
+            "helpers": helper_memory,
+            "master": master,
+            "worker_uss_mb": summarize([entry["uss_mb"] for entry in worker_memory], 1),
+            "worker_rss_mb": summarize([entry["rss_mb"] for entry in worker_memory], 1),
+            "total_pss_mb": round(sum(entry.get("pss_mb", 0.0) for entry in every), 1),
+            "total_rss_mb": round(sum(entry.get("rss_mb", 0.0) for entry in every), 1)
+        }
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="uvicorn,prefork", help="Comma-separated launch modes")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40, help="Full assessments run before measuring")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", default="fixed:0.01", help="Stub LLM latency model")
+    parser.add_argument("--settle", type=float, default=3.0, help="Seconds to wait after the first ready answer")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--output", default=None, help="Report path (default benchmarks/results/worker-memory-<time>.json)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        parser.error("needs /proc/<pid>/smaps_rollup (Linux 4.14+)")
+
+    results = [measure(mode, args) for mode in args.modes.split(",")]
+    report = {
+        "benchmark": "worker_memory",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "config": {"workers": args.workers, "requests": args.requests, "concurrency": args.concurrency, "llm_latency": args.llm_latency},
+        "results": results
+    }
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"worker-memory-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{args.workers} workers, {args.requests} full assessments")
+    print(f"{'mode':8s} {'ready':>7s} {'ok':>4s} {'master rss':>11s} {'worker uss p50':>15s} {'worker rss p50':>15s} {'total pss':>10s} {'total rss':>10s}")
+    for result in results:
+        print(f"{result['mode']:8s} {result['ready_seconds']:6.1f}s {result['requests_ok']:4d} "
+              f"{result['master'].get('rss_mb', 0):9.1f}MB {result['worker_uss_mb']['p50']:13.1f}MB "
+              f"{result['worker_rss_mb']['p50']:13.1f}MB {result['total_pss_mb']:8.1f}MB {result['total_rss_mb']:8.1f}MB")
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
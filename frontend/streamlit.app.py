@@ -2,7 +2,8 @@ import streamlit as st
 import requests
 
 # FastAPI backend endpoint
-API_URL = "http://localhost:8000/full-assessment/"
+BASE_URL = "http://localhost:8000"
+API_URL = f"{BASE_URL}/full-assessment/"
 
 st.set_page_config(page_title="O-1A Visa Assessment", layout="centered")
 
@@ -27,7 +28,6 @@ if uploaded_file is not None:
                 final_assessment = data.get("assessment_result", {}).get("final_assessment", {})
 
                 rating = final_assessment.get("rating", "No rating found")
-                recommendations = final_assessment.get("recommendations", "No recommendations found")
 
                 # Determine the color based on the rating
                 if rating == "LOW":
@@ -85,6 +85,14 @@ if uploaded_file is not None:
                         st.markdown("---")
 
                 st.subheader("Recommendations")
+                # Recommendations are generated on demand by a separate endpoint
+                recommendations_url = data.get("assessment_result", {}).get("recommendations_url")
+                recommendations = "No recommendations found"
+                if recommendations_url:
+                    with st.spinner("Generating recommendations..."):
+                        rec_response = requests.get(f"{BASE_URL}{recommendations_url}")
+                    if rec_response.status_code == 200:
+                        recommendations = rec_response.json().get("recommendations", recommendations)
                 st.write(recommendations)
                 
 
@@ -0,0 +1,46 @@
+# serve.py
+"""
+Serve the API from workers forked off one preloaded master, so they share its memory copy-on-write.
+
+    python serve.py --workers 4
+    WEB_CONCURRENCY=4 python serve.py --app benchmarks.stub_app:app --port 8100
+
+Unlike uvicorn --workers, the master imports the app and builds every agent
+once; see utils/prefork.py.
+"""
+import os
+import argparse
+import logging
+
+# gRPC transports created after fork need gRPC's fork handlers; set before anything imports grpc
+os.environ.setdefault("GRPC_ENABLE_FORK_SUPPORT", "1")
+
+from utils.prefork import WEB_CONCURRENCY, PreforkServer
+from utils.structured_logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Build the agents in the master; the app module is already imported (stub apps import it too)."""
+    import app
+    app.warm_up()
+    if not app.warmup["ready"]:
+        logger.warning("Preloading did not warm every agent, workers will retry: %s", app.warmup["error"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="app:app", help="uvicorn target")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--log-level", default="info", help="uvicorn log level")
+    args = parser.parse_args()
+
+    configure_logging()
+    PreforkServer(args.app, args.host, args.port, args.workers, warm_up=warm_up, log_level=args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
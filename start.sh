@@ -1,2 +1,8 @@
 #!/usr/bin/env bash
-uvicorn app:app --host 0.0.0.0 --port 8000
+# Workers are forked from one preloaded master so they share its memory (see serve.py);
+# WEB_CONCURRENCY sets their number, defaulting to 1 (utils/prefork.py).
+# SERVER=uvicorn ./start.sh runs plain uvicorn in a single process instead.
+if [ "${SERVER:-prefork}" = "uvicorn" ]; then
+    exec uvicorn app:app --host 0.0.0.0 --port 8000
+fi
+exec python serve.py --host 0.0.0.0 --port 8000
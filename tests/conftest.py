@@ -0,0 +1,11 @@
+# tests/conftest.py
+import pytest
+
+from benchmarks.pipeline_stub import stub_client_factory
+from utils.llm_pool import llm_pool
+
+
+@pytest.fixture(scope="session", autouse=True)
+def stub_llms():
+    """Answer every LLM call with the pipeline stub, so no test needs an API key or the network."""
+    llm_pool.set_client_factory(stub_client_factory(0.0))
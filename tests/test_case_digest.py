@@ -0,0 +1,46 @@
+# tests/test_case_digest.py
+from agents.case_digest import build_case_digest, format_case_digest
+from utils.knowledge_index import CHARS_PER_TOKEN, CRITERIA_ORDER
+
+
+def long_child_assessments():
+    """Eight child assessments with six long facts and a full justification each."""
+    return {
+        criterion: {
+            "assessment": {
+                "evidence_strength": "Moderate",
+                "evidence_items": [
+                    {"description": f"{criterion} evidence {n}: " + f"distinct detail {criterion} {n} " * 12, "strength": "strong"}
+                    for n in range(6)
+                ],
+                "justification": f"The {criterion} evidence is substantial because " + "it is well documented and independently verified " * 10
+            }
+        }
+        for criterion in CRITERIA_ORDER
+    }
+
+
+def test_every_criterion_survives_the_budget():
+    digest = build_case_digest({"personalInfo": {"name": "Ada"}}, {}, long_child_assessments())
+    unbounded = format_case_digest(digest, max_tokens=100000)
+    text = format_case_digest(digest)
+
+    assert len(unbounded) > len(text)
+    assert len(text) <= 2000 * CHARS_PER_TOKEN
+    for criterion in CRITERIA_ORDER:
+        assert f"{criterion.upper()} (child strength: Moderate)" in text
+        assert f"- [strong] {criterion} evidence 0" in text
+
+
+def test_headings_are_kept_under_a_tiny_budget():
+    digest = build_case_digest({}, {}, long_child_assessments())
+    text = format_case_digest(digest, max_tokens=50)
+    for criterion in CRITERIA_ORDER:
+        assert f"{criterion.upper()} (child strength: Moderate)" in text
+
+
+def test_short_digest_is_not_shortened():
+    children = {"awards": {"assessment": {"evidence_strength": "Strong", "evidence_items": [{"description": "Turing Award", "strength": "strong"}], "justification": "Major award."}}}
+    text = format_case_digest(build_case_digest({}, {}, children))
+    assert "- [strong] Turing Award" in text
+    assert "  Child assessment: Major award." in text
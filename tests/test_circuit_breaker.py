@@ -0,0 +1,73 @@
+# tests/test_circuit_breaker.py
+import time
+
+import pytest
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from utils.deadlines import DeadlineExceeded
+
+RECOVERY_SECONDS = 0.05
+
+
+def fail():
+    raise RuntimeError("503 Service Unavailable")
+
+
+@pytest.fixture
+def breaker():
+    breaker = CircuitBreaker("test:model", failure_threshold=2, recovery_seconds=RECOVERY_SECONDS)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    return breaker
+
+
+def test_opens_after_consecutive_failures(breaker):
+    assert breaker.state == OPEN
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+    assert breaker.status()["rejected"] == 1
+
+
+def test_a_success_resets_the_failure_count():
+    breaker = CircuitBreaker("test:model", failure_threshold=2, recovery_seconds=RECOVERY_SECONDS)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.call(lambda: "ok") == "ok"
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_admits_a_single_trial(breaker):
+    time.sleep(RECOVERY_SECONDS * 1.5)
+    assert breaker.status()["state"] == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_a_failed_trial_opens_the_breaker_again(breaker):
+    time.sleep(RECOVERY_SECONDS * 1.5)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+
+def test_deadline_cancellations_are_not_failures():
+    breaker = CircuitBreaker("test:model", failure_threshold=1, recovery_seconds=RECOVERY_SECONDS)
+
+    def cancelled():
+        raise DeadlineExceeded("deadline")
+
+    with pytest.raises(DeadlineExceeded):
+        breaker.call(cancelled)
+    assert breaker.state == CLOSED
+    assert breaker.status()["failures"] == 0
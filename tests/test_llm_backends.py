@@ -0,0 +1,60 @@
+# tests/test_llm_backends.py
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel
+
+from utils.llm_backends import CassetteBackend, CassetteMissError, LatencyModel
+
+
+class Verdict(BaseModel):
+    rating: str
+    reasons: list
+
+
+def request(prompt):
+    return {
+        "model": "gemini-2.0-flash",
+        "temperature": 0,
+        "messages": [SystemMessage(content="You are an O-1A expert."), HumanMessage(content=prompt)]
+    }
+
+
+@pytest.fixture
+def backends(tmp_path):
+    recorder = CassetteBackend("record", str(tmp_path))
+    player = CassetteBackend("replay", str(tmp_path), latency=LatencyModel("none"))
+    return recorder, player
+
+
+def never_called():
+    raise AssertionError("replay called the provider")
+
+
+def test_messages_round_trip(backends):
+    recorder, player = backends
+    recorded = recorder.invoke(request("Assess awards"), lambda: AIMessage(content="Strong awards evidence"))
+    replayed = player.invoke(request("Assess awards"), never_called)
+    assert isinstance(replayed, AIMessage)
+    assert replayed.content == recorded.content
+    assert (recorder.recorded, player.replayed) == (1, 1)
+
+
+def test_structured_outputs_round_trip(backends):
+    recorder, player = backends
+    verdict = Verdict(rating="HIGH", reasons=["3 strong criteria"])
+    recorder.invoke(request("Final determination"), lambda: verdict, Verdict)
+    assert player.invoke(request("Final determination"), never_called, Verdict) == verdict
+
+    raw = {"raw": AIMessage(content="{}"), "parsed": verdict, "parsing_error": None}
+    recorder.invoke(request("With raw output"), lambda: raw, Verdict)
+    replayed = player.invoke(request("With raw output"), never_called, Verdict)
+    assert replayed["parsed"] == verdict
+    assert replayed["raw"].content == "{}"
+
+
+def test_an_unrecorded_request_misses(backends):
+    recorder, player = backends
+    recorder.invoke(request("Assess awards"), lambda: AIMessage(content="ok"))
+    with pytest.raises(CassetteMissError):
+        player.invoke(request("Assess press"), never_called)
+    assert player.misses == 1
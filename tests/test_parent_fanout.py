@@ -0,0 +1,39 @@
+# tests/test_parent_fanout.py
+import pytest
+
+from agents.parent_agent import ParentAgent, merge_analyses, merge_errors
+from benchmarks.parent_latency import sample_input
+
+CONCURRENT_STAGES = {"initial_analysis", "analyze_child_assessments", "cross_reference_criteria"}
+
+
+@pytest.fixture
+def agent():
+    agent = ParentAgent()
+    agent.vectorstore = None
+    return agent
+
+
+def test_merge_analyses_keeps_every_branch():
+    merged = merge_analyses({}, {"initial_analysis": "a"})
+    merged = merge_analyses(merged, {"cross_reference_analysis": "c"})
+    merged = merge_analyses(merged, {"child_assessment_analysis": "b"})
+    assert merged == {"initial_analysis": "a", "cross_reference_analysis": "c", "child_assessment_analysis": "b"}
+    assert merge_analyses(None, {"x": 1}) == {"x": 1}
+
+
+def test_merge_errors_combines_concurrent_failures():
+    error = merge_errors("", "initial_analysis failed")
+    error = merge_errors(error, "cross_reference_criteria failed")
+    assert error == "initial_analysis failed; cross_reference_criteria failed"
+    assert merge_errors(error, "initial_analysis failed") == "initial_analysis failed"
+    assert merge_errors(error, "") == ""
+
+
+def test_fan_out_stages_all_reach_the_final_state(agent):
+    result = agent.invoke(sample_input(), mode="full")
+    assert result["error"] == ""
+    assert result["skipped_stages"] == []
+    assert CONCURRENT_STAGES <= set(result["stage_metrics"])
+    assert "final_determination" in result["stage_metrics"]
+    assert result["final_assessment"]["rating"] in ("LOW", "MEDIUM", "HIGH")
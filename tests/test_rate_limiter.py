@@ -0,0 +1,66 @@
+# tests/test_rate_limiter.py
+import time
+import threading
+
+import pytest
+
+from utils.rate_limiter import TokenBucketLimiter, current_priority, llm_priority
+
+
+def wait_for_queue(limiter, queued):
+    deadline = time.monotonic() + 5
+    while limiter.metrics()["queued"] < queued:
+        assert time.monotonic() < deadline, "waiter never queued"
+        time.sleep(0.005)
+
+
+def test_priority_follows_request_class_then_stage():
+    assert current_priority() == (0, 0)
+    with llm_priority("batch", stage="final"):
+        batch_final = current_priority()
+    with llm_priority(stage="child"):
+        interactive_child = current_priority()
+        with llm_priority(stage="final"):
+            interactive_final = current_priority()
+    assert sorted([batch_final, interactive_child, interactive_final]) == [interactive_final, interactive_child, batch_final]
+    with pytest.raises(ValueError):
+        with llm_priority("bulk"):
+            pass
+
+
+def test_waiters_are_served_in_priority_order():
+    # 120 requests per minute: once drained, one request is granted every 0.5s
+    limiter = TokenBucketLimiter(rpm=120, tpm=1000000)
+    for _ in range(120):
+        limiter.acquire(1)
+
+    served = []
+
+    def waiter(name, request_class, stage):
+        with llm_priority(request_class, stage):
+            limiter.acquire(1, current_priority())
+        served.append(name)
+
+    threads = []
+    for queued, (name, request_class, stage) in enumerate([
+        ("batch", "batch", "final"),
+        ("interactive child", "interactive", "child"),
+        ("interactive final", "interactive", "final"),
+    ], start=1):
+        thread = threading.Thread(target=waiter, args=(name, request_class, stage))
+        thread.start()
+        threads.append(thread)
+        wait_for_queue(limiter, queued)
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert served == ["interactive final", "interactive child", "batch"]
+    assert limiter.metrics()["queued"] == 0
+
+
+def test_a_timed_out_waiter_leaves_the_queue():
+    limiter = TokenBucketLimiter(rpm=1, tpm=1000000)
+    limiter.acquire(1)
+    with pytest.raises(TimeoutError):
+        limiter.acquire(1, timeout=0.05)
+    assert limiter.metrics()["queued"] == 0
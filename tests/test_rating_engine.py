@@ -0,0 +1,70 @@
+# tests/test_rating_engine.py
+import pytest
+
+from agents.rating_engine import RatingRules, rate_assessment, rate_batch, rating_input
+from utils.knowledge_index import CRITERIA_ORDER
+
+
+def child_assessments(*strengths):
+    """Child agent results for the first criteria with the given strengths, None for the rest."""
+    padded = list(strengths) + ["None"] * (len(CRITERIA_ORDER) - len(strengths))
+    return {
+        criterion: {
+            "assessment": {
+                "evidence_strength": strength,
+                "evidence_items": [{"description": f"{criterion} item", "strength": strength}]
+            },
+            "error": ""
+        }
+        for criterion, strength in zip(CRITERIA_ORDER, padded)
+    }
+
+
+@pytest.mark.parametrize("strengths, rating", [
+    (["Strong", "Strong", "Strong"], "HIGH"),
+    (["Moderate"] * 5, "HIGH"),
+    (["Strong", "Strong", "Moderate", "Moderate"], "MEDIUM"),
+    (["Moderate"] * 3, "MEDIUM"),
+    (["Strong", "Moderate", "Weak", "Weak"], "LOW"),
+    ([], "LOW"),
+])
+def test_rating_thresholds(strengths, rating):
+    result = rate_assessment(child_assessments(*strengths))
+    assert result["rating"] == rating
+    assert result["explanation"].startswith(rating)
+
+
+def test_strengths_are_case_insensitive():
+    result = rate_assessment(child_assessments("strong", " STRONG ", "Strong"))
+    assert result["rating"] == "HIGH"
+    assert result["strong_count"] == 3
+
+
+def test_rules_can_be_overridden():
+    assessments = child_assessments("Moderate", "Moderate", "Weak")
+    assert rate_assessment(assessments)["rating"] == "LOW"
+    assert rate_assessment(assessments, RatingRules(medium_min_met=2))["rating"] == "MEDIUM"
+    assert rate_assessment(assessments, RatingRules(medium_min_met=2, met_level=1))["rating"] == "MEDIUM"
+    assert rate_assessment(assessments, RatingRules(high_min_met=3, met_level=1))["rating"] == "HIGH"
+
+
+def test_rate_batch_matches_rate_assessment():
+    batch = [
+        child_assessments("Strong", "Strong", "Strong"),
+        child_assessments("Moderate", "Moderate", "Moderate"),
+        child_assessments("Weak"),
+    ]
+    expected = [rate_assessment(assessments) for assessments in batch]
+    results = rate_batch(batch)
+    assert [result["rating"] for result in results] == ["HIGH", "MEDIUM", "LOW"]
+    for result, single in zip(results, expected):
+        assert result == {key: single[key] for key in ("rating", "strong_count", "moderate_count", "score")}
+
+
+def test_rate_batch_reads_stored_rating_inputs_and_results():
+    assessments = child_assessments("Strong", "Moderate", "Moderate", "Moderate", "Moderate")
+    stored = rating_input(assessments)
+    assert set(stored) == set(CRITERIA_ORDER)
+    by_input, by_result = rate_batch([stored, {"child_assessments": assessments}])
+    assert by_input == by_result
+    assert by_input["rating"] == rate_assessment(assessments)["rating"] == "HIGH"
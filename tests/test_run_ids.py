@@ -0,0 +1,41 @@
+# tests/test_run_ids.py
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from benchmarks.parent_latency import sample_input
+from utils import checkpointing
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(checkpointing, "CHECKPOINT_DB", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setattr(checkpointing, "_checkpointer", None)
+    monkeypatch.setattr(checkpointing, "_runs_ready", False)
+    return TestClient(api.app)
+
+
+def test_reusing_a_run_id_with_another_input_returns_409(client):
+    resume = sample_input()["structured_resume"]
+    headers = {"X-Run-Id": "run-1"}
+    assert client.post("/map-criteria/", json=resume, headers=headers).status_code == 200
+    assert client.post("/map-criteria/", json=resume, headers=headers).status_code == 200
+
+    response = client.post("/map-criteria/", json={**resume, "awards": []}, headers=headers)
+    assert response.status_code == 409
+    assert response.headers["X-Run-Id"] == "run-1"
+    assert "different structured_resume" in response.json()["detail"]
+
+
+def test_run_ids_are_bound_per_scope(client):
+    checkpointing.claim_run("run-2", "document", checkpointing.input_hash("file", b"%PDF"))
+    checkpointing.claim_run("run-2", "assessment", checkpointing.input_hash("full"))
+    checkpointing.claim_run("run-2", "document", checkpointing.input_hash("file", b"%PDF"))
+    with pytest.raises(checkpointing.RunInputMismatch):
+        checkpointing.claim_run("run-2", "assessment", checkpointing.input_hash("fast"))
+
+
+def test_requests_without_a_run_id_are_not_claimed(client):
+    resume = sample_input()["structured_resume"]
+    assert client.post("/map-criteria/", json=resume).status_code == 200
+    assert client.post("/map-criteria/", json={**resume, "awards": []}).status_code == 200
@@ -0,0 +1,15 @@
+# tests/test_stage_metrics.py
+import pytest
+
+from utils import metrics, tracing
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_stage_durations_do_not_depend_on_tracing(monkeypatch, enabled):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", enabled)
+    stage = f"test_stage_{enabled}"
+    with tracing.trace_scope("request") as trace:
+        with tracing.span(stage):
+            pass
+    assert (trace is not None) == enabled
+    assert f'o1a_stage_duration_seconds_count{{stage="{stage}"}} 1' in metrics.render()
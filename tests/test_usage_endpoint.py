@@ -0,0 +1,24 @@
+# tests/test_usage_endpoint.py
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from utils import profiling
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "secret")
+    return TestClient(api.app)
+
+
+def test_all_keys_need_the_admin_token(client):
+    assert client.get("/usage/").status_code == 403
+    assert client.get("/usage/", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/usage/", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_a_key_sees_only_its_own_totals(client):
+    response = client.get("/usage/", headers={"X-API-Key": "tenant-a"})
+    assert response.status_code == 200
+    assert response.json() == api.usage_ledger.summary(api.key_fingerprint("tenant-a"))
@@ -0,0 +1,159 @@
+# utils/assessment_store.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Dict, Any, Callable, List, Optional
+
+from environs import Env
+
+from utils.metrics import cache_lookup
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+ASSESSMENT_STORE_SIZE = env.int("ASSESSMENT_STORE_SIZE", 1000)
+# Shared by every worker process, so any of them can serve an assessment's recommendations
+ASSESSMENT_DB = env.str("ASSESSMENT_DB", env.str("CHECKPOINT_DB", "./checkpoints/checkpoints.sqlite"))
+
+# Concurrent first requests for an assessment in this process share one generation
+_GENERATION_LOCKS = 64
+
+
+class AssessmentStore:
+    """Bounded store of completed assessments with memoized recommendations, in SQLite shared by all workers."""
+
+    def __init__(self, max_size: int = ASSESSMENT_STORE_SIZE, path: str = ASSESSMENT_DB):
+        self.max_size = max_size
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._generation_locks = [threading.Lock() for _ in range(_GENERATION_LOCKS)]
+
+    def _connection(self) -> sqlite3.Connection:
+        # Caller holds the store lock
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS assessments ("
+                "assessment_id TEXT PRIMARY KEY, final_assessment TEXT NOT NULL, "
+                "recommendations TEXT, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS assessments_accessed_at ON assessments (accessed_at)")
+            # Added after the first release: the child strengths the rating rules read, and the latest re-rating
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(assessments)")}
+            for column in ("rating_input", "rerated"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE assessments ADD COLUMN {column} TEXT")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def save(self, final_assessment: Dict[str, Any], recommendations: Optional[str] = None, rating_input: Optional[Dict[str, Any]] = None) -> str:
+        """Store a final assessment, and the child strengths it was rated from, and return its id."""
+        assessment_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO assessments (assessment_id, final_assessment, recommendations, accessed_at, rating_input) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        assessment_id, json.dumps(final_assessment, default=str), recommendations, time.time(),
+                        None if rating_input is None else json.dumps(rating_input)
+                    )
+                )
+                # Evict the least recently used entries
+                conn.execute(
+                    "DELETE FROM assessments WHERE assessment_id NOT IN "
+                    "(SELECT assessment_id FROM assessments ORDER BY accessed_at DESC LIMIT ?)",
+                    (self.max_size,)
+                )
+        return assessment_id
+
+    def get(self, assessment_id: str) -> Optional[Dict[str, Any]]:
+        """Get a stored assessment, or None if it is unknown or was evicted."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                row = conn.execute(
+                    "SELECT final_assessment, recommendations, rerated FROM assessments WHERE assessment_id = ?", (assessment_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE assessments SET accessed_at = ? WHERE assessment_id = ?", (time.time(), assessment_id))
+        return {"final_assessment": json.loads(row[0]), "recommendations": row[1], "rerated": json.loads(row[2]) if row[2] else None}
+
+    def rerate(self, rate: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]], batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Re-rate every stored assessment with rate(batch of rating inputs), e.g. rating_engine.rate_batch
+        after the rules change, storing each result as the assessment's "rerated" entry.
+
+        Returns how many assessments were re-rated and how many of them changed rating.
+        """
+        rerated = changed = 0
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT assessment_id, final_assessment, rating_input FROM assessments "
+                    "WHERE rating_input IS NOT NULL AND assessment_id > ? ORDER BY assessment_id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            results = rate([json.loads(row[2]) for row in rows])
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(
+                        "UPDATE assessments SET rerated = ? WHERE assessment_id = ?",
+                        [(json.dumps(result), row[0]) for row, result in zip(rows, results)]
+                    )
+            rerated += len(rows)
+            changed += sum(1 for row, result in zip(rows, results) if json.loads(row[1]).get("rating") != result.get("rating"))
+        return {"rerated": rerated, "changed": changed}
+
+    def get_recommendations(self, assessment_id: str, generate: Callable[[Dict[str, Any]], str]) -> Optional[str]:
+        """
+        Return the recommendations for an assessment, generating them on first request.
+
+        Concurrent first requests in one worker share a single generation; across
+        workers the first one stored wins.
+        """
+        with self._generation_locks[hash(assessment_id) % _GENERATION_LOCKS]:
+            entry = self.get(assessment_id)
+            if entry is None:
+                return None
+            cache_lookup("recommendations", entry["recommendations"] is not None)
+            if entry["recommendations"] is not None:
+                return entry["recommendations"]
+
+            recommendations = generate(entry["final_assessment"])
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.execute(
+                        "UPDATE assessments SET recommendations = ? WHERE assessment_id = ? AND recommendations IS NULL",
+                        (recommendations, assessment_id)
+                    )
+                    row = conn.execute(
+                        "SELECT recommendations FROM assessments WHERE assessment_id = ?", (assessment_id,)
+                    ).fetchone()
+            return row[0] if row is not None and row[0] is not None else recommendations
+
+    def _after_fork_in_child(self):
+        # SQLite connections must not be used across fork; the child opens its own on first use
+        self._conn = None
+        self._lock = threading.Lock()
+        self._generation_locks = [threading.Lock() for _ in range(_GENERATION_LOCKS)]
+
+
+# Process-wide store used by the API
+assessment_store = AssessmentStore()
+os.register_at_fork(after_in_child=assessment_store._after_fork_in_child)
@@ -0,0 +1,231 @@
+# utils/checkpointing.py
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Dict, Any, Callable, List, Optional
+
+from environs import Env
+
+from utils.metrics import cache_lookup
+from utils.tracing import span, tracing_callbacks
+
+if TYPE_CHECKING:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+CHECKPOINTS_ENABLED = env.bool("CHECKPOINTS_ENABLED", True)
+CHECKPOINT_DB = env.str("CHECKPOINT_DB", "./checkpoints/checkpoints.sqlite")
+# Checkpoints (which hold resume text) of runs untouched for this long are deleted
+CHECKPOINT_TTL_SECONDS = env.int("CHECKPOINT_TTL_SECONDS", 3600)
+# Seconds between sweeps for expired runs in each process
+CHECKPOINT_PRUNE_INTERVAL = env.int("CHECKPOINT_PRUNE_INTERVAL", 60)
+
+_checkpointer: Optional["SqliteSaver"] = None
+_checkpointer_lock = threading.Lock()
+_runs_ready = False
+_last_prune = 0.0
+# Uncheckpointed copies of compiled workflows, for runs without a client-supplied run id
+_plain_graphs: Dict[int, Any] = {}
+
+
+class RunInputMismatch(ValueError):
+    """A run id was reused for a different input, whose run would otherwise get the old result."""
+
+
+def get_checkpointer() -> Optional["SqliteSaver"]:
+    """Get the process-wide SQLite checkpointer, or None when checkpointing is disabled."""
+    global _checkpointer
+    if not CHECKPOINTS_ENABLED:
+        return None
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                from langgraph.checkpoint.sqlite import SqliteSaver
+                os.makedirs(os.path.dirname(CHECKPOINT_DB) or ".", exist_ok=True)
+                conn = sqlite3.connect(CHECKPOINT_DB, check_same_thread=False)
+                _checkpointer = SqliteSaver(conn)
+    return _checkpointer
+
+
+def _after_fork_in_child():
+    # SQLite connections must not be used across fork: give the child its own connection,
+    # in place, since the workflows compiled before the fork hold this checkpointer
+    global _checkpointer_lock
+    _checkpointer_lock = threading.Lock()
+    if _checkpointer is not None:
+        _checkpointer.conn = sqlite3.connect(CHECKPOINT_DB, check_same_thread=False)
+        _checkpointer.lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def input_hash(*parts: Any) -> str:
+    """Hash of a run's input (uploaded bytes, URL, JSON text, mode...)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _setup_runs(saver: "SqliteSaver"):
+    global _runs_ready
+    if _runs_ready:
+        return
+    with saver.cursor() as cur:
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_runs ("
+            "run_id TEXT NOT NULL, scope TEXT NOT NULL, input_hash TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (run_id, scope))"
+        )
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_threads ("
+            "thread_id TEXT PRIMARY KEY, run_id TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+    _runs_ready = True
+
+
+def claim_run(run_id: Optional[str], scope: str, digest: str):
+    """
+    Tie a client-supplied run id to the hash of its input, per kind of input (scope).
+
+    Raises RunInputMismatch when the run id was already used for a different
+    input in the same scope. Also sweeps expired checkpoints now and then.
+    """
+    saver = get_checkpointer()
+    if run_id is None or saver is None:
+        return
+    _setup_runs(saver)
+    with saver.cursor() as cur:
+        row = cur.execute(
+            "SELECT input_hash FROM checkpoint_runs WHERE run_id = ? AND scope = ?", (run_id, scope)
+        ).fetchone()
+        if row is not None and row[0] != digest:
+            raise RunInputMismatch(f"Run {run_id} was started with a different {scope}; use a new run id")
+        cur.execute("INSERT OR REPLACE INTO checkpoint_runs VALUES (?, ?, ?, ?)", (run_id, scope, digest, time.time()))
+    prune_checkpoints()
+
+
+def prune_checkpoints(ttl: int = CHECKPOINT_TTL_SECONDS, force: bool = False) -> int:
+    """Delete the checkpoints of runs untouched for ttl seconds; returns the number of threads deleted."""
+    global _last_prune
+    saver = get_checkpointer()
+    now = time.time()
+    if saver is None or (not force and now - _last_prune < CHECKPOINT_PRUNE_INTERVAL):
+        return 0
+    _last_prune = now
+    _setup_runs(saver)
+    with saver.cursor() as cur:
+        expired = [row[0] for row in cur.execute(
+            "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?", (now - ttl,)
+        ).fetchall()]
+    for thread_id in expired:
+        saver.delete_thread(thread_id)
+    with saver.cursor() as cur:
+        cur.executemany("DELETE FROM checkpoint_threads WHERE thread_id = ?", [(thread_id,) for thread_id in expired])
+        cur.execute("DELETE FROM checkpoint_runs WHERE updated_at < ?", (now - ttl,))
+    if expired:
+        # Keep the write-ahead log from growing; freed pages are reused by later checkpoints
+        with saver.cursor(transaction=False) as cur:
+            cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        logger.info("Pruned checkpoints of %d expired workflow threads", len(expired))
+    return len(expired)
+
+
+def _touch_thread(saver: "SqliteSaver", thread_id: str, run_id: str):
+    _setup_runs(saver)
+    with saver.cursor() as cur:
+        cur.execute("INSERT OR REPLACE INTO checkpoint_threads VALUES (?, ?, ?)", (thread_id, run_id, time.time()))
+
+
+def _without_checkpointer(graph):
+    plain = _plain_graphs.get(id(graph))
+    if plain is None:
+        plain = _plain_graphs.setdefault(id(graph), graph.copy(update={"checkpointer": None}))
+    return plain
+
+
+def thread_config(run_id: str, workflow: str) -> Dict[str, Any]:
+    """Checkpoint config for one workflow of a run; each workflow gets its own thread."""
+    return {"configurable": {"thread_id": f"{run_id}:{workflow}"}}
+
+
+def _lineage(graph, config: Dict[str, Any]) -> List[Any]:
+    """Checkpoints leading to the current state of a thread, oldest first, ignoring abandoned forks."""
+    snapshots = {snapshot.config["configurable"]["checkpoint_id"]: snapshot for snapshot in graph.get_state_history(config)}
+    lineage = []
+    snapshot = graph.get_state(config)
+    while snapshot is not None and snapshot.config and snapshot.config["configurable"].get("checkpoint_id"):
+        lineage.append(snapshot)
+        parent = snapshot.parent_config
+        snapshot = snapshots.get(parent["configurable"]["checkpoint_id"]) if parent else None
+    return list(reversed(lineage))
+
+
+def invoke_checkpointed(
+    graph,
+    initial_state: Dict[str, Any],
+    run_id: Optional[str],
+    workflow: str,
+    failed: Callable[[Dict[str, Any]], bool] = lambda values: bool(values.get("error"))
+) -> Dict[str, Any]:
+    """
+    Invoke a compiled workflow so that a retry with the same run id resumes it.
+
+    Without a run id nothing is checkpointed. With one (claimed by the caller
+    with claim_run), its thread is kept until CHECKPOINT_TTL_SECONDS pass
+    without a retry:
+
+    - No checkpoint yet: run from the initial state.
+    - Interrupted mid-run: continue from the last completed node.
+    - Completed, but a node failed along the way: replay from the checkpoint
+      just before the first failure, reusing every node completed before it.
+    - Completed cleanly: return the stored result without recomputing anything.
+    """
+    with span(workflow, workflow=workflow) as current:
+        # Tracing callbacks open a span around every node of the workflow
+        callbacks = tracing_callbacks(workflow)
+
+        def run(state, config=None):
+            return graph.invoke(state, {**(config or {}), "callbacks": callbacks})
+
+        if graph.checkpointer is None:
+            return run(initial_state)
+        if run_id is None:
+            return _without_checkpointer(graph).invoke(initial_state, {"callbacks": callbacks})
+
+        config = thread_config(run_id, workflow)
+        _touch_thread(graph.checkpointer, config["configurable"]["thread_id"], run_id)
+        lineage = _lineage(graph, config)
+        if not lineage:
+            cache_lookup("checkpoint", False)
+            return run(initial_state, config)
+
+        latest = lineage[-1]
+        # Resuming counts as a hit: the completed nodes are not recomputed
+        cache_lookup("checkpoint", not failed(lineage[0].values))
+        if latest.next:
+            if current is not None:
+                current.set(resumed=True)
+            return run(None, config)
+
+        for index, snapshot in enumerate(lineage):
+            if failed(snapshot.values):
+                if index == 0:
+                    return run(initial_state, config)
+                logger.info("Resuming %s workflow of run %s before %s", workflow, run_id, ", ".join(lineage[index - 1].next))
+                if current is not None:
+                    current.set(resumed=True)
+                return run(None, lineage[index - 1].config)
+
+        if current is not None:
+            current.set(cached=True)
+        return latest.values
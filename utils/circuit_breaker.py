@@ -0,0 +1,134 @@
+# utils/circuit_breaker.py
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, Optional
+
+from environs import Env
+
+from utils.deadlines import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+BREAKER_FAILURE_THRESHOLD = env.int("BREAKER_FAILURE_THRESHOLD", 5)
+BREAKER_RECOVERY_SECONDS = env.float("BREAKER_RECOVERY_SECONDS", 30.0)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The provider is failing; the call was rejected without being attempted."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one provider and model.
+
+    After failure_threshold consecutive failures the breaker opens and rejects
+    calls immediately, so callers go straight to their fallbacks. After
+    recovery_seconds a single trial call is let through; its outcome closes the
+    breaker or opens it again. Calls abandoned because the request deadline
+    expired say nothing about the provider and are not counted.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, recovery_seconds: float = BREAKER_RECOVERY_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.rejected = 0
+        self.failures = 0
+        self.successes = 0
+        self.last_error = ""
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Admit a call, or raise CircuitOpenError while the breaker is open."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_seconds:
+                self.state = HALF_OPEN
+            if self.state == OPEN or (self.state == HALF_OPEN and self.trial_in_flight):
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit breaker {self.name} is open: {self.last_error}")
+            if self.state == HALF_OPEN:
+                self.trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+            self.state = CLOSED
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)[:200]
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning("Circuit breaker %s opened after %d failures: %s", self.name, self.consecutive_failures, self.last_error)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """Release a trial slot taken by a call that was abandoned, without judging the provider."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run fn through the breaker."""
+        self.before_call()
+        try:
+            result = fn()
+        except DeadlineExceeded:
+            self.record_cancelled()
+            raise
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self.state
+            if state == OPEN and time.monotonic() - self.opened_at >= self.recovery_seconds:
+                state = HALF_OPEN
+            return {
+                "state": state,
+                "consecutive_failures": self.consecutive_failures,
+                "failures": self.failures,
+                "successes": self.successes,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+                "retry_in_seconds": round(max(0.0, self.recovery_seconds - (time.monotonic() - self.opened_at)), 1) if state == OPEN else 0.0
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str, model: str) -> CircuitBreaker:
+    """Get the process-wide breaker for a provider and model."""
+    name = f"{provider}:{model}"
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_status() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.status() for name, breaker in breakers.items()}
@@ -0,0 +1,97 @@
+# utils/deadlines.py
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Optional
+
+from environs import Env
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+# Default time budget per API request in seconds (0 disables)
+REQUEST_DEADLINE_SECONDS = env.float("REQUEST_DEADLINE_SECONDS", 0)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request ran out of its time budget."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Give the work in this context at most `seconds`; never extends an enclosing deadline."""
+    if seconds is None or seconds <= 0:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, or None when there is no deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline(what: str = "request"):
+    """Raise DeadlineExceeded if the deadline has passed."""
+    if expired():
+        raise DeadlineExceeded(f"Deadline exceeded before {what}")
+
+
+def call_with_deadline(fn: Callable[[], Any], what: str = "call") -> Any:
+    """
+    Run fn, giving up when the deadline expires.
+
+    A blocking call cannot be interrupted, so it runs in a daemon thread that is
+    abandoned on expiry; its result is discarded and the caller fails fast. The
+    thread still runs fn to the end, so fn must release what it holds itself.
+    """
+    left = remaining()
+    if left is None:
+        return fn()
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {what}")
+
+    outcome = {}
+    done = threading.Event()
+    context = copy_context()
+
+    def run():
+        try:
+            outcome["result"] = context.run(fn)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=run, name="deadline-call", daemon=True).start()
+    if not done.wait(left):
+        raise DeadlineExceeded(f"Deadline exceeded during {what}; call abandoned")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def with_request_timeout(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Call options with what is left of the deadline as the request timeout, so an abandoned call does not run on."""
+    left = remaining()
+    if left is None:
+        return kwargs
+    timeout = kwargs.get("timeout")
+    return {**kwargs, "timeout": max(left if timeout is None else min(timeout, left), 0.001)}
@@ -2,14 +2,30 @@
 import requests
 import io
 import os
+import logging
 from typing import BinaryIO, Optional, Union
 from environs import Env
 
+from utils.deadlines import remaining
+from utils.circuit_breaker import get_breaker
+from utils.metrics import fallbacks
+from utils.tracing import annotate, traced
+
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 env = Env()
 env.read_env()  # Read .env file if it exists
 MISTRAL_API_KEY = env("MISTRAL_API_KEY", None)  # Allow fallback to None if not set
+# Point at benchmarks/ocr_stub_server.py to run extraction offline
+MISTRAL_OCR_URL = env("MISTRAL_OCR_URL", "https://api.mistral.ai/v1/ocr")
+
+def _ocr_timeout():
+    """Bound HTTP calls by the request deadline, if any; an expired deadline falls back to PyPDF quickly."""
+    left = remaining()
+    return None if left is None else max(left, 0.1)
 
+@traced("ocr.mistral")
 def extract_text_with_mistral_ocr(
     file_input: Union[BinaryIO, str], 
     is_url: bool = False
@@ -27,7 +43,7 @@ def extract_text_with_mistral_ocr(
     if not MISTRAL_API_KEY:
         raise ValueError("MISTRAL_API_KEY environment variable is not set")
     
-    url = "https://api.mistral.ai/v1/ocr"
+    url = MISTRAL_OCR_URL
     headers = {
         "Authorization": f"Bearer {MISTRAL_API_KEY}",
         "Content-Type": "application/json"
@@ -44,7 +60,7 @@ def extract_text_with_mistral_ocr(
                 "document_name": "resume.pdf",
             }
         }
-        response = requests.post(url, json=payload, headers=headers)
+        response = requests.post(url, json=payload, headers=headers, timeout=_ocr_timeout())
     else:
         # For file uploads, we need to use multipart/form-data
         # First, prepare multipart form with the file
@@ -59,7 +75,7 @@ def extract_text_with_mistral_ocr(
         upload_headers = {
             "Authorization": f"Bearer {MISTRAL_API_KEY}"
         }
-        response = requests.post(url, files=files, data=data, headers=upload_headers)
+        response = requests.post(url, files=files, data=data, headers=upload_headers, timeout=_ocr_timeout())
     
     # Process the response
     if response.status_code == 200:
@@ -72,11 +88,28 @@ def extract_text_with_mistral_ocr(
                 # We're not including page markers in the text since
                 # we want continuous text for the resume analysis
                 full_text += page.get('markdown', '') + "\n\n"
+        annotate(pages=len(result.get('pages') or []), chars=len(full_text))
         return full_text
     else:
         error_msg = f"OCR API Error {response.status_code}: {response.text}"
         raise Exception(error_msg)
 
+@traced("ocr.pypdf")
+def extract_text_with_pypdf(file_object: BinaryIO) -> str:
+    """Extract text from a PDF with PyPDF, the fallback when OCR is unavailable."""
+    import pypdf
+    fallbacks.inc(path="pypdf")
+    text = ""
+    pdf_reader = pypdf.PdfReader(file_object)
+    
+    for page_num in range(len(pdf_reader.pages)):
+        page = pdf_reader.pages[page_num]
+        text += page.extract_text() + "\n\n"
+    
+    annotate(pages=len(pdf_reader.pages), chars=len(text))
+    return text
+
+@traced("extract", source="file")
 def extract_text_from_pdf(file_object: BinaryIO) -> str:
     """
     Extract text from a PDF file using Mistral OCR.
@@ -93,27 +126,21 @@ def extract_text_from_pdf(file_object: BinaryIO) -> str:
         if MISTRAL_API_KEY:
             # Reset file pointer to beginning
             file_object.seek(0)
-            return extract_text_with_mistral_ocr(file_object)
+            # While Mistral keeps failing the breaker is open and we go straight to PyPDF
+            return get_breaker("mistral", "ocr").call(lambda: extract_text_with_mistral_ocr(file_object))
         else:
             raise ValueError("MISTRAL_API_KEY not set, falling back to PyPDF")
     except Exception as e:
         # Fallback to PyPDF if Mistral OCR fails
-        print(f"Mistral OCR failed: {str(e)}. Falling back to PyPDF.")
+        logger.warning("Mistral OCR failed: %s. Falling back to PyPDF.", e)
         
         # Reset file pointer to beginning
         file_object.seek(0)
         
         # Use PyPDF as fallback
-        import pypdf
-        text = ""
-        pdf_reader = pypdf.PdfReader(file_object)
-        
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text += page.extract_text() + "\n\n"
-        
-        return text
+        return extract_text_with_pypdf(file_object)
 
+@traced("extract", source="url")
 def extract_text_from_url(url: str) -> str:
     """
     Extract text from a PDF at a given URL using Mistral OCR.
@@ -127,28 +154,22 @@ def extract_text_from_url(url: str) -> str:
     try:
         # Use Mistral OCR with URL
         if MISTRAL_API_KEY:
-            return extract_text_with_mistral_ocr(url, is_url=True)
+            return get_breaker("mistral", "ocr").call(lambda: extract_text_with_mistral_ocr(url, is_url=True))
         else:
             raise ValueError("MISTRAL_API_KEY not set")
     except Exception as e:
         # For URLs, we need to download the file first for PyPDF fallback
-        print(f"Mistral OCR with URL failed: {str(e)}. Downloading file for PyPDF.")
+        logger.warning("Mistral OCR with URL failed: %s. Downloading file for PyPDF.", e)
         
         # Download the file
-        response = requests.get(url)
+        response = requests.get(url, timeout=_ocr_timeout())
         if response.status_code == 200:
             # Create in-memory file-like object
             file_object = io.BytesIO(response.content)
             
             # Use PyPDF
-            import pypdf
-            text = ""
-            pdf_reader = pypdf.PdfReader(file_object)
-            
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n\n"
-            print ("text", text)
+            text = extract_text_with_pypdf(file_object)
+            logger.debug("Extracted %d chars from %s with PyPDF", len(text), url)
             return text
         else:
             raise Exception(f"Failed to download PDF from URL: {response.status_code}")
@@ -0,0 +1,249 @@
+# utils/knowledge_base.py
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import weakref
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from utils.knowledge_index import KNOWLEDGE_BASE_PATH, reload_knowledge_index
+from utils.llm_backends import get_embeddings
+from utils.prefork import preloading
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+
+logger = logging.getLogger(__name__)
+
+PERSIST_DIRECTORY = "./knowledge_base/chroma_db"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "sync.lock"
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class KnowledgeBase:
+    """
+    Vector store over the O-1A knowledge base with chunk-level incremental updates.
+
+    Every chunk is stored under the hash of its content, so a sync only embeds
+    chunks that are new or modified and evicts chunks that no longer exist.
+    Each version of the file lives in its own collection, which is swapped in
+    with a single reference assignment once it is complete.
+    """
+
+    def __init__(self, path: str = KNOWLEDGE_BASE_PATH, persist_directory: str = PERSIST_DIRECTORY, embedding_function=None):
+        self.path = path
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function or get_embeddings()
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            separators=["\n# ", "\n## ", "\n### ", "\n#### ", "\n", " ", ""]
+        )
+        self.vectorstore: Optional["Chroma"] = None
+        self.collection_name = ""
+        self.file_hash = ""
+        self._sync_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self._watch_interval: Optional[float] = None
+        _instances.add(self)
+        # Chroma's client does not survive fork: a preloading master leaves it to each worker to open
+        if not preloading():
+            self.sync()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.persist_directory, MANIFEST_FILE)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    @contextmanager
+    def _process_lock(self):
+        # Worker processes share the persist directory; one syncs while the others wait and then just open its result
+        os.makedirs(self.persist_directory, exist_ok=True)
+        with open(os.path.join(self.persist_directory, LOCK_FILE), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _open_collection(self, name: str) -> "Chroma":
+        # Deferred: chromadb is slow to import and only needed once the knowledge base is built
+        from langchain_community.vectorstores import Chroma
+        return Chroma(
+            collection_name=name,
+            persist_directory=self.persist_directory,
+            embedding_function=self.embedding_function
+        )
+
+    def _chunk(self, text: str) -> Dict[str, str]:
+        """Split the knowledge base into chunks keyed by content hash."""
+        docs = self.text_splitter.create_documents([text])
+        return {_hash_text(doc.page_content): doc.page_content for doc in docs}
+
+    def sync(self) -> Dict[str, int]:
+        """Bring the vector store in line with the knowledge base file, re-embedding only changed chunks."""
+        with self._sync_lock, self._process_lock():
+            with open(self.path, "r") as f:
+                text = f.read()
+            file_hash = _hash_text(text)
+            manifest = self._read_manifest()
+
+            # Nothing to embed: the file is unchanged, or another worker sharing the directory already synced it
+            if manifest.get("file_hash") == file_hash and manifest.get("collection"):
+                if self.vectorstore is None or self.collection_name != manifest["collection"]:
+                    self.vectorstore = self._open_collection(manifest["collection"])
+                    self.collection_name = manifest["collection"]
+                if self.file_hash != file_hash:
+                    reload_knowledge_index(self.path)
+                    self.file_hash = file_hash
+                return {"added": 0, "removed": 0, "unchanged": len(manifest.get("chunk_ids", []))}
+
+            chunks = self._chunk(text)
+            old_ids = set(manifest.get("chunk_ids", []))
+            kept_ids = [chunk_id for chunk_id in chunks if chunk_id in old_ids]
+            new_ids = [chunk_id for chunk_id in chunks if chunk_id not in old_ids]
+
+            collection_name = f"o1a_requirements_{file_hash[:12]}"
+            new_store = self._open_collection(collection_name)
+
+            # Copy embeddings of unchanged chunks instead of recomputing them; the manifest names the
+            # current collection, which another worker may have replaced since this one opened its own
+            old_store = self.vectorstore
+            if manifest.get("collection") and (old_store is None or self.collection_name != manifest["collection"]):
+                old_store = self._open_collection(manifest["collection"])
+            if kept_ids and old_store is not None:
+                existing = old_store.get(ids=kept_ids, include=["embeddings", "documents"])
+                if existing["ids"]:
+                    new_store._collection.upsert(
+                        ids=existing["ids"],
+                        embeddings=existing["embeddings"],
+                        documents=existing["documents"]
+                    )
+                copied = set(existing["ids"])
+                new_ids += [chunk_id for chunk_id in kept_ids if chunk_id not in copied]
+
+            # Embed only the added or modified chunks
+            if new_ids:
+                new_store.add_texts([chunks[chunk_id] for chunk_id in new_ids], ids=new_ids)
+
+            # Swap in the new collection, then evict the previous one
+            self.vectorstore = new_store
+            self.collection_name = collection_name
+            self.file_hash = file_hash
+            self._write_manifest({
+                "file_hash": file_hash,
+                "collection": collection_name,
+                "chunk_ids": list(chunks)
+            })
+            if old_store is not None and manifest.get("collection") not in (None, collection_name):
+                try:
+                    old_store.delete_collection()
+                except Exception as e:
+                    logger.warning("Error evicting old knowledge base collection: %s", e)
+
+            reload_knowledge_index(self.path)
+
+            return {
+                "added": len(new_ids),
+                "removed": len(old_ids - set(chunks)),
+                "unchanged": len(chunks) - len(new_ids)
+            }
+
+    def similarity_search(self, query: str, k: int = 3) -> List[str]:
+        """Return the content of the k chunks most similar to the query."""
+        vectorstore = self.vectorstore
+        if vectorstore is None:
+            self.sync()
+            vectorstore = self.vectorstore
+        try:
+            docs = vectorstore.similarity_search(query, k=k)
+        except Exception:
+            # Another worker may have synced an edit and evicted this collection before our watcher noticed
+            collection_name = self.collection_name
+            self.sync()
+            if self.collection_name == collection_name:
+                raise
+            docs = self.vectorstore.similarity_search(query, k=k)
+        return [doc.page_content for doc in docs]
+
+    def start_watching(self, interval: float = 5.0):
+        """Poll the knowledge base file and hot-reload the index when it changes."""
+        if self._watcher is not None:
+            return
+        self._watch_interval = interval
+        if preloading():
+            # Started in each forked worker instead
+            return
+
+        def watch():
+            last_mtime = os.path.getmtime(self.path)
+            while not self._stop_watching.wait(interval):
+                try:
+                    mtime = os.path.getmtime(self.path)
+                    if mtime == last_mtime:
+                        continue
+                    last_mtime = mtime
+                    result = self.sync()
+                    logger.info("Knowledge base reloaded: %s", result)
+                except Exception as e:
+                    logger.exception("Error reloading knowledge base: %s", e)
+
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=watch, name="knowledge-base-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the hot-reload watcher."""
+        self._stop_watching.set()
+        self._watcher = None
+        self._watch_interval = None
+
+    def _after_fork_in_child(self):
+        # Locks may have been held by the parent's threads, and its watcher does not survive fork
+        self._sync_lock = threading.Lock()
+        self._stop_watching = threading.Event()
+        self._watcher = None
+        if self._watch_interval is not None:
+            self.start_watching(self._watch_interval)
+
+
+_instances: "weakref.WeakSet[KnowledgeBase]" = weakref.WeakSet()
+
+
+def open_knowledge_bases():
+    """Open the vector store of every knowledge base a preloading master left closed, in each worker before it serves."""
+    if preloading():
+        return
+    for knowledge_base in list(_instances):
+        if knowledge_base.vectorstore is None:
+            knowledge_base.sync()
+
+
+def _after_fork_in_child():
+    for knowledge_base in list(_instances):
+        knowledge_base._after_fork_in_child()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,162 @@
+# utils/knowledge_index.py
+import os
+import re
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+KNOWLEDGE_BASE_PATH = "./knowledge_base/o1a_requirements.md"
+
+# Criterion keys in the order they appear in "II. The Eight O-1A Criteria"
+CRITERIA_ORDER = [
+    "awards", "membership", "press", "judging",
+    "contributions", "articles", "employment", "remuneration"
+]
+
+# Keywords used to recognise the sections of "III. Field-Specific Considerations"
+FIELD_KEYWORDS = {
+    "sciences": ["science", "scientist", "research", "academ", "professor", "phd", "postdoc"],
+    "business": ["business", "entrepreneur", "founder", "startup", "ceo", "finance", "marketing"],
+    "technology": ["tech", "software", "engineer", "computer", "machine learning", "data", "developer"],
+    "arts": ["artist", "arts", "creative", "design", "film", "music"]
+}
+
+# Rough conversion used to keep injected guidance within a token budget
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text."""
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+def _split_subsections(body: str) -> List[Tuple[str, str]]:
+    """Split the body of a ### section into its #### subsections."""
+    subsections = []
+    heading = ""
+    lines = []
+    for line in body.splitlines():
+        if line.startswith("#### "):
+            if heading or "".join(lines).strip():
+                subsections.append((heading, "\n".join(lines).strip()))
+            heading = line[5:].strip().rstrip(":")
+            lines = []
+        else:
+            lines.append(line)
+    if heading or "".join(lines).strip():
+        subsections.append((heading, "\n".join(lines).strip()))
+    return subsections
+
+
+class KnowledgeIndex:
+    """Header-aware index of the O-1A knowledge base, keyed by criterion and field."""
+
+    def __init__(self, text: str):
+        self.criteria: Dict[str, Dict[str, Any]] = {}
+        self.fields: Dict[str, Dict[str, Any]] = {}
+        self._parse(text)
+
+    def _parse(self, text: str):
+        part = ""
+        title = None
+        body: List[str] = []
+
+        def flush():
+            if title is None:
+                return
+            section = {
+                "title": title,
+                "text": "\n".join(body).strip(),
+                "subsections": _split_subsections("\n".join(body))
+            }
+            if part.startswith("II."):
+                match = re.match(r"(\d+)\.", title)
+                if match and 1 <= int(match.group(1)) <= len(CRITERIA_ORDER):
+                    self.criteria[CRITERIA_ORDER[int(match.group(1)) - 1]] = section
+            elif part.startswith("III."):
+                self.fields[title.split()[0].lower()] = section
+
+        for line in text.splitlines():
+            if line.startswith("## "):
+                flush()
+                part = line[3:].strip()
+                title = None
+                body = []
+            elif line.startswith("### "):
+                flush()
+                title = line[4:].strip()
+                body = []
+            elif title is not None:
+                body.append(line)
+        flush()
+
+    def get_criterion_section(self, criterion: str) -> Optional[Dict[str, Any]]:
+        """Look up the parsed section for a criterion key such as "awards"."""
+        return self.criteria.get(criterion.lower())
+
+    def get_field_section(self, field: str) -> Optional[Dict[str, Any]]:
+        """Look up the parsed section for a field key such as "sciences"."""
+        return self.fields.get(field.lower())
+
+
+def format_section(section: Optional[Dict[str, Any]], max_tokens: int = 600) -> str:
+    """Render a section as markdown, keeping whole subsections within the token budget."""
+    if not section:
+        return ""
+
+    budget = max_tokens * CHARS_PER_TOKEN
+    text = f"### {section['title']}"
+    for heading, content in section["subsections"]:
+        block = f"\n\n#### {heading}:\n{content}" if heading else f"\n\n{content}"
+        if len(text) + len(block) > budget:
+            break
+        text += block
+
+    return text[:budget]
+
+
+_index: Optional[KnowledgeIndex] = None
+_index_lock = threading.Lock()
+
+
+def _build_index(path: str) -> KnowledgeIndex:
+    text = ""
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            text = f.read()
+    return KnowledgeIndex(text)
+
+
+def get_knowledge_index(path: str = KNOWLEDGE_BASE_PATH) -> KnowledgeIndex:
+    """Return the process-wide knowledge index, building it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _build_index(path)
+    return _index
+
+
+def reload_knowledge_index(path: str = KNOWLEDGE_BASE_PATH) -> KnowledgeIndex:
+    """Rebuild the index from disk and swap it in atomically."""
+    global _index
+    index = _build_index(path)
+    with _index_lock:
+        _index = index
+    return index
+
+
+def get_criterion_guidance(criterion: str, max_tokens: int = 600) -> str:
+    """Get the exact USCIS guidance for a criterion, bounded to max_tokens."""
+    return format_section(get_knowledge_index().get_criterion_section(criterion), max_tokens)
+
+
+def get_field_guidance(field: str, max_tokens: int = 300) -> str:
+    """Get the field-specific considerations for a field, bounded to max_tokens."""
+    return format_section(get_knowledge_index().get_field_section(field), max_tokens)
+
+
+def detect_fields(text: str) -> List[str]:
+    """Detect which field-specific sections are relevant to a piece of text."""
+    text = text.lower()
+    return [field for field, keywords in FIELD_KEYWORDS.items()
+            if any(re.search(r"\b" + re.escape(keyword), text) for keyword in keywords)]
@@ -0,0 +1,218 @@
+# utils/llm_backends.py
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from typing import Dict, Any, Callable, List, Optional
+
+from environs import Env
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+# live: call the providers; record: call them and save every response; replay: serve saved responses only
+LLM_BACKEND = env("LLM_BACKEND", "live")
+LLM_CASSETTE_DIR = env("LLM_CASSETTE_DIR", "./cassettes")
+# Latency added to replayed calls: recorded, none, fixed:<s>, uniform:<min>,<max> or lognormal:<median>,<sigma>
+LLM_REPLAY_LATENCY = env("LLM_REPLAY_LATENCY", "recorded")
+LLM_REPLAY_SEED = env.int("LLM_REPLAY_SEED", None)
+
+BACKEND_MODES = ("live", "record", "replay")
+
+
+class CassetteMissError(KeyError):
+    """Replay mode found no recorded response for a request."""
+
+
+class LatencyModel:
+    """Synthetic latency for replayed calls, parsed from a spec such as 'lognormal:0.8,0.5'."""
+
+    def __init__(self, spec: str = "recorded", seed: Optional[int] = None):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(arg) for arg in args.split(",")] if args else []
+        if kind not in ("recorded", "none", "fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown replay latency model: {spec}")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, recorded: float = 0.0) -> float:
+        with self._lock:
+            if self.kind == "recorded":
+                return recorded
+            if self.kind == "fixed":
+                return self.args[0]
+            if self.kind == "uniform":
+                return self._random.uniform(self.args[0], self.args[1])
+            if self.kind == "lognormal":
+                return self._random.lognormvariate(0, self.args[1]) * self.args[0]
+            return 0.0
+
+
+def _message_content(message: Any) -> Any:
+    if isinstance(message, BaseMessage):
+        return {"type": message.type, "content": message.content}
+    return str(message)
+
+
+def _as_list(messages: Any) -> List[Any]:
+    if isinstance(messages, (list, tuple)):
+        return [_message_content(message) for message in messages]
+    return [_message_content(messages)]
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """Stable key for an LLM request: the model settings, output schema and prompt."""
+    payload = json.dumps({**request, "messages": _as_list(request.get("messages"))}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def encode_response(result: Any) -> Dict[str, Any]:
+    """Serialize a chat model result: a message, a structured output or an include_raw dict."""
+    if isinstance(result, BaseMessage):
+        return {"kind": "message", "message": message_to_dict(result)}
+    if isinstance(result, dict) and "raw" in result:
+        return {
+            "kind": "include_raw",
+            "raw": message_to_dict(result["raw"]) if result.get("raw") is not None else None,
+            "parsed": encode_response(result["parsed"]) if result.get("parsed") is not None else None,
+            "parsing_error": str(result["parsing_error"]) if result.get("parsing_error") else None
+        }
+    if hasattr(result, "model_dump"):
+        return {"kind": "model", "data": result.model_dump()}
+    return {"kind": "json", "data": result}
+
+
+def decode_response(data: Dict[str, Any], schema: Optional[type] = None) -> Any:
+    """Rebuild a result saved by encode_response; structured outputs are validated against schema."""
+    kind = data["kind"]
+    if kind == "message":
+        return messages_from_dict([data["message"]])[0]
+    if kind == "include_raw":
+        return {
+            "raw": messages_from_dict([data["raw"]])[0] if data.get("raw") else None,
+            "parsed": decode_response(data["parsed"], schema) if data.get("parsed") else None,
+            "parsing_error": ValueError(data["parsing_error"]) if data.get("parsing_error") else None
+        }
+    if kind == "model" and schema is not None and hasattr(schema, "model_validate"):
+        return schema.model_validate(data["data"])
+    return data["data"]
+
+
+class CassetteBackend:
+    """
+    Pluggable backend behind every pooled LLM call and knowledge base embedding.
+
+    In record mode each response is saved to a cassette file named after the
+    hash of its request; in replay mode the same request is answered from the
+    cassette after a synthetic latency, so the pipeline runs offline and
+    deterministically. Live mode passes calls straight through.
+    """
+
+    def __init__(self, mode: str = LLM_BACKEND, directory: str = LLM_CASSETTE_DIR, latency: Optional[LatencyModel] = None):
+        if mode not in BACKEND_MODES:
+            raise ValueError(f"Unknown LLM backend: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.latency = latency or LatencyModel(LLM_REPLAY_LATENCY, LLM_REPLAY_SEED)
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.directory, namespace, f"{key}.json")
+
+    def _write(self, namespace: str, key: str, cassette: Dict[str, Any]):
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cassette, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def _read(self, namespace: str, key: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(namespace, key), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            raise CassetteMissError(f"No cassette for {namespace} request {key} in {self.directory}")
+
+    def invoke(self, request: Dict[str, Any], fn: Callable[[], Any], schema: Optional[type] = None) -> Any:
+        """Answer an LLM request live, while recording, or from its cassette."""
+        if self.mode == "live":
+            return fn()
+
+        key = request_key(request)
+        namespace = request.get("model", "llm")
+        if self.mode == "replay":
+            cassette = self._read(namespace, key)
+            time.sleep(self.latency.sample(cassette.get("latency_seconds", 0.0)))
+            with self._lock:
+                self.replayed += 1
+            return decode_response(cassette["response"], schema)
+
+        start = time.perf_counter()
+        result = fn()
+        self._write(namespace, key, {
+            "request": {k: v for k, v in request.items() if k != "messages"},
+            "prompt_chars": sum(len(str(m["content"] if isinstance(m, dict) else m)) for m in _as_list(request.get("messages"))),
+            "latency_seconds": round(time.perf_counter() - start, 4),
+            "response": encode_response(result)
+        })
+        with self._lock:
+            self.recorded += 1
+        return result
+
+    def client_kwargs(self) -> Dict[str, Any]:
+        """Extra ChatGoogleGenerativeAI arguments; replay needs no real API key."""
+        if self.mode == "replay" and not (os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")):
+            return {"google_api_key": "replay"}
+        return {}
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "latency": self.latency.spec,
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "misses": self.misses
+            }
+
+
+class CassetteEmbeddings(Embeddings):
+    """Embeddings routed through the cassette backend; the live model is only needed when not replaying."""
+
+    def __init__(self, backend: CassetteBackend, embeddings: Optional[Embeddings] = None, name: str = "embeddings"):
+        self.backend = backend
+        self.embeddings = embeddings
+        self.name = name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        request = {"model": self.name, "method": "embed_documents", "messages": list(texts)}
+        return self.backend.invoke(request, lambda: self.embeddings.embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        request = {"model": self.name, "method": "embed_query", "messages": text}
+        return self.backend.invoke(request, lambda: self.embeddings.embed_query(text))
+
+# Process-wide backend used by the LLM pool and the knowledge base
+llm_backend = CassetteBackend()
+
+
+def get_embeddings() -> Embeddings:
+    """Embedding model for the knowledge base, routed through the backend outside live mode."""
+    if llm_backend.mode == "replay":
+        return CassetteEmbeddings(llm_backend)
+    from langchain_openai import OpenAIEmbeddings
+    if llm_backend.mode == "record":
+        return CassetteEmbeddings(llm_backend, OpenAIEmbeddings())
+    return OpenAIEmbeddings()
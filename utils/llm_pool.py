@@ -0,0 +1,458 @@
+# utils/llm_pool.py
+import os
+import time
+import threading
+from collections import deque
+from contextvars import copy_context
+from typing import TYPE_CHECKING, Dict, Any, Callable, Optional, Tuple
+
+from environs import Env
+from langchain_core.messages import AIMessage
+
+from utils.knowledge_index import estimate_tokens
+from utils.rate_limiter import TokenBucketLimiter, create_limiter, current_priority, current_request_class
+from utils.deadlines import DeadlineExceeded, call_with_deadline, check_deadline, remaining, with_request_timeout
+from utils.circuit_breaker import CircuitOpenError, get_breaker
+from utils.llm_backends import llm_backend
+from utils.tracing import annotate, span
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.usage import record_usage
+from utils.metrics import cache_lookup, llm_call_duration, llm_calls, llm_in_flight, llm_queue_wait, llm_tokens, registry
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+LLM_MAX_CONCURRENCY = env.int("LLM_MAX_CONCURRENCY", 8)
+# Per-model overrides, e.g. LLM_CONCURRENCY_LIMITS=gemini-2.0-flash=16,gemini-pro=4
+LLM_CONCURRENCY_LIMITS = {model: int(limit) for model, limit in env.dict("LLM_CONCURRENCY_LIMITS", {}).items()}
+# Output tokens reserved in the rate limiter for calls without an output cap
+DEFAULT_OUTPUT_TOKENS = env.int("LLM_DEFAULT_OUTPUT_TOKENS", 1024)
+# Hedging: fire a duplicate call once a call is slower than this percentile of recent calls
+LLM_HEDGING = env.bool("LLM_HEDGING", False)
+LLM_HEDGE_PERCENTILE = env.float("LLM_HEDGE_PERCENTILE", 95)
+LLM_HEDGE_MIN_SAMPLES = env.int("LLM_HEDGE_MIN_SAMPLES", 20)
+
+
+def estimate_input_tokens(messages: Any) -> int:
+    """Estimate the prompt tokens of a string or a list of messages."""
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    if isinstance(messages, (list, tuple)):
+        return sum(estimate_tokens(str(getattr(message, "content", message))) for message in messages)
+    return estimate_tokens(str(messages))
+
+
+def prompt_chars(messages: Any) -> int:
+    if isinstance(messages, (list, tuple)):
+        return sum(len(str(getattr(message, "content", message))) for message in messages)
+    return len(str(messages))
+
+
+def usage_tokens(result: Any) -> Optional[int]:
+    """Total tokens reported for a call, from a message or an include_raw structured result."""
+    if isinstance(result, dict):
+        result = result.get("raw")
+    usage = getattr(result, "usage_metadata", None) or {}
+    return usage.get("total_tokens")
+
+
+class ModelStats:
+    """Counters for one model, updated under the pool lock."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.transports = 0
+        self.clients = 0
+        self.client_requests = 0
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.wait_seconds = 0.0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latencies = deque(maxlen=500)
+
+    def hedge_delay(self, percentile: float, min_samples: int) -> Optional[float]:
+        """Latency at the given percentile of recent successful calls, once there are enough samples."""
+        if len(self.latencies) < min_samples:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "transports": self.transports,
+            "clients": self.clients,
+            "client_requests": self.client_requests,
+            "client_reuses": self.client_requests - self.clients,
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "wait_seconds": round(self.wait_seconds, 4),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
+
+
+class PooledLLM:
+    """
+    Chat model handed out by the pool.
+
+    Calls go through the pool, which enforces the model's rate and concurrency
+    limits and tracks in-flight calls; everything else is delegated to the
+    underlying client.
+    """
+
+    def __init__(self, pool: "LLMPool", model: str, client: "ChatGoogleGenerativeAI"):
+        self.pool = pool
+        self.model = model
+        self.client = client
+
+    def request(self, messages, **extra) -> Dict[str, Any]:
+        """Description of a call used to record and replay it."""
+        return {
+            "model": self.model,
+            "temperature": self.client.temperature,
+            "max_output_tokens": self.client.max_output_tokens,
+            "messages": messages,
+            **extra
+        }
+
+    def invoke(self, messages, *args, **kwargs):
+        tokens = estimate_input_tokens(messages) + (self.client.max_output_tokens or DEFAULT_OUTPUT_TOKENS)
+        request = self.request(messages)
+        return self.pool.call(
+            self.model,
+            lambda: llm_backend.invoke(request, lambda: self.client.invoke(messages, *args, **with_request_timeout(kwargs))),
+            tokens, prompt_chars=prompt_chars(messages)
+        )
+
+    def with_structured_output(self, schema, **kwargs) -> "PooledRunnable":
+        return PooledRunnable(self, schema, kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+
+class PooledRunnable:
+    """A runnable derived from a pooled client, such as a structured-output chain."""
+
+    def __init__(self, llm: PooledLLM, schema, kwargs: Dict[str, Any]):
+        self.llm = llm
+        self.schema = schema
+        self.kwargs = kwargs
+        self.options = {"schema": getattr(schema, "__name__", str(schema)), **kwargs}
+        self._client = None
+        self._runnable = None
+
+    @property
+    def runnable(self):
+        # Derived again whenever the pool replaces the client (set_client_factory, or in a forked worker)
+        client = self.llm.client
+        if client is not self._client:
+            self._runnable = client.with_structured_output(self.schema, **self.kwargs)
+            self._client = client
+        return self._runnable
+
+    def invoke(self, messages, *args, **kwargs):
+        tokens = estimate_input_tokens(messages) + (self.llm.client.max_output_tokens or DEFAULT_OUTPUT_TOKENS)
+        request = self.llm.request(messages, **self.options)
+        return self.llm.pool.call(
+            self.llm.model,
+            lambda: llm_backend.invoke(request, lambda: self.runnable.invoke(messages, *args, **with_request_timeout(kwargs)), self.schema),
+            tokens, prompt_chars=prompt_chars(messages), schema=self.options["schema"]
+        )
+
+
+class LLMPool:
+    """
+    Process-wide pool of chat model clients.
+
+    There is one transport (API client and connection) per model. Clients for
+    other temperatures or output caps are cheap copies that share it, and are
+    reused for every later request with the same settings. Every call passes
+    the model's circuit breaker, rate limiter and concurrency limit, and may be
+    hedged with a duplicate call when it runs unusually long.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, limits: Optional[Dict[str, int]] = None, hedging: bool = LLM_HEDGING):
+        self.max_concurrency = max_concurrency
+        self.hedging = hedging
+        self.limits = {**LLM_CONCURRENCY_LIMITS, **(limits or {})}
+        self._clients: Dict[Tuple[str, float, Optional[int]], PooledLLM] = {}
+        self._transports: Dict[str, "ChatGoogleGenerativeAI"] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._limiters: Dict[str, TokenBucketLimiter] = {}
+        self._stats: Dict[str, ModelStats] = {}
+        self._client_factory: Optional[Callable[[str, float, Optional[int]], Any]] = None
+        self._lock = threading.Lock()
+
+    def _model_stats(self, model: str) -> ModelStats:
+        # Caller holds the pool lock
+        if model not in self._stats:
+            limit = self.limits.get(model, self.max_concurrency)
+            self._stats[model] = ModelStats(limit)
+            self._semaphores[model] = threading.BoundedSemaphore(limit)
+            self._limiters[model] = create_limiter(model)
+        return self._stats[model]
+
+    def get(self, model: str, temperature: float = 0.0, max_output_tokens: Optional[int] = None) -> PooledLLM:
+        """Get the shared client for a model, temperature and optional output token cap."""
+        key = (model, float(temperature), max_output_tokens)
+        with self._lock:
+            stats = self._model_stats(model)
+            stats.client_requests += 1
+            pooled = self._clients.get(key)
+            cache_lookup("llm_client", pooled is not None)
+            if pooled is not None:
+                return pooled
+
+            pooled = PooledLLM(self, model, self._new_client(model, temperature, max_output_tokens, stats))
+            self._clients[key] = pooled
+            stats.clients += 1
+            return pooled
+
+    def _new_client(self, model: str, temperature: float, max_output_tokens: Optional[int], stats: ModelStats):
+        # Caller holds the pool lock
+        if self._client_factory is not None:
+            return self._client_factory(model, temperature, max_output_tokens)
+        transport = self._transports.get(model)
+        if transport is None:
+            # Deferred: the Gemini SDK takes over a second to import
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            client = ChatGoogleGenerativeAI(
+                model=model, temperature=temperature, max_output_tokens=max_output_tokens, **llm_backend.client_kwargs()
+            )
+            self._transports[model] = client
+            stats.transports += 1
+            return client
+        # Shallow copy keeps the underlying API client and its connection
+        return transport.model_copy(update={"temperature": temperature, "max_output_tokens": max_output_tokens})
+
+    def set_client_factory(self, factory: Optional[Callable[[str, float, Optional[int]], Any]]):
+        """
+        Build clients with factory(model, temperature, max_output_tokens) instead of Gemini, e.g. a
+        stub for benchmarks; clients already handed out are rebuilt in place. None restores Gemini.
+        """
+        with self._lock:
+            self._client_factory = factory
+            self._rebuild_clients()
+
+    def _rebuild_clients(self):
+        # Caller holds the pool lock
+        self._transports.clear()
+        for (model, temperature, max_output_tokens), pooled in self._clients.items():
+            pooled.client = self._new_client(model, temperature, max_output_tokens, self._stats[model])
+
+    def _after_fork_in_child(self):
+        # API clients and their connections are not shared with the parent process; the
+        # agents keep their PooledLLM handles, which now point at clients of this process.
+        # Limiters are rebuilt too, with this worker's share of the rate limits
+        self._lock = threading.Lock()
+        with self._lock:
+            self._rebuild_clients()
+            self._limiters = {model: create_limiter(model) for model in self._limiters}
+
+    def call(self, model: str, fn: Callable[[], Any], tokens: int = 0, **attributes) -> Any:
+        """
+        Run an LLM call of an estimated size within the model's rate and concurrency limits.
+
+        Under a request deadline, queueing and the call itself are cut short with
+        DeadlineExceeded once it expires; the client gets the remaining budget as
+        its request timeout, and an abandoned call keeps its concurrency slot
+        and is accounted until it returns. While the model's circuit breaker is
+        open, CircuitOpenError is raised without making the call. Each call is
+        traced as an "llm" span carrying the model, prompt size and token usage;
+        extra keyword arguments become span attributes. Outcomes, durations and
+        token usage are also counted in the o1a_llm_* metrics.
+        """
+        with self._lock:
+            stats = self._model_stats(model)
+            semaphore = self._semaphores[model]
+            limiter = self._limiters[model]
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with span("llm", model=model, estimated_tokens=tokens, **attributes):
+                check_deadline(f"{model} call")
+                breaker = get_breaker("gemini", model)
+                result = breaker.call(lambda: self._call(model, fn, tokens, stats, semaphore, limiter))
+            outcome = "ok"
+            return result
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
+        except DeadlineExceeded:
+            outcome = "deadline_exceeded"
+            raise
+        finally:
+            llm_calls.inc(model=model, outcome=outcome)
+            llm_call_duration.observe(time.perf_counter() - start, model=model, outcome=outcome)
+
+    def _call(self, model: str, fn: Callable[[], Any], tokens: int, stats: ModelStats, semaphore: threading.BoundedSemaphore, limiter: TokenBucketLimiter) -> Any:
+        try:
+            queue_wait = limiter.acquire(tokens, current_priority(), timeout=remaining())
+        except TimeoutError:
+            raise DeadlineExceeded(f"Deadline exceeded waiting for {model} rate limit")
+
+        start = time.perf_counter()
+        left = remaining()
+        if not semaphore.acquire(timeout=None if left is None else max(left, 0)):
+            raise DeadlineExceeded(f"Deadline exceeded waiting for a {model} slot")
+        with self._lock:
+            stats.wait_seconds += time.perf_counter() - start
+            stats.calls += 1
+        llm_queue_wait.observe(queue_wait, model=model, priority=current_request_class())
+
+        # The slot passes to the call once it starts; whichever of the call and the
+        # caller takes the claim first is responsible for releasing it
+        claim = threading.Lock()
+
+        def primary():
+            if not claim.acquire(blocking=False):
+                raise DeadlineExceeded(f"Deadline exceeded before {model} call")
+            return self._attempt(model, fn, tokens, stats, semaphore, limiter)
+
+        try:
+            result = call_with_deadline(lambda: self._hedged(model, primary, fn, tokens, stats, semaphore, limiter), f"{model} call")
+        except BaseException:
+            if claim.acquire(blocking=False):
+                semaphore.release()
+            raise
+
+        usage = self._usage(result)
+        annotate(
+            queue_wait_seconds=round(queue_wait, 4),
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens")
+        )
+        if isinstance(result, AIMessage):
+            result.response_metadata["queue_wait_seconds"] = round(queue_wait, 4)
+        return result
+
+    def _attempt(self, model: str, fn: Callable[[], Any], tokens: int, stats: ModelStats, semaphore: threading.BoundedSemaphore, limiter: TokenBucketLimiter) -> Any:
+        """
+        Make one provider call in a concurrency slot already taken for it.
+
+        The slot is released, and the call's tokens settled and recorded, when
+        the call returns, even if the deadline abandoned it or a hedge won.
+        """
+        with self._lock:
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        call_start = time.perf_counter()
+        try:
+            result = fn()
+        except BaseException:
+            with self._lock:
+                stats.errors += 1
+            raise
+        finally:
+            with self._lock:
+                stats.in_flight -= 1
+            semaphore.release()
+        with self._lock:
+            stats.latencies.append(time.perf_counter() - call_start)
+        self._account(model, result, tokens, limiter)
+        return result
+
+    @staticmethod
+    def _usage(result: Any) -> Dict[str, Any]:
+        return getattr(result.get("raw") if isinstance(result, dict) else result, "usage_metadata", None) or {}
+
+    def _account(self, model: str, result: Any, tokens: int, limiter: TokenBucketLimiter):
+        """Settle the rate limiter's reservation and record the call's token usage."""
+        actual_tokens = usage_tokens(result)
+        if actual_tokens is not None:
+            limiter.settle(tokens, actual_tokens)
+        usage = self._usage(result)
+        for direction in ("input", "output"):
+            if usage.get(f"{direction}_tokens"):
+                llm_tokens.inc(usage[f"{direction}_tokens"], model=model, direction=direction)
+        record_usage(model, usage.get("input_tokens"), usage.get("output_tokens"))
+
+    def _hedged(self, model: str, primary: Callable[[], Any], fn: Callable[[], Any], tokens: int, stats: ModelStats, semaphore: threading.BoundedSemaphore, limiter: TokenBucketLimiter) -> Any:
+        """
+        Run the primary call; if it outlasts the hedge delay, fire a duplicate and return whichever succeeds first.
+
+        The duplicate is only sent if a concurrency slot is free and the rate
+        limiter has capacity for it right now. Both calls are accounted.
+        """
+        with self._lock:
+            delay = stats.hedge_delay(LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES) if self.hedging else None
+        if delay is None:
+            return primary()
+
+        outcomes = []
+        cond = threading.Condition()
+
+        def run(attempt: int, call: Callable[[], Any]):
+            try:
+                outcome = (attempt, True, call())
+            except BaseException as e:
+                outcome = (attempt, False, e)
+            with cond:
+                outcomes.append(outcome)
+                cond.notify_all()
+
+        def start(attempt: int, call: Callable[[], Any]):
+            context = copy_context()
+            threading.Thread(target=lambda: context.run(run, attempt, call), name="llm-hedge", daemon=True).start()
+
+        start(0, primary)
+        with cond:
+            cond.wait_for(lambda: outcomes, timeout=delay)
+            launched = 1
+            if not outcomes and semaphore.acquire(blocking=False):
+                try:
+                    limiter.acquire(tokens, current_priority(), timeout=0)
+                    launched = 2
+                except TimeoutError:
+                    semaphore.release()
+            if launched == 2:
+                with self._lock:
+                    stats.hedges += 1
+                annotate(hedged=True)
+                start(1, lambda: self._attempt(model, fn, tokens, stats, semaphore, limiter))
+
+            cond.wait_for(lambda: any(ok for _, ok, _ in outcomes) or len(outcomes) == launched)
+            for attempt, ok, value in outcomes:
+                if ok:
+                    if attempt == 1:
+                        with self._lock:
+                            stats.hedge_wins += 1
+                    return value
+            raise outcomes[0][2]
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Client reuse, call, in-flight and rate limiter queue counts per model."""
+        with self._lock:
+            models = {model: stats.as_dict() for model, stats in self._stats.items()}
+            limiters = dict(self._limiters)
+        for model, limiter in limiters.items():
+            models[model]["rate_limit"] = limiter.metrics()
+        return models
+
+
+# Process-wide pool used by every agent
+llm_pool = LLMPool()
+os.register_at_fork(after_in_child=llm_pool._after_fork_in_child)
+
+
+def _update_in_flight():
+    for model, stats in llm_pool.metrics().items():
+        llm_in_flight.set(stats["in_flight"], model=model)
+
+
+registry.add_collector(_update_in_flight)
+
+
+def get_llm(model: str = "gemini-2.0-flash", temperature: float = 0.0, max_output_tokens: Optional[int] = None) -> PooledLLM:
+    """Get a pooled chat model client."""
+    return llm_pool.get(model, temperature, max_output_tokens)
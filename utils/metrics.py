@@ -0,0 +1,240 @@
+# utils/metrics.py
+import math
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Tuple
+
+from utils.tracing import Span, add_span_listener
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a sub-second OCR page up to a multi-minute full assessment
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """A named family of samples keyed by label values, in the Prometheus text format."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def values(self) -> Dict[Tuple[str, ...], Any]:
+        """Current value per tuple of label values."""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            for bound, count in zip(self.buckets, counts):
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """Metrics of this process, plus collectors that refresh gauges from live state at scrape time."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.exception("Error collecting metrics: %s", e)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# Process-wide registry served at /metrics
+registry = Registry()
+
+stage_duration = registry.register(Histogram(
+    "o1a_stage_duration_seconds",
+    "Duration of pipeline stages: extract, OCR, each workflow and each of its nodes.",
+    ("stage",)
+))
+llm_calls = registry.register(Counter(
+    "o1a_llm_calls_total",
+    "LLM calls by model and outcome (ok, error, circuit_open, deadline_exceeded).",
+    ("model", "outcome")
+))
+llm_call_duration = registry.register(Histogram(
+    "o1a_llm_call_duration_seconds",
+    "LLM call duration including rate-limit and concurrency queueing.",
+    ("model", "outcome")
+))
+llm_queue_wait = registry.register(Histogram(
+    "o1a_llm_queue_wait_seconds",
+    "Time LLM calls waited in the rate limiter's queue, by model and priority class (interactive, batch).",
+    ("model", "priority"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+))
+llm_tokens = registry.register(Counter(
+    "o1a_llm_tokens_total",
+    "Tokens reported by the provider, by model and direction (input, output).",
+    ("model", "direction")
+))
+llm_in_flight = registry.register(Gauge(
+    "o1a_llm_calls_in_flight",
+    "LLM calls currently holding a concurrency slot.",
+    ("model",)
+))
+fallbacks = registry.register(Counter(
+    "o1a_fallbacks_total",
+    "Times a degraded path was taken (pypdf, mapping_handle_error, parent_handle_error).",
+    ("path",)
+))
+cache_requests = registry.register(Counter(
+    "o1a_cache_requests_total",
+    "Cache lookups by cache and result (hit, miss).",
+    ("cache", "result")
+))
+cache_hit_ratio = registry.register(Gauge(
+    "o1a_cache_hit_ratio",
+    "Hits over lookups since start, per cache.",
+    ("cache",)
+))
+http_in_flight = registry.register(Gauge(
+    "o1a_http_requests_in_flight",
+    "HTTP requests currently being served, by route.",
+    ("route",)
+))
+http_request_duration = registry.register(Histogram(
+    "o1a_http_request_duration_seconds",
+    "HTTP request duration by route and status code.",
+    ("route", "status")
+))
+
+
+def cache_lookup(cache: str, hit: bool):
+    """Count one lookup of a cache."""
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def _update_cache_hit_ratios():
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), count in cache_requests.values().items():
+        counts = totals.setdefault(cache, [0.0, 0.0])
+        counts[0] += count if result == "hit" else 0.0
+        counts[1] += count
+    for cache, (hits, total) in totals.items():
+        cache_hit_ratio.set(hits / total if total else 0.0, cache=cache)
+
+
+registry.add_collector(_update_cache_hit_ratios)
+
+
+def _observe_span(span: Span):
+    # Request and LLM spans have their own, better-labelled metrics
+    if span.name not in ("request", "llm") and span.duration is not None:
+        stage_duration.observe(span.duration, stage=span.name)
+
+
+add_span_listener(_observe_span)
+
+
+def render() -> str:
+    """Every metric of this process in the Prometheus text exposition format."""
+    return registry.render()
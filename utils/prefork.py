@@ -0,0 +1,197 @@
+# utils/prefork.py
+import os
+import gc
+import time
+import signal
+import logging
+from typing import Dict, Callable, Optional
+
+from environs import Env
+
+from utils.metrics import Gauge, registry
+from utils.structured_logging import shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+# Workers forked from the preloaded master; the one default for serve.py and start.sh
+WEB_CONCURRENCY = env.int("WEB_CONCURRENCY", 1)
+# Seconds workers get to finish in-flight requests after SIGTERM before they are killed
+WORKER_SHUTDOWN_TIMEOUT = env.float("WORKER_SHUTDOWN_TIMEOUT", 30.0)
+# Pause before replacing a worker that died, so a crash loop does not spin
+WORKER_RESTART_DELAY = env.float("WORKER_RESTART_DELAY", 1.0)
+
+_preloading = False
+_workers = 1
+
+
+def preloading() -> bool:
+    """True in the master while it loads the app for workers to fork from; nothing fork-unsafe should be opened then."""
+    return _preloading
+
+
+def worker_count() -> int:
+    """Workers serving the app alongside this one under PreforkServer; 1 otherwise."""
+    return _workers
+
+
+def memory_usage(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    RSS, PSS, USS and shared memory of a process in MB, from /proc/<pid>/smaps_rollup.
+
+    USS (private pages) is what the process alone costs; PSS splits shared pages
+    between the processes sharing them, so PSS summed over processes is their
+    real footprint. Empty where smaps_rollup is unavailable (non-Linux).
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid or os.getpid()}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(fields.get("Rss", 0.0), 1),
+        "pss_mb": round(fields.get("Pss", 0.0), 1),
+        "uss_mb": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1),
+        "shared_mb": round(fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0), 1)
+    }
+
+
+process_memory = registry.register(Gauge(
+    "o1a_process_memory_bytes",
+    "Memory of this worker: uss is private to it, pss includes its share of pages shared with the master and siblings.",
+    ("kind",)
+))
+
+
+def _update_process_memory():
+    for key, value in memory_usage().items():
+        process_memory.set(round(value * 2 ** 20), kind=key[:-len("_mb")])
+
+
+registry.add_collector(_update_process_memory)
+
+
+class PreforkServer:
+    """
+    Load the app and warm its agents once, then fork uvicorn workers that share that memory copy-on-write.
+
+    uvicorn --workers starts every worker from scratch, so each one imports the
+    app and builds its own agents, prompts, compiled graphs and knowledge index.
+    Here the master does it once, moves everything it built out of the cyclic
+    GC's reach with gc.freeze() (so collections in the workers do not write to,
+    and copy, the shared pages) and forks. Modules holding connections or
+    threads re-create them in the child with os.register_at_fork. Workers that
+    die are replaced by forking the still-warm master again.
+    """
+
+    def __init__(self, app: str, host: str = "0.0.0.0", port: int = 8000, workers: int = WEB_CONCURRENCY, warm_up: Optional[Callable[[], None]] = None, **uvicorn_options):
+        self.app = app
+        self.warm_up = warm_up
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.uvicorn_options = uvicorn_options
+        self.config = None
+        self.socket = None
+        self.pids: Dict[int, float] = {}
+        self.stopping = False
+
+    def preload(self):
+        """Import the app and run warm_up in the master."""
+        global _preloading
+        import uvicorn
+
+        start = time.perf_counter()
+        _preloading = True
+        try:
+            self.config = uvicorn.Config(self.app, host=self.host, port=self.port, **self.uvicorn_options)
+            self.config.load()
+            if self.warm_up is not None:
+                self.warm_up()
+        finally:
+            _preloading = False
+
+        gc.collect()
+        gc.freeze()
+        logger.info(
+            "Preloaded %s in %.2fs (%d objects frozen, master %s)",
+            self.app, time.perf_counter() - start, gc.get_freeze_count(), memory_usage()
+        )
+
+    def spawn(self) -> int:
+        """Fork a worker serving the shared socket."""
+        import uvicorn
+
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = time.monotonic()
+            return pid
+
+        code = 0
+        try:
+            for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            uvicorn.Server(self.config).run(sockets=[self.socket])
+        except BaseException:
+            logger.exception("Worker %s crashed", os.getpid())
+            code = 1
+        finally:
+            # Never return into the master's loop; flush logs and exit the worker here
+            shutdown_logging()
+            os._exit(code)
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """Preload, fork the workers and keep their number up until SIGINT or SIGTERM."""
+        global _workers
+        _workers = max(1, self.workers)
+        self.preload()
+        self.socket = self.config.bind_socket()
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info("Serving %s on %s:%s with workers %s", self.app, self.host, self.port, sorted(self.pids))
+
+        while self.pids and not self.stopping:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.pids.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning(
+                "Worker %s exited with status %s after %.0fs, replacing it",
+                pid, os.waitstatus_to_exitcode(status), time.monotonic() - started
+            )
+            time.sleep(WORKER_RESTART_DELAY)
+            if not self.stopping:
+                self.spawn()
+
+        self._reap(WORKER_SHUTDOWN_TIMEOUT)
+        self.socket.close()
+
+    def _reap(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while self.pids and time.monotonic() < deadline:
+            for pid in list(self.pids):
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    self.pids.pop(pid)
+            time.sleep(0.1)
+        for pid in self.pids:
+            os.kill(pid, signal.SIGKILL)
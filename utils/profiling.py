@@ -0,0 +1,268 @@
+# utils/profiling.py
+import os
+import sys
+import hmac
+import time
+import random
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+from environs import Env
+
+from utils.tracing import Span, add_span_hooks
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+# Profiling on demand needs X-Admin-Token to match; unset disables it
+ADMIN_TOKEN = env("ADMIN_TOKEN", None)
+# Fraction of requests profiled with the sampling profiler without being asked
+PROFILE_SAMPLE_RATE = env.float("PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_INTERVAL_SECONDS = env.float("PROFILE_INTERVAL_SECONDS", 0.005)
+PROFILE_DIR = env("PROFILE_DIR", "./profiles")
+# Frames kept per allocation; above 0 starts tracemalloc at import so growth since startup is visible
+TRACEMALLOC_FRAMES = env.int("TRACEMALLOC_FRAMES", 0)
+
+PROFILE_MODES = ("sample", "deterministic")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token, ADMIN_TOKEN))
+
+
+class RequestProfile:
+    """
+    Profile of one request, following it into the worker threads running its workflow nodes.
+
+    A thread is profiled while it works on one of the request's tracing spans.
+    "sample" records the stack of every such thread each interval and writes
+    folded stacks (flamegraph.pl, speedscope, inferno). "deterministic" runs
+    cProfile in each such thread and writes merged pstats (snakeviz, flameprof,
+    gprof2dot).
+    """
+
+    def __init__(self, mode: str, name: str, interval: float = PROFILE_INTERVAL_SECONDS):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.name = name
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.skipped_threads = 0
+        self._depth: Dict[int, int] = {}
+        self._span_threads: Dict[str, int] = {}
+        self._profilers: Dict[int, cProfile.Profile] = {}
+        self._finished: List[cProfile.Profile] = []
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.enter_thread()
+        if self.mode == "sample":
+            self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        self.exit_thread()
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def enter_thread(self, ident: Optional[int] = None):
+        ident = ident or threading.get_ident()
+        with self._lock:
+            self._depth[ident] = self._depth.get(ident, 0) + 1
+            if self._depth[ident] > 1 or self.mode != "deterministic":
+                return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            with self._lock:
+                self.skipped_threads += 1
+            return
+        with self._lock:
+            self._profilers[ident] = profiler
+
+    def exit_thread(self, ident: Optional[int] = None):
+        ident = ident or threading.get_ident()
+        with self._lock:
+            self._depth[ident] = self._depth.get(ident, 1) - 1
+            if self._depth[ident] > 0:
+                return
+            del self._depth[ident]
+            profiler = self._profilers.pop(ident, None)
+        if profiler is not None:
+            profiler.disable()
+            profiler.create_stats()
+            with self._lock:
+                self._finished.append(profiler)
+
+    def span_started(self, span: Span):
+        ident = threading.get_ident()
+        with self._lock:
+            self._span_threads[span.span_id] = ident
+        self.enter_thread(ident)
+
+    def span_finished(self, span: Span):
+        with self._lock:
+            ident = self._span_threads.pop(span.span_id, None)
+        if ident is not None:
+            self.exit_thread(ident)
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                idents = [ident for ident in self._depth if ident != own]
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                if ident not in names:
+                    names[ident] = next((t.name for t in threading.enumerate() if t.ident == ident), str(ident))
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names[ident])
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, directory: str = PROFILE_DIR) -> str:
+        """Write the profile and return its path."""
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{self.name}")
+        if self.mode == "sample":
+            path = f"{stem}.folded"
+            with open(path, "w") as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            return path
+        path = f"{stem}.prof"
+        with self._lock:
+            profilers = list(self._finished)
+        if not profilers:
+            return ""
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(path)
+        return path
+
+
+def _short_path(filename: str) -> str:
+    for root in sorted(sys.path, key=len, reverse=True):
+        if root and filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def _on_span_start(span: Span):
+    profile = _profile.get()
+    if profile is not None:
+        profile.span_started(span)
+
+
+def _on_span_end(span: Span):
+    profile = _profile.get()
+    if profile is not None:
+        profile.span_finished(span)
+
+
+add_span_hooks(_on_span_start, _on_span_end)
+
+
+def choose_mode(requested: Optional[str], admin_token: Optional[str]) -> Optional[str]:
+    """Profile mode for a request: an admin's explicit choice, else sampling at PROFILE_SAMPLE_RATE."""
+    if requested and is_admin(admin_token):
+        return requested
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+@contextmanager
+def profile_scope(mode: Optional[str], name: str):
+    """Profile the enclosed request when mode is set; yields the RequestProfile (None otherwise)."""
+    if mode is None:
+        yield None
+        return
+    profile = RequestProfile(mode, name)
+    token = _profile.set(profile)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _profile.reset(token)
+
+
+class MemoryTracker:
+    """tracemalloc snapshots, each compared with the one before it to show growth between calls."""
+
+    def __init__(self, frames: int = TRACEMALLOC_FRAMES):
+        self.frames = frames or 1
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+        if frames:
+            tracemalloc.start(frames)
+
+    def snapshot(self, limit: int = 25, group_by: str = "lineno", dump: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                return {"tracing": True, "started": True, "message": "tracemalloc started; take another snapshot after some requests"}
+
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            current, peak = tracemalloc.get_traced_memory()
+            result = {
+                "tracing": True,
+                "started": False,
+                "traced_mb": round(current / 2 ** 20, 3),
+                "peak_traced_mb": round(peak / 2 ** 20, 3),
+                "top": [_stat(stat) for stat in snapshot.statistics(group_by)[:limit]]
+            }
+            if self._previous is not None:
+                result["growth"] = [_stat(stat) for stat in snapshot.compare_to(self._previous, group_by)[:limit]]
+            if dump:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.tracemalloc")
+                snapshot.dump(path)
+                result["dump"] = path
+            self._previous = snapshot
+            return result
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+
+def _stat(stat) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    entry = {"location": f"{_short_path(frame.filename)}:{frame.lineno}", "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+# Process-wide tracker
+memory_tracker = MemoryTracker()
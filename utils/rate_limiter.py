@@ -0,0 +1,173 @@
+# utils/rate_limiter.py
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
+
+from environs import Env
+
+from utils.prefork import worker_count
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+LLM_RPM = env.int("LLM_RPM", 2000)
+LLM_TPM = env.int("LLM_TPM", 4000000)
+# Per-model overrides, e.g. LLM_RPM_LIMITS=gemini-2.0-flash=15
+LLM_RPM_LIMITS = {model: int(limit) for model, limit in env.dict("LLM_RPM_LIMITS", {}).items()}
+LLM_TPM_LIMITS = {model: int(limit) for model, limit in env.dict("LLM_TPM_LIMITS", {}).items()}
+
+# Interactive requests are served before batch jobs
+REQUEST_CLASSES = {"interactive": 0, "batch": 1}
+
+# How far along a request is; within a class, calls from later stages go first
+STAGE_PROGRESS = {"resume": 0, "mapping": 1, "child": 2, "parent": 3, "final": 4}
+
+_request_class: ContextVar[str] = ContextVar("llm_request_class", default="interactive")
+_progress: ContextVar[int] = ContextVar("llm_progress", default=0)
+
+
+@contextmanager
+def llm_priority(request_class: Optional[str] = None, stage: Optional[str] = None):
+    """Set the priority of LLM calls made in this context (and in workflow nodes it runs)."""
+    tokens = []
+    if request_class is not None:
+        if request_class not in REQUEST_CLASSES:
+            raise ValueError(f"Unknown request class: {request_class}")
+        tokens.append((_request_class, _request_class.set(request_class)))
+    if stage is not None:
+        tokens.append((_progress, _progress.set(STAGE_PROGRESS[stage])))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_request_class() -> str:
+    return _request_class.get()
+
+
+def current_priority() -> Tuple[int, int]:
+    """Sort key for the current context; lower is served first."""
+    return REQUEST_CLASSES[_request_class.get()], -_progress.get()
+
+
+class TokenBucketLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets with a priority queue.
+
+    Both buckets hold up to one minute of capacity and refill continuously.
+    Waiting calls are served strictly in priority order, so a batch call cannot
+    take capacity ahead of an interactive call queued behind it.
+    """
+
+    def __init__(self, rpm: int, tpm: int, wait_history: int = 1000):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.waits = deque(maxlen=wait_history)
+        self.total_wait_seconds = 0.0
+        self.calls = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _seconds_until_available(self, tokens: int) -> float:
+        missing_requests = max(0.0, 1 - self._requests)
+        missing_tokens = max(0.0, tokens - self._tokens)
+        return max(missing_requests * 60 / self.rpm, missing_tokens * 60 / self.tpm)
+
+    def acquire(self, tokens: int, priority: Tuple[int, int] = (0, 0), timeout: Optional[float] = None) -> float:
+        """
+        Wait for capacity for one request of the given size; returns the seconds spent queued.
+
+        Raises TimeoutError if no capacity is granted within timeout seconds.
+        """
+        tokens = min(tokens, self.tpm)
+        entry = (priority, next(self._seq))
+        start = time.perf_counter()
+        give_up = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    self._refill()
+                    delay = None
+                    if self._waiters[0] == entry:
+                        delay = self._seconds_until_available(tokens)
+                        if delay <= 0:
+                            heapq.heappop(self._waiters)
+                            self._requests -= 1
+                            self._tokens -= tokens
+                            break
+                    if give_up is not None:
+                        left = give_up - time.monotonic()
+                        if left <= 0:
+                            raise TimeoutError("Timed out waiting in the LLM rate limiter queue")
+                        delay = left if delay is None else min(delay, left)
+                    self._cond.wait(delay)
+            except BaseException:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                raise
+            finally:
+                # Wake the next waiter so it can become the head of the queue
+                self._cond.notify_all()
+
+            wait = time.perf_counter() - start
+            self.waits.append(wait)
+            self.total_wait_seconds += wait
+            self.calls += 1
+        return wait
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a call is known."""
+        with self._cond:
+            self._tokens = min(self.tpm, self._tokens + min(estimated_tokens, self.tpm) - actual_tokens)
+            self._cond.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            self._refill()
+            waits = sorted(self.waits)
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "available_requests": round(self._requests, 2),
+                "available_tokens": int(self._tokens),
+                "queued": len(self._waiters),
+                "calls": self.calls,
+                "queue_wait_seconds_total": round(self.total_wait_seconds, 4),
+                "queue_wait_seconds_p50": round(waits[len(waits) // 2], 4) if waits else 0.0,
+                "queue_wait_seconds_p95": round(waits[int(len(waits) * 0.95)], 4) if waits else 0.0,
+                "queue_wait_seconds_max": round(waits[-1], 4) if waits else 0.0
+            }
+
+
+def create_limiter(model: str) -> TokenBucketLimiter:
+    """
+    Limiter for a model, using its RPM and TPM overrides if any.
+
+    The limits are for the whole service: each of the workers of a prefork
+    server gets an equal share of them.
+    """
+    workers = worker_count()
+    return TokenBucketLimiter(
+        max(1, LLM_RPM_LIMITS.get(model, LLM_RPM) // workers),
+        max(1, LLM_TPM_LIMITS.get(model, LLM_TPM) // workers)
+    )
@@ -0,0 +1,204 @@
+# utils/structured_logging.py
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+from environs import Env
+
+from utils.metrics import Gauge, registry
+from utils.tracing import current_trace
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+LOG_LEVEL = env("LOG_LEVEL", "INFO").upper()
+# "json" (one object per line) or "text"
+LOG_FORMAT = env("LOG_FORMAT", "text")
+# Longest rendering of a truncated payload
+LOG_MAX_PAYLOAD_CHARS = env.int("LOG_MAX_PAYLOAD_CHARS", 500)
+# Fraction of DEBUG/INFO records kept; warnings and errors are always kept
+LOG_SAMPLE_RATE = env.float("LOG_SAMPLE_RATE", 1.0)
+# Per-logger overrides, e.g. LOG_SAMPLE_RATES=agents.agent_manager=0.1
+LOG_SAMPLE_RATES = {name: float(rate) for name, rate in env.dict("LOG_SAMPLE_RATES", {}).items()}
+# Records waiting for the writer thread; beyond this new records are dropped rather than block
+LOG_QUEUE_SIZE = env.int("LOG_QUEUE_SIZE", 10000)
+
+# Attributes every LogRecord has; anything else was passed in extra= and is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "trace_id"}
+
+
+class Truncated:
+    """
+    A payload rendered for a log message only if the record is emitted, and cut to max_chars.
+
+        logger.debug("Result: %s", Truncated(result))
+    """
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: int = LOG_MAX_PAYLOAD_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        text = self.value if isinstance(self.value, str) else repr(self.value)
+        if len(text) <= self.max_chars:
+            return text
+        return f"{text[:self.max_chars]}... [{len(text) - self.max_chars} more chars]"
+
+    __repr__ = __str__
+
+
+def truncate(value: Any, max_chars: int = LOG_MAX_PAYLOAD_CHARS) -> Truncated:
+    return Truncated(value, max_chars)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of DEBUG/INFO records per logger; never drops warnings or errors."""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rate = rate
+        self.rates = dict(LOG_SAMPLE_RATES if rates is None else rates)
+
+    def _rate(self, name: str) -> float:
+        # Most specific configured logger name wins
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return self.rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class TraceFilter(logging.Filter):
+    """Tag records with the trace id of the request they were logged from."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = current_trace()
+        record.trace_id = trace.trace_id if trace is not None else "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with extra= fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "trace_id", "-") != "-":
+            entry["trace_id"] = record.trace_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking the request."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+_lock = threading.Lock()
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """
+    Route the root logger through a bounded queue to a writer thread.
+
+    Records below the level are never formatted, sampled-out records are
+    dropped before formatting, and a full queue drops records rather than
+    blocking the caller. Safe to call more than once.
+    """
+    global _listener, _handler
+    with _lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s"
+        ))
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        _handler.addFilter(SamplingFilter())
+        _handler.addFilter(TraceFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(_handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        atexit.unregister(_listener.stop)
+        _listener.stop()
+        _listener = None
+
+
+def _after_fork_in_child():
+    # The writer thread does not survive fork, and the parent's queue may have been locked mid-put:
+    # give the child its own queue and writer, keeping the handler, its filters and the stream
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+    atexit.unregister(_listener.stop)
+    _handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler.dropped = 0
+    _listener = logging.handlers.QueueListener(_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def dropped_records() -> int:
+    """Records dropped because the log queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+
+log_records_dropped = registry.register(Gauge(
+    "o1a_log_records_dropped",
+    "Log records dropped since start because the log queue was full."
+))
+registry.add_collector(lambda: log_records_dropped.set(dropped_records()))
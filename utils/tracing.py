@@ -0,0 +1,332 @@
+# utils/tracing.py
+import os
+import re
+import json
+import time
+import logging
+import uuid
+import queue
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, List, Optional
+
+import requests
+from environs import Env
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+TRACING_ENABLED = env.bool("TRACING_ENABLED", True)
+# Where finished traces go: "" (nowhere), "jsonl" or "otlp"
+TRACE_EXPORT = env("TRACE_EXPORT", "")
+TRACE_JSONL_PATH = env("TRACE_JSONL_PATH", "./traces/spans.jsonl")
+TRACE_OTLP_ENDPOINT = env("TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+SERVER_TIMING_MAX_ENTRIES = env.int("SERVER_TIMING_MAX_ENTRIES", 30)
+SERVICE_NAME = "o1a-assessment-api"
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    def __init__(self, trace: "Trace", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error = ""
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = f"{type(error).__name__}: {str(error)[:200]}"
+        self.trace.add(self)
+        for listener in _span_listeners:
+            listener(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class Trace:
+    """
+    The spans of one request; shared by every thread working on it.
+
+    An unrecorded trace keeps no spans: they only time stages for the span
+    listeners (metrics, profiling), so those work with tracing turned off.
+    """
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None, recorded: bool = True):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes or {}
+        self.recorded = recorded
+        self.spans: List[Span] = []
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def attempt(self, name: str) -> int:
+        """How many times a span of this name has started in the trace, this one included."""
+        with self._lock:
+            self._attempts[name] = self._attempts.get(name, 0) + 1
+            return self._attempts[name]
+
+    def add(self, span: Span):
+        if not self.recorded:
+            return
+        with self._lock:
+            self.spans.append(span)
+
+    def server_timing(self, max_entries: int = SERVER_TIMING_MAX_ENTRIES) -> str:
+        """Server-Timing header value: total time per span name, longest first."""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for span in self.spans:
+                totals.setdefault(span.name, []).append(span.duration or 0.0)
+        entries = sorted(totals.items(), key=lambda item: sum(item[1]), reverse=True)[:max_entries]
+        return ", ".join(
+            f'{_metric_name(name)};dur={sum(durations) * 1000:.1f}' + (f';desc="x{len(durations)}"' if len(durations) > 1 else "")
+            for name, durations in entries
+        )
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [span.as_dict() for span in self.spans]
+
+
+def _metric_name(name: str) -> str:
+    # Server-Timing metric names are HTTP tokens
+    return re.sub(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]", "_", name)
+
+
+_span_listeners: List[Callable[[Span], None]] = []
+_span_start_listeners: List[Callable[[Span], None]] = []
+
+
+def add_span_listener(listener: Callable[[Span], None]):
+    """Call listener(span) whenever a span finishes, e.g. to feed metrics."""
+    _span_listeners.append(listener)
+
+
+def add_span_hooks(on_start: Callable[[Span], None], on_end: Callable[[Span], None]):
+    """Call on_start(span) in the thread starting each span, and on_end(span) when it finishes."""
+    _span_start_listeners.append(on_start)
+    _span_listeners.append(on_end)
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """The recorded trace of the current request, if any."""
+    trace = _trace.get()
+    return trace if trace is not None and trace.recorded else None
+
+
+def current_span() -> Optional[Span]:
+    return _span.get()
+
+
+def annotate(**attributes):
+    """Add attributes to the current span, if any."""
+    current = _span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Start a span under the current one, or return None when no trace is active."""
+    trace = _trace.get()
+    if trace is None:
+        return None
+    parent = _span.get()
+    attributes["attempt"] = trace.attempt(name)
+    current = Span(trace, name, parent, attributes)
+    for listener in _span_start_listeners:
+        listener(current)
+    return current
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a child of the current span; yields the span (None when not tracing)."""
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(e)
+        raise
+    else:
+        current.finish()
+    finally:
+        _span.reset(token)
+
+
+def traced(name: str, **attributes) -> Callable:
+    """Decorator running every call of the function in a span."""
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace_scope(name: str, **attributes):
+    """
+    Trace the enclosed request; yields the Trace, which is exported when the block ends.
+
+    With TRACING_ENABLED off this yields None and nothing is kept or exported,
+    but spans still time each stage for the span listeners, so stage metrics exist either way.
+    """
+    trace = Trace(name, attributes, recorded=TRACING_ENABLED)
+    trace_token = _trace.set(trace)
+    try:
+        with span(name, **attributes):
+            yield trace if trace.recorded else None
+    finally:
+        _trace.reset(trace_token)
+        if trace.recorded:
+            exporter.export(trace)
+
+
+class TracingCallback(BaseCallbackHandler):
+    """LangGraph callback that opens a span around every node of a workflow."""
+
+    def __init__(self, workflow: str):
+        self.workflow = workflow
+        self._spans: Dict[Any, Span] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # LangGraph's own __start__ pseudo-node is not a stage of the workflow
+        if node is None or kwargs.get("name") != node or node.startswith("__"):
+            return
+        current = start_span(f"{self.workflow}.{node}", workflow=self.workflow, node=node, step=(metadata or {}).get("langgraph_step"))
+        if current is not None:
+            self._spans[run_id] = current
+            # The node function runs in this context, so its LLM calls nest under the node
+            _span.set(current)
+
+    def _end(self, run_id, error: Optional[BaseException] = None):
+        current = self._spans.pop(run_id, None)
+        if current is None:
+            return
+        current.finish(error)
+        _span.set(current.parent)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+def tracing_callbacks(workflow: str) -> List[BaseCallbackHandler]:
+    """Callbacks to pass in a workflow's config while a trace is active."""
+    return [TracingCallback(workflow)] if _trace.get() is not None else []
+
+
+class SpanExporter:
+    """Background exporter writing finished traces as JSON lines or OTLP/HTTP JSON."""
+
+    def __init__(self, mode: str = TRACE_EXPORT, path: str = TRACE_JSONL_PATH, endpoint: str = TRACE_OTLP_ENDPOINT):
+        self.mode = mode
+        self.path = path
+        self.endpoint = endpoint
+        self.exported = 0
+        self.failed = 0
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=1000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        if not self.mode:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.failed += 1
+
+    def _after_fork_in_child(self):
+        # The export thread does not survive fork; the child starts its own on first export
+        self._queue = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                if self.mode == "jsonl":
+                    self._write_jsonl(trace)
+                elif self.mode == "otlp":
+                    self._post_otlp(trace)
+                self.exported += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Error exporting trace %s: %s", trace.trace_id, e)
+
+    def _write_jsonl(self, trace: Trace):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a") as f:
+            for record in trace.as_dicts():
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def _post_otlp(self, trace: Trace):
+        spans = []
+        for record in trace.as_dicts():
+            start_ns = int(record["start_time"] * 1e9)
+            spans.append({
+                "traceId": record["trace_id"],
+                "spanId": record["span_id"],
+                "parentSpanId": record["parent_id"] or "",
+                "name": record["name"],
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(record["duration_ms"] * 1e6)),
+                "attributes": [{"key": key, "value": {"stringValue": str(value)}} for key, value in record["attributes"].items()],
+                "status": {"code": 2, "message": record["error"]} if record["error"] else {"code": 1}
+            })
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "utils.tracing"}, "spans": spans}]
+        }]}
+        response = requests.post(self.endpoint, json=payload, timeout=5)
+        response.raise_for_status()
+
+
+# Process-wide exporter
+exporter = SpanExporter()
+os.register_at_fork(after_in_child=exporter._after_fork_in_child)
@@ -0,0 +1,178 @@
+# utils/usage.py
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+from environs import Env
+
+from utils.metrics import Counter, registry
+from utils.tracing import current_span
+
+# Configure environment
+env = Env()
+env.read_env()  # Read .env file if it exists
+# USD per million input and output tokens, e.g. LLM_PRICES=gemini-2.0-flash=0.10:0.40,gemini-pro=0.50:1.50
+DEFAULT_PRICES = {"gemini-2.0-flash": (0.10, 0.40), "gemini-pro": (0.50, 1.50)}
+LLM_PRICES = {
+    **DEFAULT_PRICES,
+    **{model: tuple(float(price) for price in prices.split(":")) for model, prices in env.dict("LLM_PRICES", {}).items()}
+}
+# Calls made outside any request scope are accounted to this key
+ANONYMOUS_KEY = "anonymous"
+
+llm_cost = registry.register(Counter(
+    "o1a_llm_cost_usd_total",
+    "Estimated LLM spend from the configured price table, by model.",
+    ("model",)
+))
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, prices: Optional[Dict[str, Tuple[float, float]]] = None) -> Optional[float]:
+    """Estimated USD cost of a call, or None when the model has no price."""
+    price = (prices or LLM_PRICES).get(model)
+    if price is None:
+        return None
+    input_price, output_price = price
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class UsageTotals:
+    """Calls, tokens and estimated cost, aggregated."""
+
+    def __init__(self):
+        self.calls = 0
+        self.unreported_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.unpriced_calls = 0
+
+    def add(self, input_tokens: Optional[int], output_tokens: Optional[int], cost: Optional[float]):
+        self.calls += 1
+        if input_tokens is None and output_tokens is None:
+            self.unreported_calls += 1
+        self.input_tokens += input_tokens or 0
+        self.output_tokens += output_tokens or 0
+        if cost is None:
+            self.unpriced_calls += 1
+        else:
+            self.cost_usd += cost
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.input_tokens + self.output_tokens,
+            "estimated_cost_usd": round(self.cost_usd, 6),
+            "unreported_calls": self.unreported_calls,
+            "unpriced_calls": self.unpriced_calls
+        }
+
+
+class RequestUsage:
+    """Token usage of one request, by stage and by model; shared by every thread working on it."""
+
+    def __init__(self, api_key: str, requested: bool = False):
+        self.api_key = api_key
+        # Whether the caller asked for a usage block in the response
+        self.requested = requested
+        self.total = UsageTotals()
+        self.stages: Dict[str, UsageTotals] = {}
+        self.models: Dict[str, UsageTotals] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, model: str, input_tokens: Optional[int], output_tokens: Optional[int], cost: Optional[float]):
+        with self._lock:
+            self.total.add(input_tokens, output_tokens, cost)
+            self.stages.setdefault(stage, UsageTotals()).add(input_tokens, output_tokens, cost)
+            self.models.setdefault(model, UsageTotals()).add(input_tokens, output_tokens, cost)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.total.as_dict(),
+                # Biggest consumers first
+                "by_stage": {stage: totals.as_dict() for stage, totals in _by_cost(self.stages)},
+                "by_model": {model: totals.as_dict() for model, totals in _by_cost(self.models)}
+            }
+
+
+def _by_cost(totals: Dict[str, UsageTotals]) -> List[Tuple[str, UsageTotals]]:
+    return sorted(totals.items(), key=lambda item: (item[1].cost_usd, item[1].input_tokens + item[1].output_tokens), reverse=True)
+
+
+class UsageLedger:
+    """Running usage totals of this process per API key, and per stage across all keys."""
+
+    def __init__(self):
+        self.keys: Dict[str, UsageTotals] = {}
+        self.stages: Dict[str, UsageTotals] = {}
+        self._lock = threading.Lock()
+
+    def add(self, api_key: str, stage: str, input_tokens: Optional[int], output_tokens: Optional[int], cost: Optional[float]):
+        with self._lock:
+            self.keys.setdefault(api_key, UsageTotals()).add(input_tokens, output_tokens, cost)
+            self.stages.setdefault(stage, UsageTotals()).add(input_tokens, output_tokens, cost)
+
+    def summary(self, api_key: Optional[str] = None) -> Dict[str, Any]:
+        """Totals for one key, or for every key plus the stages that cost the most."""
+        with self._lock:
+            if api_key is not None:
+                totals = self.keys.get(api_key)
+                return {"api_key": api_key, **(totals or UsageTotals()).as_dict()}
+            return {
+                "keys": {key: totals.as_dict() for key, totals in _by_cost(self.keys)},
+                "stages": {stage: totals.as_dict() for stage, totals in _by_cost(self.stages)},
+                "prices_per_million_tokens": {model: {"input": prices[0], "output": prices[1]} for model, prices in LLM_PRICES.items()}
+            }
+
+
+# Process-wide ledger
+usage_ledger = UsageLedger()
+
+_usage: ContextVar[Optional[RequestUsage]] = ContextVar("request_usage", default=None)
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Stable, non-reversible identifier for an API key, safe to log and return."""
+    if not api_key:
+        return ANONYMOUS_KEY
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+@contextmanager
+def usage_scope(api_key: Optional[str] = None, requested: bool = False):
+    """Account the LLM calls made in this context (and in workflow nodes it runs) to one request."""
+    usage = RequestUsage(key_fingerprint(api_key), requested)
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def current_usage() -> Optional[RequestUsage]:
+    return _usage.get()
+
+
+def current_stage() -> str:
+    """Name of the workflow node (or other span) the current LLM call is made from."""
+    span = current_span()
+    while span is not None and span.name == "llm":
+        span = span.parent
+    return span.name if span is not None else "untraced"
+
+
+def record_usage(model: str, input_tokens: Optional[int], output_tokens: Optional[int]):
+    """Account one LLM call to the current request, its API key and its stage."""
+    cost = estimate_cost(model, input_tokens or 0, output_tokens or 0)
+    if cost is not None:
+        llm_cost.inc(cost, model=model)
+    stage = current_stage()
+    usage = _usage.get()
+    if usage is not None:
+        usage.add(stage, model, input_tokens, output_tokens, cost)
+    usage_ledger.add(usage.api_key if usage is not None else ANONYMOUS_KEY, stage, input_tokens, output_tokens, cost)